@@ -0,0 +1,79 @@
+"""Load test: sync vs async graph throughput at a fixed concurrency.
+
+The LLM and the search tool are replaced by in-process stand-ins that sleep
+for a configurable latency, so the numbers reflect how well each execution
+path overlaps network waits rather than model speed.
+
+Usage:
+    python benchmarks/async_load.py --sessions 64 --llm-latency 0.2 --search-latency 0.3
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+# Both passes issue the same stub queries; keep the caches out of the
+# comparison so the async pass is not served from the sync pass's results.
+os.environ.setdefault("SEARCH_CACHE_BACKEND", "none")
+os.environ.setdefault("SUMMARY_CACHE_BACKEND", "none")
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+from stubs import graph_module, install_stubs  # noqa: E402
+
+
+def _inputs(i: int) -> dict:
+    return {"messages": [HumanMessage(content=f"Research question {i}")]}
+
+
+def run_sync(sessions: int) -> tuple[float, int]:
+    peak_threads = threading.active_count()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        futures = [pool.submit(graph_module.graph.invoke, _inputs(i)) for i in range(sessions)]
+        while not all(f.done() for f in futures):
+            peak_threads = max(peak_threads, threading.active_count())
+            time.sleep(0.01)
+        for f in futures:
+            f.result()
+    return time.perf_counter() - start, peak_threads
+
+
+async def _run_async(sessions: int) -> tuple[float, int]:
+    peak_threads = threading.active_count()
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(graph_module.graph.ainvoke(_inputs(i))) for i in range(sessions)]
+    while not all(t.done() for t in tasks):
+        peak_threads = max(peak_threads, threading.active_count())
+        await asyncio.sleep(0.01)
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - start, peak_threads
+
+
+def run_async(sessions: int) -> tuple[float, int]:
+    return asyncio.run(_run_async(sessions))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=32, help="Concurrent research sessions.")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per stub LLM call.")
+    parser.add_argument("--search-latency", type=float, default=0.3, help="Seconds per stub search.")
+    args = parser.parse_args()
+
+    install_stubs(args.llm_latency, args.search_latency)
+
+    for name, runner in (("sync", run_sync), ("async", run_async)):
+        elapsed, peak_threads = runner(args.sessions)
+        print(
+            f"{name:>5}: {args.sessions} sessions in {elapsed:.2f}s "
+            f"({args.sessions / elapsed:.2f} runs/s, peak threads {peak_threads})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Throughput of batch research by worker-pool size, plus resume after interruption.
+
+Writes a JSONL file of questions and runs it with ``agent.batch`` against the
+stub OpenAI-compatible server and a stub search provider, once per
+``--concurrency`` value. Then it interrupts a run partway through and resumes
+it, checking that the resumed run answers only the missing questions.
+
+Reports questions/s and per-question latency (mean, p95) for each pool size.
+
+Usage:
+    python benchmarks/batch_throughput.py --questions 24 --concurrency 1 4 8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from stub_server import StubServer  # noqa: E402
+from stubs import install_search_stub  # noqa: E402
+
+from agent.batch import completed_ids, read_questions, run_batch_file  # noqa: E402
+
+
+def write_questions(path: str, count: int, label: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            f.write(json.dumps({"id": f"{label}-{i}", "question": f"What is new in {label} battery chemistry {i}?"}) + "\n")
+
+
+async def run_all(args: argparse.Namespace, workdir: str) -> tuple[dict, dict]:
+    # One event loop for every run: pooled async clients stay on it.
+    configurable = {"number_of_initial_queries": args.initial_queries, "max_research_loops": args.loops}
+    reports = {}
+    for concurrency in args.concurrency:
+        input_path = os.path.join(workdir, f"questions-{concurrency}.jsonl")
+        write_questions(input_path, args.questions, f"c{concurrency}")
+        report = await run_batch_file(
+            input_path, os.path.join(workdir, f"results-{concurrency}.jsonl"),
+            concurrency=concurrency, configurable=configurable,
+        )
+        reports[concurrency] = report.as_dict()
+
+    input_path = os.path.join(workdir, "questions-resume.jsonl")
+    output_path = os.path.join(workdir, "results-resume.jsonl")
+    write_questions(input_path, args.questions, "resume")
+    task = asyncio.create_task(
+        run_batch_file(input_path, output_path, concurrency=max(args.concurrency), configurable=configurable)
+    )
+    while len(completed_ids(output_path)) < args.questions // 2:
+        await asyncio.sleep(0.05)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    interrupted = len(completed_ids(output_path))
+    resumed = await run_batch_file(
+        input_path, output_path, concurrency=max(args.concurrency), configurable=configurable
+    )
+    resume = {
+        "before": interrupted,
+        "skipped": resumed.skipped,
+        "answered": resumed.succeeded,
+        "complete": completed_ids(output_path) == {q.id for q in read_questions(input_path)},
+    }
+    return reports, resume
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=24, help="Questions per batch.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8], help="Worker-pool sizes to compare.")
+    parser.add_argument("--loops", type=int, default=1, help="max_research_loops.")
+    parser.add_argument("--initial-queries", type=int, default=2, help="number_of_initial_queries.")
+    parser.add_argument("--search-latency", type=float, default=0.3, help="Seconds per stub search.")
+    parser.add_argument("--llm-latency", type=float, default=0.1, help="Stub seconds to first token.")
+    parser.add_argument("--token-rate", type=float, default=400.0, help="Stub generated tokens per second.")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SEARCH_CACHE_BACKEND", "none")
+    os.environ.setdefault("SUMMARY_CACHE_BACKEND", "none")
+    install_search_stub(args.search_latency)
+    with StubServer(latency=args.llm_latency, token_rate=args.token_rate) as server, tempfile.TemporaryDirectory() as workdir:
+        os.environ["OPENAI_API_BASE"] = server.base_url
+        os.environ["OPENAI_API_KEY"] = "stub"
+        reports, resume = asyncio.run(run_all(args, workdir))
+
+    print(f"{args.questions} questions, {args.loops} loop(s), {args.initial_queries} initial queries each")
+    print(f"{'workers':<9}{'wall s':>8}{'q/s':>8}{'mean s':>8}{'p95 s':>8}{'failed':>8}")
+    for concurrency, r in reports.items():
+        print(
+            f"{concurrency:<9}{r['seconds']:>8.2f}{r['questions_per_second']:>8.2f}"
+            f"{r['latency_mean']:>8.2f}{r['latency_p95']:>8.2f}{r['failed']:>8}"
+        )
+    base = reports[args.concurrency[0]]["questions_per_second"]
+    best = max(reports, key=lambda c: reports[c]["questions_per_second"])
+    print(f"throughput with {best} workers: {reports[best]['questions_per_second'] / base:.2f}x {args.concurrency[0]} worker(s)")
+    print(
+        f"resume: {resume['before']} done before the interruption, {resume['skipped']} skipped, "
+        f"{resume['answered']} answered, output complete: {resume['complete']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Checkpoint bytes written per research run, with and without the blob store.
+
+Runs the full graph against the stub OpenAI-compatible server with a
+checkpointer whose serializer counts every byte it produces: the checkpoints
+themselves and the pending writes. This is what a Postgres checkpointer would
+send per run. The same workload is run once with summaries kept inline in
+state (``blob_store_path=""``) and once with summaries moved to a temporary
+blob store. Several turns run on one thread, and the size of the state after
+the first and the last turn shows how the thread's checkpoints grow.
+
+Usage:
+    python benchmarks/checkpoint_size.py --loops 4 --completion-tokens 400 --turns 3
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+from langgraph.checkpoint.memory import InMemorySaver  # noqa: E402
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+from stubs import graph_module, install_search_stub  # noqa: E402
+
+from agent.blob_store import get_blob_store  # noqa: E402
+
+
+class CountingSerializer(JsonPlusSerializer):
+    """JsonPlus serializer that totals the bytes it serializes."""
+
+    def __init__(self):
+        super().__init__()
+        self.bytes = 0
+        self.calls = 0
+
+    def dumps_typed(self, obj):
+        kind, data = super().dumps_typed(obj)
+        self.bytes += len(data)
+        self.calls += 1
+        return kind, data
+
+
+def measure(args: argparse.Namespace, blob_store_path: str) -> dict:
+    serde = CountingSerializer()
+    graph = graph_module.builder.compile(checkpointer=InMemorySaver(serde=serde))
+    config = {
+        "configurable": {
+            "thread_id": f"checkpoint-size-{bool(blob_store_path)}",
+            "blob_store_path": blob_store_path,
+            "number_of_initial_queries": args.initial_queries,
+            "min_information_gain": 0,
+        }
+    }
+    state_bytes = []
+    for turn in range(args.turns):
+        inputs = {"messages": [HumanMessage(content=f"benchmark topic {turn}")], "max_research_loops": args.loops}
+        result = graph.invoke(inputs, config)
+        state_bytes.append(len(JsonPlusSerializer().dumps_typed(graph.get_state(config).values)[1]))
+    store = get_blob_store(blob_store_path)
+    return {
+        "checkpoint_bytes": serde.bytes / args.turns,
+        "serializations": serde.calls // args.turns,
+        "first_state_bytes": state_bytes[0],
+        "final_state_bytes": state_bytes[-1],
+        "blob_bytes": store.bytes_written if store else 0,
+        "summaries": len(result["web_research_result"]) // args.turns,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--loops", type=int, default=4, help="max_research_loops.")
+    parser.add_argument("--initial-queries", type=int, default=3, help="number_of_initial_queries.")
+    parser.add_argument("--completion-tokens", type=int, default=400, help="Stub summary length in tokens.")
+    parser.add_argument("--turns", type=int, default=3, help="Questions asked on the same thread.")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SEARCH_CACHE_BACKEND", "none")
+    os.environ.setdefault("SUMMARY_CACHE_BACKEND", "none")
+    install_search_stub(0.0)
+    blob_dir = tempfile.mkdtemp(prefix="blob-bench-")
+    try:
+        with StubServer(latency=0.0, token_rate=1e6, completion_tokens=args.completion_tokens) as server:
+            os.environ["OPENAI_API_BASE"] = server.base_url
+            os.environ["OPENAI_API_KEY"] = "stub"
+            inline = measure(args, "")
+            blobs = measure(args, blob_dir)
+    finally:
+        shutil.rmtree(blob_dir, ignore_errors=True)
+
+    print(
+        f"{args.turns} turns of {args.loops} loops, {inline['summaries']} summaries per turn "
+        f"of ~{args.completion_tokens} tokens"
+    )
+    print(f"{'':<10}{'checkpoint KB/run':>19}{'writes':>8}{'state KB turn 1':>17}{f'turn {args.turns}':>9}{'blob KB':>9}")
+    for name, r in (("inline", inline), ("blobs", blobs)):
+        print(
+            f"{name:<10}{r['checkpoint_bytes'] / 1024:>19.1f}{r['serializations']:>8}"
+            f"{r['first_state_bytes'] / 1024:>17.1f}{r['final_state_bytes'] / 1024:>9.1f}{r['blob_bytes'] / 1024:>9.1f}"
+        )
+    saved = 1 - blobs["checkpoint_bytes"] / inline["checkpoint_bytes"]
+    print(f"checkpoint bytes per run reduced by {saved:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Per-node configuration setup cost, before and after the resolved snapshot.
+
+Every node resolves its ``Configuration`` from the RunnableConfig (twice,
+counting the instrumentation check). This times that setup:
+
+* before: scan ``os.environ`` for every field and build and validate a new
+  pydantic model on each call, as ``from_runnable_config`` used to;
+* after: ``from_runnable_config`` with the environment read once and the
+  frozen snapshot reused for identical configurable values.
+
+Usage:
+    python benchmarks/config_resolution.py --calls 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Any
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from agent.configuration import Configuration, reload_configuration  # noqa: E402
+
+
+def resolve_uncached(config: dict) -> Configuration:
+    """The previous implementation: environment scan plus validation per call."""
+    configurable = config["configurable"] if config and "configurable" in config else {}
+    raw_values: dict[str, Any] = {
+        name: os.environ.get(name.upper(), configurable.get(name))
+        for name in Configuration.model_fields.keys()
+    }
+    values = {k: v for k, v in raw_values.items() if v is not None}
+    if "openai_api_key" in values and values["openai_api_key"] == "not_needed":
+        values["openai_api_key"] = None
+    return Configuration(**values)
+
+
+def time_calls(resolve, config: dict, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        resolve(config)
+    return (time.perf_counter() - start) / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000, help="Resolutions timed per variant.")
+    parser.add_argument("--nodes-per-run", type=int, default=30, help="Node executions in a typical run.")
+    args = parser.parse_args()
+
+    config = {
+        "configurable": {
+            "thread_id": "config-bench",
+            "number_of_initial_queries": 3,
+            "max_research_loops": 2,
+            "search_providers": "duckduckgo",
+        }
+    }
+    reload_configuration()
+    assert resolve_uncached(config) == Configuration.from_runnable_config(config)
+    before = time_calls(resolve_uncached, config, args.calls)
+    after = time_calls(Configuration.from_runnable_config, config, args.calls)
+
+    print(f"{len(Configuration.model_fields)} fields, {args.calls} resolutions each")
+    print(f"{'':<8}{'us/call':>10}{'us/run':>10}")
+    for name, seconds in (("before", before), ("after", after)):
+        per_run = seconds * 2 * args.nodes_per_run
+        print(f"{name:<8}{seconds * 1e6:>10.1f}{per_run * 1e6:>10.0f}")
+    print(f"setup cost per node reduced {before / after:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
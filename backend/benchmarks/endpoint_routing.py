@@ -0,0 +1,127 @@
+"""Research throughput across several LLM endpoints, with routing and failover.
+
+Starts ``--hosts`` stub OpenAI-compatible servers that each generate one
+request at a time (``--slots``), and runs the same concurrent research
+sessions three times:
+
+* ``single``: every role on the first host only (the old behaviour);
+* ``pool``: every role load-balanced across all hosts with ``--routing``;
+* ``pool+dead``: the same pool plus an endpoint nobody listens on, which is
+  tried, marked unhealthy and failed over from.
+
+Reports wall time, runs/s and, per endpoint, the calls routed to it, its
+failures, health and EWMA latency.
+
+Usage:
+    python benchmarks/endpoint_routing.py --hosts 2 --sessions 4 --routing least_outstanding
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+from stubs import graph_module, install_search_stub  # noqa: E402
+
+from agent.endpoints import endpoint_stats  # noqa: E402
+
+
+def dead_endpoint() -> str:
+    """An API base on a local port with nothing listening."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/v1"
+
+
+async def run_mode(args: argparse.Namespace, name: str, endpoints: list[str]) -> dict:
+    before = endpoint_stats()
+
+    async def one(i: int) -> dict:
+        config = {
+            "configurable": {
+                "thread_id": f"routing-{name}-{i}",
+                "llm_endpoints": ",".join(endpoints),
+                "llm_routing": args.routing,
+                "max_concurrent_llm_calls_per_model": args.llm_concurrency,
+                "number_of_initial_queries": args.initial_queries,
+                "min_information_gain": 0,
+                "stream_answer": False,
+            }
+        }
+        inputs = {"messages": [HumanMessage(content=f"topic {i}")], "max_research_loops": args.loops}
+        return await graph_module.graph.ainvoke(inputs, config)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+    after = endpoint_stats()
+    per_endpoint = {}
+    for api_base in endpoints:
+        stats, old = after.get(api_base, {}), before.get(api_base, {})
+        per_endpoint[api_base] = {
+            "routed": stats.get("routed", 0) - old.get("routed", 0),
+            "requests": stats.get("requests", 0) - old.get("requests", 0),
+            "failures": stats.get("failures", 0) - old.get("failures", 0),
+            "healthy": stats.get("healthy", 1),
+            "ewma": stats.get("ewma_latency_seconds", 0.0),
+        }
+    return {"seconds": elapsed, "runs_per_s": args.sessions / elapsed, "endpoints": per_endpoint}
+
+
+async def run_all(args: argparse.Namespace, hosts: list[str]) -> dict:
+    # One event loop for every mode: pooled async clients stay on it.
+    return {
+        "single": await run_mode(args, "single", hosts[:1]),
+        "pool": await run_mode(args, "pool", hosts),
+        "pool+dead": await run_mode(args, "pool+dead", [dead_endpoint(), *hosts]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=2, help="Stub LLM servers in the pool.")
+    parser.add_argument("--slots", type=int, default=1, help="Generations each stub runs at once.")
+    parser.add_argument("--routing", default="least_outstanding", help="llm_routing policy.")
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent research sessions.")
+    parser.add_argument("--loops", type=int, default=1, help="max_research_loops.")
+    parser.add_argument("--initial-queries", type=int, default=3, help="number_of_initial_queries.")
+    parser.add_argument("--llm-concurrency", type=int, default=2, help="max_concurrent_llm_calls_per_model (per endpoint).")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Stub seconds to first token.")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="Stub generated tokens per second.")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SEARCH_CACHE_BACKEND", "none")
+    os.environ.setdefault("SUMMARY_CACHE_BACKEND", "none")
+    # A server setting of the process-wide endpoint registry, not a per-run one.
+    os.environ.setdefault("LLM_HEALTH_CHECK_INTERVAL_SECONDS", "0")
+    install_search_stub(0.05)
+    with contextlib.ExitStack() as stack:
+        servers = [
+            stack.enter_context(StubServer(latency=args.llm_latency, token_rate=args.token_rate, slots=args.slots))
+            for _ in range(args.hosts)
+        ]
+        os.environ["OPENAI_API_KEY"] = "stub"
+        results = asyncio.run(run_all(args, [server.base_url for server in servers]))
+
+    print(f"{args.sessions} sessions, {args.hosts} hosts x {args.slots} slot(s), routing={args.routing}")
+    print(f"{'mode':<11}{'wall s':>8}{'runs/s':>8}   endpoint: routed/requests/failures, healthy, ewma s")
+    for name, r in results.items():
+        print(f"{name:<11}{r['seconds']:>8.2f}{r['runs_per_s']:>8.2f}")
+        for api_base, e in r["endpoints"].items():
+            print(
+                f"{'':<30}{api_base}: {e['routed']}/{e['requests']}/{e['failures']}, "
+                f"{'up' if e['healthy'] else 'down'}, {e['ewma']:.3f}"
+            )
+    print(f"pool speedup over single host: {results['single']['seconds'] / results['pool']['seconds']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Summarization throughput under fan-out, with and without LLM micro-batching.
+
+Runs concurrent research sessions against the stub OpenAI-compatible server
+configured as a local server that generates one request at a time
+(``--slots 1``). Every ``web_research`` branch summarizes its search results.
+With ``llm_batching`` off, each summary is its own chat call and waits for the
+one before it. With it on, summaries that arrive within the batching window
+share one ``/v1/completions`` request, which the server decodes in a single
+pass.
+
+Reports wall time, runs/s, summaries/s, the batches sent and their mean size.
+
+Usage:
+    python benchmarks/llm_batching.py --sessions 4 --initial-queries 3 --slots 1
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+from stubs import graph_module, install_search_stub  # noqa: E402
+
+from agent import batching  # noqa: E402
+
+
+async def run_mode(args: argparse.Namespace, batched: bool) -> dict:
+    async def one(i: int) -> dict:
+        config = {
+            "configurable": {
+                "thread_id": f"batching-{batched}-{i}",
+                "llm_batching": batched,
+                "llm_batch_window_ms": args.window_ms,
+                "llm_batch_max_size": args.max_size,
+                "number_of_initial_queries": args.initial_queries,
+                "max_concurrent_llm_calls_per_model": args.llm_concurrency,
+                "min_information_gain": 0,
+                "stream_answer": False,
+            }
+        }
+        inputs = {"messages": [HumanMessage(content=f"topic {i}")], "max_research_loops": args.loops}
+        return await graph_module.graph.ainvoke(inputs, config)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+    summaries = sum(len(result["web_research_result"]) for result in results)
+    batches = prompts = 0
+    for batcher in batching._batchers.values():
+        batches += batcher.batches
+        prompts += batcher.prompts
+        batcher.batches = batcher.prompts = 0
+    return {
+        "seconds": elapsed,
+        "runs_per_s": args.sessions / elapsed,
+        "summaries": summaries,
+        "summaries_per_s": summaries / elapsed,
+        "batches": batches,
+        "mean_batch": prompts / batches if batches else 0.0,
+    }
+
+
+async def run_all(args: argparse.Namespace) -> dict:
+    # One event loop for both modes: pooled async clients stay on it.
+    return {"off": await run_mode(args, False), "on": await run_mode(args, True)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent research sessions.")
+    parser.add_argument("--initial-queries", type=int, default=3, help="number_of_initial_queries.")
+    parser.add_argument("--loops", type=int, default=1, help="max_research_loops.")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="max_concurrent_llm_calls_per_model.")
+    parser.add_argument("--window-ms", type=float, default=20.0, help="llm_batch_window_ms.")
+    parser.add_argument("--max-size", type=int, default=8, help="llm_batch_max_size.")
+    parser.add_argument("--slots", type=int, default=1, help="Stub generations run at once (0 = unlimited).")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Stub seconds to first token.")
+    parser.add_argument("--token-rate", type=float, default=100.0, help="Stub generated tokens per second.")
+    parser.add_argument("--completion-tokens", type=int, default=60, help="Stub summary length in tokens.")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SEARCH_CACHE_BACKEND", "none")
+    os.environ.setdefault("SUMMARY_CACHE_BACKEND", "none")
+    install_search_stub(0.05)
+    with StubServer(
+        latency=args.llm_latency,
+        token_rate=args.token_rate,
+        completion_tokens=args.completion_tokens,
+        slots=args.slots,
+    ) as server:
+        os.environ["OPENAI_API_BASE"] = server.base_url
+        os.environ["OPENAI_API_KEY"] = "stub"
+        results = asyncio.run(run_all(args))
+
+    print(
+        f"{args.sessions} sessions x {args.initial_queries} queries x {args.loops} loops, "
+        f"server slots={args.slots or 'unlimited'}"
+    )
+    print(f"{'batching':<10}{'wall s':>8}{'runs/s':>8}{'summaries':>11}{'summ/s':>8}{'batches':>9}{'mean size':>11}")
+    for name, r in results.items():
+        print(
+            f"{name:<10}{r['seconds']:>8.2f}{r['runs_per_s']:>8.2f}{r['summaries']:>11}"
+            f"{r['summaries_per_s']:>8.2f}{r['batches']:>9}{r['mean_batch']:>11.1f}"
+        )
+    speedup = results["off"]["seconds"] / results["on"]["seconds"]
+    print(f"throughput gain with batching: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
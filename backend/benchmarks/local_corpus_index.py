@@ -0,0 +1,126 @@
+"""Build and query benchmark for the local corpus BM25 index.
+
+Generates a synthetic corpus (Zipf-distributed vocabulary, fixed-length
+passages) for each requested size, then measures:
+
+* build time and passages/s for a fresh index (multi-segment),
+* on-disk size,
+* time to open the index (mmap, no data loaded),
+* query latency p50/p95 over random 3-term queries,
+* incremental ingest of 1% more passages into the existing index.
+
+Usage:
+    python benchmarks/local_corpus_index.py --sizes 10000,100000
+    python benchmarks/local_corpus_index.py --sizes 1000000 --queries 200
+"""
+
+import argparse
+import itertools
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from agent.local_corpus import CorpusIndex  # noqa: E402
+
+VOCABULARY = 50_000
+
+
+def _word(i: int) -> str:
+    # Pronounceable-ish distinct tokens: w0, w1, ... would tokenize fine too,
+    # but letters keep the token lengths realistic.
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    out = ""
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        out = letters[r] + out
+    return out + "x"
+
+
+def synthetic_documents(count: int, words_per_passage: int, seed: int):
+    rng = random.Random(seed)
+    vocabulary = [_word(i) for i in range(VOCABULARY)]
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(VOCABULARY)))
+    for i in range(count):
+        words = rng.choices(vocabulary, cum_weights=cum_weights, k=words_per_passage)
+        yield f"synthetic/doc-{seed}-{i}.txt", f"doc-{i}", " ".join(words)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def bench(size: int, args: argparse.Namespace) -> dict:
+    directory = tempfile.mkdtemp(prefix="corpus-bench-")
+    try:
+        index = CorpusIndex(directory, segment_docs=args.segment_docs)
+        start = time.perf_counter()
+        index.add_documents(synthetic_documents(size, args.words, seed=1), chunk_words=args.words)
+        build_seconds = time.perf_counter() - start
+        index.close()
+
+        start = time.perf_counter()
+        index = CorpusIndex(directory, segment_docs=args.segment_docs)
+        open_ms = (time.perf_counter() - start) * 1000
+
+        rng = random.Random(2)
+        vocabulary = [_word(i) for i in range(2000)]  # queries use common-to-mid terms
+        latencies = []
+        for _ in range(args.queries):
+            query = " ".join(rng.sample(vocabulary, 3))
+            start = time.perf_counter()
+            index.search(query, k=5)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        extra = max(1, size // 100)
+        start = time.perf_counter()
+        index.add_documents(synthetic_documents(extra, args.words, seed=3), chunk_words=args.words)
+        ingest_seconds = time.perf_counter() - start
+        stats = index.stats()
+        index.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        "passages": size,
+        "build_seconds": build_seconds,
+        "passages_per_second": size / build_seconds,
+        "index_mb": stats["bytes"] / 1e6,
+        "segments": stats["segments"],
+        "open_ms": open_ms,
+        "query_p50_ms": _percentile(latencies, 50),
+        "query_p95_ms": _percentile(latencies, 95),
+        "incremental_passages": extra,
+        "incremental_seconds": ingest_seconds,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000", help="Comma-separated corpus sizes in passages.")
+    parser.add_argument("--words", type=int, default=120, help="Words per passage.")
+    parser.add_argument("--queries", type=int, default=100, help="Queries timed per size.")
+    parser.add_argument("--segment-docs", type=int, default=50_000, help="Passages per segment.")
+    args = parser.parse_args()
+
+    print(
+        f"{'passages':>10}{'build s':>10}{'pass/s':>10}{'MB':>9}{'segs':>6}"
+        f"{'open ms':>9}{'q p50 ms':>10}{'q p95 ms':>10}{'+1% s':>8}"
+    )
+    for size in (int(s) for s in args.sizes.split(",")):
+        r = bench(size, args)
+        print(
+            f"{r['passages']:>10}{r['build_seconds']:>10.1f}{r['passages_per_second']:>10.0f}"
+            f"{r['index_mb']:>9.1f}{r['segments']:>6}{r['open_ms']:>9.2f}"
+            f"{r['query_p50_ms']:>10.2f}{r['query_p95_ms']:>10.2f}{r['incremental_seconds']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Prompt size and latency per turn as a chat grows, with and without compaction.
+
+Plays one long conversation per mode on a checkpointed thread against the
+stub OpenAI-compatible server. Prompt processing is charged at
+``--prefill-rate`` tokens/s, so a longer topic costs time. With
+``history_window_messages=0`` every run sends the whole chat as the research
+topic. With a window, older turns are folded into a rolling summary.
+
+Every ``--every`` turns it reports the run's prompt tokens, the LLM calls
+made, the run latency and the time spent building the research topic
+(``get_research_topic`` over the full history).
+
+Usage:
+    python benchmarks/long_chat.py --turns 30 --window 8
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+from langgraph.checkpoint.memory import InMemorySaver  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+from stubs import graph_module, install_search_stub  # noqa: E402
+
+from agent.utils import get_research_topic  # noqa: E402
+
+
+def play(args: argparse.Namespace, window: int) -> list[dict]:
+    graph = graph_module.builder.compile(checkpointer=InMemorySaver())
+    config = {
+        "configurable": {
+            "thread_id": f"long-chat-{window}",
+            "history_window_messages": window,
+            "number_of_initial_queries": 1,
+            "min_information_gain": 0,
+        }
+    }
+    rows = []
+    for turn in range(1, args.turns + 1):
+        question = f"Follow-up question number {turn}: what about aspect {turn} of the topic?"
+        start = time.perf_counter()
+        result = graph.invoke({"messages": [HumanMessage(content=question)], "max_research_loops": 1}, config)
+        seconds = time.perf_counter() - start
+        spans = result["node_metrics"]  # run-scoped: cleared at the start of each run
+        topic_start = time.perf_counter()
+        get_research_topic(result["messages"])
+        rows.append(
+            {
+                "turn": turn,
+                "messages": len(result["messages"]),
+                "prompt_tokens": sum(span["prompt_tokens"] for span in spans),
+                "llm_calls": sum(span["llm_calls"] for span in spans),
+                "seconds": seconds,
+                "topic_ms": (time.perf_counter() - topic_start) * 1000,
+            }
+        )
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=30, help="Questions asked in the conversation.")
+    parser.add_argument("--window", type=int, default=8, help="history_window_messages for the compacted run.")
+    parser.add_argument("--every", type=int, default=5, help="Report every this many turns.")
+    parser.add_argument("--completion-tokens", type=int, default=150, help="Stub answer length in tokens.")
+    parser.add_argument("--prefill-rate", type=float, default=4000.0, help="Stub prompt tokens per second.")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SEARCH_CACHE_BACKEND", "none")
+    os.environ.setdefault("SUMMARY_CACHE_BACKEND", "none")
+    install_search_stub(0.0)
+    with StubServer(
+        latency=0.0, token_rate=0, completion_tokens=args.completion_tokens, prefill_rate=args.prefill_rate
+    ) as server:
+        os.environ["OPENAI_API_BASE"] = server.base_url
+        os.environ["OPENAI_API_KEY"] = "stub"
+        results = {"full": play(args, 0), f"window={args.window}": play(args, args.window)}
+
+    print(f"{args.turns} turns, ~{args.completion_tokens}-token answers, prefill {args.prefill_rate:.0f} tok/s")
+    print(f"{'history':<11}{'turn':>5}{'msgs':>6}{'prompt tok':>12}{'LLM calls':>11}{'run s':>8}")
+    for name, rows in results.items():
+        for row in rows:
+            if row["turn"] == 1 or row["turn"] % args.every == 0:
+                print(
+                    f"{name:<11}{row['turn']:>5}{row['messages']:>6}{row['prompt_tokens']:>12}"
+                    f"{row['llm_calls']:>11}{row['seconds']:>8.2f}"
+                )
+    last = {name: rows[-1] for name, rows in results.items()}
+    full, compact = last["full"], last[f"window={args.window}"]
+    print(
+        f"last turn: {compact['prompt_tokens']} vs {full['prompt_tokens']} prompt tokens "
+        f"({compact['prompt_tokens'] / full['prompt_tokens']:.0%}), "
+        f"{compact['seconds']:.2f}s vs {full['seconds']:.2f}s"
+    )
+    print(f"get_research_topic over {full['messages']} messages: {full['topic_ms']:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Single-call vs map-reduce summarization of a large search payload.
+
+Runs ``web_research``'s summarization step against the stub OpenAI-compatible
+server, whose latency grows with prompt size (``--prefill-rate``) and
+completion length. It then compares the single-call path with the chunked
+map-reduce path on the same payload, on both the sync and the async
+implementation.
+
+The savings depend on the server running calls concurrently (continuous
+batching or several replicas). ``--llm-concurrency`` caps the parallel map
+calls, just like ``max_concurrent_llm_calls_per_model`` does in the agent.
+
+Usage:
+    python benchmarks/map_reduce_summary.py --payload-tokens 12000 --chunk-tokens 1500
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from stub_server import StubServer  # noqa: E402
+from stubs import graph_module  # noqa: E402
+
+from agent.configuration import Configuration  # noqa: E402
+
+
+def synthetic_payload(tokens: int) -> str:
+    results, i = [], 0
+    while sum(len(r) for r in results) < tokens * 4:
+        i += 1
+        results.append(
+            f"[{i}] Result {i}: report on the topic\nhttps://example.com/report/{i}\n"
+            + " ".join(f"Finding {i}.{j} describes a measured effect of {j * 3} percent." for j in range(12))
+        )
+    return "\n\n".join(results)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--payload-tokens", type=int, default=12000, help="Size of the search payload.")
+    parser.add_argument("--chunk-tokens", type=int, default=1500, help="summary_chunk_tokens.")
+    parser.add_argument("--llm-concurrency", type=int, default=4, help="max_concurrent_llm_calls_per_model.")
+    parser.add_argument("--latency", type=float, default=0.1, help="Stub seconds to first token.")
+    parser.add_argument("--prefill-rate", type=float, default=1000.0, help="Stub prompt tokens per second.")
+    parser.add_argument("--token-rate", type=float, default=100.0, help="Stub generated tokens per second.")
+    parser.add_argument("--completion-tokens", type=int, default=150, help="Stub summary length.")
+    args = parser.parse_args()
+
+    payload = synthetic_payload(args.payload_tokens)
+    state = {"search_query": "benchmark topic", "id": 0}
+    with StubServer(
+        latency=args.latency,
+        token_rate=args.token_rate,
+        completion_tokens=args.completion_tokens,
+        prefill_rate=args.prefill_rate,
+    ) as server:
+        base = dict(
+            openai_api_base=server.base_url,
+            openai_api_key="stub",
+            stream_research_summaries=False,
+            summary_chunk_tokens=args.chunk_tokens,
+            max_concurrent_llm_calls_per_model=args.llm_concurrency,
+        )
+        single = Configuration(**base, summary_map_reduce_threshold_tokens=0)
+        chunked = Configuration(**base, summary_map_reduce_threshold_tokens=args.chunk_tokens)
+
+        print(f"payload ~{args.payload_tokens} tokens, chunks of <= {args.chunk_tokens}, {args.llm_concurrency} concurrent calls")
+
+        def report_line(mode: str, timings: dict) -> None:
+            single_seconds = timings["single"][0]
+            mr_seconds, report = timings["map-reduce"]
+            print(
+                f"{mode:>5}: single call {single_seconds:.2f}s | map-reduce {mr_seconds:.2f}s "
+                f"({report['chunks']} chunks, {report['reduce_calls']} reduce calls, "
+                f"{report['saved_seconds']:.2f}s saved by parallel map) | "
+                f"saving vs single call {single_seconds - mr_seconds:+.2f}s"
+            )
+
+        timings = {}
+        for name, configurable in (("single", single), ("map-reduce", chunked)):
+            start = time.perf_counter()
+            _, _, report = graph_module._summarize(state, configurable, {}, payload)
+            timings[name] = (time.perf_counter() - start, report)
+        report_line("sync", timings)
+
+        # One event loop for both async passes: the pooled async HTTP client
+        # belongs to the loop that first used it.
+        async def run_async() -> dict:
+            timings = {}
+            for name, configurable in (("single", single), ("map-reduce", chunked)):
+                start = time.perf_counter()
+                _, _, report = await graph_module._asummarize(state, configurable, {}, payload)
+                timings[name] = (time.perf_counter() - start, report)
+            return timings
+
+        report_line("async", asyncio.run(run_async()))
+
+
+if __name__ == "__main__":
+    main()
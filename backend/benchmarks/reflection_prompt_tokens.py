@@ -0,0 +1,50 @@
+"""Measure reflection prompt size per loop, full-history vs incremental mode.
+
+Runs the graph against stubbed LLM/search calls and prints the estimated
+prompt tokens that ``reflection`` sent on every loop.
+
+Usage:
+    python benchmarks/reflection_prompt_tokens.py --loops 8 --summary-chars 2000
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+os.environ.setdefault("SEARCH_CACHE_BACKEND", "none")
+os.environ.setdefault("SUMMARY_CACHE_BACKEND", "none")
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+from stubs import graph_module, install_stubs  # noqa: E402
+
+
+def prompt_tokens_per_loop(loops: int, incremental: bool) -> list[int]:
+    result = graph_module.graph.invoke(
+        {"messages": [HumanMessage(content="Research question")]},
+        {
+            "configurable": {"incremental_reflection": incremental, "max_research_loops": loops},
+            "recursion_limit": 10 * loops + 10,
+        },
+    )
+    return result["reflection_prompt_tokens"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--loops", type=int, default=6, help="Research loops to run.")
+    parser.add_argument("--summary-chars", type=int, default=2000, help="Length of each stub summary.")
+    args = parser.parse_args()
+
+    install_stubs(0.0, 0.0, summary_chars=args.summary_chars)
+    full = prompt_tokens_per_loop(args.loops, incremental=False)
+    incremental = prompt_tokens_per_loop(args.loops, incremental=True)
+
+    print(f"{'loop':>4} {'full':>8} {'incremental':>12}")
+    for loop, (before, after) in enumerate(zip(full, incremental), start=1):
+        print(f"{loop:>4} {before:>8} {after:>12}")
+    print(f" sum {sum(full):>8} {sum(incremental):>12}")
+
+
+if __name__ == "__main__":
+    main()
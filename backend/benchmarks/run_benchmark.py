@@ -0,0 +1,203 @@
+"""Offline end-to-end benchmark of the research graph.
+
+Starts the stub OpenAI-compatible server (``stub_server.py``) on a free local
+port, points the agent's LLM clients at it, replaces the web search with a
+fake that sleeps for a fixed latency, then runs research sessions with a
+bounded number in flight. The real ``ChatOpenAI`` clients, HTTP pools,
+structured-output parsing, limiters and streaming are all exercised; only the
+model and the search engine are simulated.
+
+Reports p50/p95/max end-to-end latency, runs/second, and a per-node breakdown
+(calls, mean/p95 seconds, queue/search/LLM phases, tokens) from the
+``node_metrics`` the graph records. ``--max-p95`` and ``--min-throughput``
+turn it into a gate: the exit status is 1 when a threshold is missed.
+
+Usage:
+    python benchmarks/run_benchmark.py --sessions 32 --concurrency 8 --llm-latency 0.2
+    python benchmarks/run_benchmark.py --json results.json --max-p95 5 --min-throughput 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+from stubs import graph_module, install_search_stub  # noqa: E402
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile (``pct`` in 0-100) of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def _config(args: argparse.Namespace, i: int) -> dict:
+    return {
+        "configurable": {
+            "thread_id": f"bench-{i}",
+            "number_of_initial_queries": args.initial_queries,
+            "max_research_loops": args.loops,
+            "max_concurrent_searches": args.search_concurrency,
+            "max_concurrent_llm_calls_per_model": args.llm_concurrency,
+        }
+    }
+
+
+def _inputs(i: int) -> dict:
+    return {"messages": [HumanMessage(content=f"Benchmark research question {i}")]}
+
+
+async def _run_async(args: argparse.Namespace) -> list[tuple[float, dict]]:
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int) -> tuple[float, dict]:
+        async with semaphore:
+            start = time.perf_counter()
+            result = await graph_module.graph.ainvoke(_inputs(i), _config(args, i))
+            return time.perf_counter() - start, result
+
+    return await asyncio.gather(*(one(i) for i in range(args.sessions)))
+
+
+def _run_sync(args: argparse.Namespace) -> list[tuple[float, dict]]:
+    def one(i: int) -> tuple[float, dict]:
+        start = time.perf_counter()
+        result = graph_module.graph.invoke(_inputs(i), _config(args, i))
+        return time.perf_counter() - start, result
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        return list(pool.map(one, range(args.sessions)))
+
+
+def node_breakdown(results: list[dict]) -> dict[str, dict]:
+    """Aggregate ``node_metrics`` spans across runs, per node."""
+    spans: dict[str, list[dict]] = defaultdict(list)
+    for result in results:
+        for span in result.get("node_metrics", []):
+            spans[span["node"]].append(span)
+    breakdown = {}
+    for node, node_spans in spans.items():
+        seconds = [span["seconds"] for span in node_spans]
+        phases: dict[str, float] = defaultdict(float)
+        for span in node_spans:
+            for phase, value in span["phases"].items():
+                phases[phase] += value
+        breakdown[node] = {
+            "calls": len(node_spans),
+            "mean_seconds": statistics.fmean(seconds),
+            "p95_seconds": percentile(seconds, 95),
+            "mean_phase_seconds": {phase: total / len(node_spans) for phase, total in phases.items()},
+            "prompt_tokens": sum(span["prompt_tokens"] for span in node_spans),
+            "completion_tokens": sum(span["completion_tokens"] for span in node_spans),
+            "retries": sum(span["retries"] for span in node_spans),
+        }
+    return breakdown
+
+
+def run(args: argparse.Namespace) -> dict:
+    """Run the benchmark and return its report."""
+    # Each benchmark run must hit the stub server, not results cached by an
+    # earlier session or a previous invocation.
+    os.environ.setdefault("SEARCH_CACHE_BACKEND", "none")
+    os.environ.setdefault("SUMMARY_CACHE_BACKEND", "none")
+    install_search_stub(args.search_latency)
+
+    with StubServer(
+        latency=args.llm_latency,
+        token_rate=args.token_rate,
+        completion_tokens=args.completion_tokens,
+    ) as server:
+        os.environ["OPENAI_API_BASE"] = server.base_url
+        os.environ["OPENAI_API_KEY"] = "stub"
+        start = time.perf_counter()
+        if args.mode == "async":
+            timed = asyncio.run(_run_async(args))
+        else:
+            timed = _run_sync(args)
+        elapsed = time.perf_counter() - start
+        llm_requests = server.model.requests
+
+    latencies = [seconds for seconds, _ in timed]
+    return {
+        "mode": args.mode,
+        "sessions": args.sessions,
+        "concurrency": args.concurrency,
+        "elapsed_seconds": elapsed,
+        "runs_per_second": args.sessions / elapsed,
+        "latency_seconds": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "max": max(latencies),
+        },
+        "llm_requests": llm_requests,
+        "stop_reasons": dict(Counter(result.get("stop_reason") or "none" for _, result in timed)),
+        "nodes": node_breakdown([result for _, result in timed]),
+    }
+
+
+def print_report(report: dict) -> None:
+    latency = report["latency_seconds"]
+    print(
+        f"{report['sessions']} sessions ({report['mode']}, {report['concurrency']} in flight) "
+        f"in {report['elapsed_seconds']:.2f}s: {report['runs_per_second']:.2f} runs/s, "
+        f"{report['llm_requests']} LLM requests"
+    )
+    print(f"end-to-end latency: p50 {latency['p50']:.2f}s  p95 {latency['p95']:.2f}s  max {latency['max']:.2f}s")
+    print("research stopped by: " + ", ".join(f"{reason} x{n}" for reason, n in report["stop_reasons"].items()))
+    print()
+    print(f"{'node':<18}{'calls':>7}{'mean s':>9}{'p95 s':>9}{'queue s':>9}{'search s':>10}{'llm s':>8}{'tokens':>10}")
+    for node, stats in report["nodes"].items():
+        phases = stats["mean_phase_seconds"]
+        print(
+            f"{node:<18}{stats['calls']:>7}{stats['mean_seconds']:>9.3f}{stats['p95_seconds']:>9.3f}"
+            f"{phases.get('queue_wait', 0.0):>9.3f}{phases.get('search', 0.0):>10.3f}"
+            f"{phases.get('llm', 0.0):>8.3f}{stats['prompt_tokens'] + stats['completion_tokens']:>10}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=16, help="Research sessions to run in total.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Sessions in flight at once.")
+    parser.add_argument("--mode", choices=("async", "sync"), default="async", help="Graph execution path.")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Stub LLM seconds to first token.")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="Stub LLM tokens per second.")
+    parser.add_argument("--completion-tokens", type=int, default=120, help="Length of free-text completions.")
+    parser.add_argument("--search-latency", type=float, default=0.3, help="Seconds per fake search.")
+    parser.add_argument("--initial-queries", type=int, default=3, help="number_of_initial_queries.")
+    parser.add_argument("--loops", type=int, default=2, help="max_research_loops.")
+    parser.add_argument("--search-concurrency", type=int, default=4, help="max_concurrent_searches.")
+    parser.add_argument("--llm-concurrency", type=int, default=4, help="max_concurrent_llm_calls_per_model.")
+    parser.add_argument("--json", metavar="PATH", help="Also write the report as JSON.")
+    parser.add_argument("--max-p95", type=float, help="Fail if p95 latency exceeds this many seconds.")
+    parser.add_argument("--min-throughput", type=float, help="Fail if runs/s falls below this.")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    failures = []
+    if args.max_p95 is not None and report["latency_seconds"]["p95"] > args.max_p95:
+        failures.append(f"p95 {report['latency_seconds']['p95']:.2f}s > {args.max_p95}s")
+    if args.min_throughput is not None and report["runs_per_second"] < args.min_throughput:
+        failures.append(f"{report['runs_per_second']:.2f} runs/s < {args.min_throughput}")
+    if failures:
+        print("\nFAILED: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Latency of repeated research topics with and without the run-level cache.
+
+Replays a workload where users keep asking a few questions, with small
+spelling differences (case, spacing, trailing punctuation), against the stub
+OpenAI-compatible server and a stub search provider. It runs three times:
+the run cache off, ``run_cache_mode="summaries"`` (reuse the research and
+regenerate the answer) and ``run_cache_mode="answer"`` (return the stored
+answer).
+
+Reports mean and p95 run latency, the cache hits and the LLM calls made.
+
+Usage:
+    python benchmarks/run_cache.py --runs 24 --topics 4
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+from run_benchmark import percentile  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+from stubs import graph_module, install_search_stub  # noqa: E402
+
+VARIANTS = (str, str.lower, lambda q: q.upper(), lambda q: f"  {q}?", lambda q: q.replace(" ", "  "))
+
+
+def workload(runs: int, topics: int, label: str, seed: int = 0) -> list[str]:
+    # Each mode asks its own questions so it starts with a cold cache.
+    rng = random.Random(seed)
+    questions = [f"What changed in {label} solar panel efficiency, part {i}" for i in range(topics)]
+    return [rng.choice(VARIANTS)(rng.choice(questions)) for _ in range(runs)]
+
+
+async def run_mode(args: argparse.Namespace, server: StubServer, backend: str, mode: str) -> dict:
+    latencies, hits = [], 0
+    requests_before = server.model.requests
+    for i, question in enumerate(workload(args.runs, args.topics, mode)):
+        config = {
+            "configurable": {
+                "thread_id": f"run-cache-{backend}-{mode}-{i}",
+                "run_cache_backend": backend,
+                "run_cache_mode": mode,
+                "number_of_initial_queries": args.initial_queries,
+                "min_information_gain": 0,
+            }
+        }
+        inputs = {"messages": [HumanMessage(content=question)], "max_research_loops": args.loops}
+        start = time.perf_counter()
+        result = await graph_module.graph.ainvoke(inputs, config)
+        latencies.append(time.perf_counter() - start)
+        hits += (result.get("run_cache") or {}).get("status") in ("answer", "summaries")
+    return {
+        "mean": sum(latencies) / len(latencies),
+        "p95": percentile(latencies, 95),
+        "hits": hits,
+        "llm_calls": server.model.requests - requests_before,
+    }
+
+
+async def run_all(args: argparse.Namespace, server: StubServer) -> dict:
+    # One event loop for every mode: pooled async clients stay on it.
+    return {
+        "off": await run_mode(args, server, "none", "answer"),
+        "summaries": await run_mode(args, server, "memory", "summaries"),
+        "answer": await run_mode(args, server, "memory", "answer"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=24, help="Questions asked per mode.")
+    parser.add_argument("--topics", type=int, default=4, help="Distinct questions among them.")
+    parser.add_argument("--loops", type=int, default=2, help="max_research_loops.")
+    parser.add_argument("--initial-queries", type=int, default=3, help="number_of_initial_queries.")
+    parser.add_argument("--search-latency", type=float, default=0.3, help="Seconds per stub search.")
+    parser.add_argument("--llm-latency", type=float, default=0.1, help="Stub seconds to first token.")
+    parser.add_argument("--token-rate", type=float, default=400.0, help="Stub generated tokens per second.")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SEARCH_CACHE_BACKEND", "none")
+    os.environ.setdefault("SUMMARY_CACHE_BACKEND", "none")
+    install_search_stub(args.search_latency)
+    with StubServer(latency=args.llm_latency, token_rate=args.token_rate) as server:
+        os.environ["OPENAI_API_BASE"] = server.base_url
+        os.environ["OPENAI_API_KEY"] = "stub"
+        results = asyncio.run(run_all(args, server))
+
+    print(f"{args.runs} runs over {args.topics} topics (spelling variants), {args.loops} loops each")
+    print(f"{'run cache':<11}{'mean s':>8}{'p95 s':>8}{'hits':>6}{'LLM calls':>11}")
+    for name, r in results.items():
+        print(f"{name:<11}{r['mean']:>8.2f}{r['p95']:>8.2f}{r['hits']:>6}{r['llm_calls']:>11}")
+    for name in ("summaries", "answer"):
+        print(f"mean latency with '{name}': {results[name]['mean'] / results['off']['mean']:.0%} of uncached")
+
+
+if __name__ == "__main__":
+    main()
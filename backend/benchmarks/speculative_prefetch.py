@@ -0,0 +1,106 @@
+"""End-to-end latency with and without speculative follow-up prefetch.
+
+Runs the same research sessions against the stub OpenAI-compatible server
+and a slow stub search provider, first with ``speculative_prefetch`` off and
+then on. The stub reflection returns ``--follow-ups`` follow-up queries and
+generates at ``--token-rate`` tokens/s. With ``incremental_reflection`` (the
+default here, ``--no-incremental`` turns it off), the knowledge state of
+``--completion-tokens`` tokens is generated after the follow-ups, which are
+searched meanwhile.
+
+Reports mean and p95 run latency and the speculative searches launched,
+used and wasted.
+
+Usage:
+    python benchmarks/speculative_prefetch.py --sessions 4 --search-latency 1.5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+from run_benchmark import percentile  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+from stubs import graph_module, install_search_stub  # noqa: E402
+
+
+async def run_mode(args: argparse.Namespace, prefetch: bool) -> dict:
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int) -> tuple[float, dict]:
+        config = {
+            "configurable": {
+                "thread_id": f"prefetch-{prefetch}-{i}",
+                "speculative_prefetch": prefetch,
+                "number_of_initial_queries": args.initial_queries,
+                "min_information_gain": 0,
+                "max_concurrent_llm_calls_per_model": args.llm_concurrency,
+                "incremental_reflection": args.incremental,
+            }
+        }
+        inputs = {"messages": [HumanMessage(content=f"topic {i}")], "max_research_loops": args.loops}
+        async with semaphore:
+            start = time.perf_counter()
+            result = await graph_module.graph.ainvoke(inputs, config)
+            return time.perf_counter() - start, result
+
+    timed = await asyncio.gather(*(one(i) for i in range(args.sessions)))
+    latencies = [seconds for seconds, _ in timed]
+    stats = {"launched": 0, "used": 0, "wasted": 0}
+    for _, result in timed:
+        for key in stats:
+            stats[key] += (result.get("prefetch_stats") or {}).get(key, 0)
+    return {
+        "mean": sum(latencies) / len(latencies),
+        "p95": percentile(latencies, 95),
+        **stats,
+    }
+
+
+async def run_all(args: argparse.Namespace) -> dict:
+    # One event loop for both modes: pooled async clients stay on it.
+    return {"off": await run_mode(args, False), "on": await run_mode(args, True)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=4, help="Research sessions per mode.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Sessions in flight at once.")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="max_concurrent_llm_calls_per_model.")
+    parser.add_argument("--loops", type=int, default=3, help="max_research_loops.")
+    parser.add_argument("--initial-queries", type=int, default=2, help="number_of_initial_queries.")
+    parser.add_argument("--follow-ups", type=int, default=3, help="Follow-up queries per reflection.")
+    parser.add_argument("--search-latency", type=float, default=1.0, help="Seconds per stub search.")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Stub seconds to first token.")
+    parser.add_argument("--token-rate", type=float, default=30.0, help="Stub generated tokens per second.")
+    parser.add_argument("--completion-tokens", type=int, default=30, help="Stub summary and knowledge state length.")
+    parser.add_argument("--no-incremental", dest="incremental", action="store_false", help="Plain reflection.")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUMMARY_CACHE_BACKEND", "none")
+    install_search_stub(args.search_latency)
+    with StubServer(
+        latency=args.llm_latency,
+        token_rate=args.token_rate,
+        completion_tokens=args.completion_tokens,
+        list_queries=args.follow_ups,
+    ) as server:
+        os.environ["OPENAI_API_BASE"] = server.base_url
+        os.environ["OPENAI_API_KEY"] = "stub"
+        results = asyncio.run(run_all(args))
+
+    print(f"{args.sessions} sessions, {args.loops} loops, {args.follow_ups} follow-ups, {args.search_latency}s searches")
+    print(f"{'prefetch':<10}{'mean s':>8}{'p95 s':>8}{'launched':>10}{'used':>6}{'wasted':>8}")
+    for name, r in results.items():
+        print(f"{name:<10}{r['mean']:>8.2f}{r['p95']:>8.2f}{r['launched']:>10}{r['used']:>6}{r['wasted']:>8}")
+    saved = results["off"]["mean"] - results["on"]["mean"]
+    print(f"mean latency saved per run: {saved:.2f}s ({saved / results['off']['mean']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""Offline stand-in for an OpenAI-compatible LLM server (LM Studio, vLLM, ...).
+
+Serves just enough of the API for the agent's ``ChatOpenAI`` clients:
+
+* ``POST /v1/chat/completions``: plain text, SSE streaming, structured output
+  through ``response_format`` (``json_schema``/``json_object``) or tool calls,
+  with output generated from the request's JSON schema
+  (``SearchQueryList``, ``Reflection``, ...);
+* ``POST /v1/completions``: a string or a list of prompts (one choice per
+  prompt), for batched calls;
+* ``GET /v1/models``.
+
+Latency is modelled per request as a fixed time to first token, plus prompt
+processing at ``prefill_rate`` tokens/s (off by default), plus generation at
+``token_rate`` tokens/s, so concurrent sessions see realistic overlap.
+``slots`` caps the generations running at once (0 = unlimited); ``slots=1``
+models a local server that handles one request at a time, where a batched
+``/v1/completions`` request still counts as one generation.
+Only the standard library is used; everything runs on a CPU-only box with no
+network access.
+
+Usage:
+    python benchmarks/stub_server.py --port 1234 --latency 0.2 --token-rate 200
+"""
+
+import argparse
+import contextlib
+import itertools
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+# Canned prose for free-text completions; the URL lets the agent "cite" it.
+_TEXT = (
+    "Stub findings about the topic with supporting detail from https://example.com/source "
+    "and further context that a research summary would normally contain."
+).split(" ")
+
+
+def _estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+class StubModel:
+    """Generates completions and their timing for the stub server."""
+
+    def __init__(
+        self,
+        latency: float = 0.2,
+        token_rate: float = 200.0,
+        completion_tokens: int = 120,
+        prefill_rate: float = 0.0,
+        list_queries: int = 1,
+        prose_fields: tuple[str, ...] = ("knowledge_state",),
+        slots: int = 0,
+    ):
+        self.latency = latency
+        self.token_rate = token_rate
+        self.completion_tokens = completion_tokens
+        self.prefill_rate = prefill_rate
+        self.list_queries = list_queries
+        # String fields filled with completion-length prose instead of a
+        # short unique label (long free-text outputs such as notes).
+        self.prose_fields = prose_fields
+        # Generated strings are unique across the server's lifetime, so query
+        # deduplication never collapses the research loop.
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(slots) if slots > 0 else None
+        self.requests = 0
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def generation(self):
+        """Context manager held for the whole of one generation."""
+        return self._slots if self._slots is not None else contextlib.nullcontext()
+
+    def _next_id(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+    def text(self) -> str:
+        """Return roughly ``completion_tokens`` tokens of prose (unique per call)."""
+        words, tokens = [f"({self._next_id()})"], 0
+        for word in itertools.cycle(_TEXT):
+            if tokens >= self.completion_tokens:
+                break
+            words.append(word)
+            tokens += _estimate_tokens(word + " ")
+        return " ".join(words)
+
+    def from_schema(self, schema: dict, defs: dict | None = None, name: str = "value") -> Any:
+        """Return a value that validates against a (Pydantic-style) JSON schema."""
+        defs = defs if defs is not None else schema.get("$defs", {})
+        if "$ref" in schema:
+            return self.from_schema(defs[schema["$ref"].rsplit("/", 1)[-1]], defs, name)
+        for combinator in ("anyOf", "oneOf", "allOf"):
+            if schema.get(combinator):
+                options = [s for s in schema[combinator] if s.get("type") != "null"]
+                return self.from_schema(options[0] if options else {"type": "null"}, defs, name)
+        if "enum" in schema:
+            return schema["enum"][0]
+        kind = schema.get("type", "object")
+        if kind == "object":
+            return {
+                prop: self.from_schema(sub, defs, prop)
+                for prop, sub in schema.get("properties", {}).items()
+            }
+        if kind == "array":
+            count = max(schema.get("minItems", 0), self.list_queries if name.endswith("queries") else 3)
+            return [self.from_schema(schema.get("items", {}), defs, name) for _ in range(count)]
+        if kind == "boolean":
+            # "Not sufficient" keeps the research loop running to its limit.
+            return False
+        if kind in ("integer", "number"):
+            return 0
+        if kind == "null":
+            return None
+        if name in self.prose_fields:
+            return self.text()
+        return f"stub {name.replace('_', ' ')} {self._next_id()}"
+
+    def time_to_first_token(self, prompt_tokens: int = 0) -> float:
+        """Fixed latency plus prompt processing time."""
+        return self.latency + (prompt_tokens / self.prefill_rate if self.prefill_rate > 0 else 0.0)
+
+    def seconds_for(self, tokens: int, prompt_tokens: int = 0) -> float:
+        """Total time for a completion of ``tokens`` tokens."""
+        return self.time_to_first_token(prompt_tokens) + (tokens / self.token_rate if self.token_rate > 0 else 0.0)
+
+
+def _structured_schema(body: dict) -> tuple[dict | None, str | None]:
+    """Return (schema, tool name) when the request asks for structured output."""
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        return response_format["json_schema"].get("schema", {}), None
+    if response_format.get("type") == "json_object":
+        return {"type": "object", "properties": {}}, None
+    tools = body.get("tools") or []
+    if tools:
+        choice = body.get("tool_choice")
+        wanted = choice.get("function", {}).get("name") if isinstance(choice, dict) else None
+        for tool in tools:
+            function = tool.get("function", {})
+            if wanted is None or function.get("name") == wanted:
+                return function.get("parameters", {}), function.get("name")
+    return None, None
+
+
+def _prompt_text(body: dict) -> str:
+    if "messages" in body:
+        return "".join(
+            m["content"] if isinstance(m.get("content"), str) else json.dumps(m.get("content"))
+            for m in body["messages"]
+        )
+    prompt = body.get("prompt", "")
+    return prompt if isinstance(prompt, str) else "".join(prompt)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Request handler; the model is attached to the server instance."""
+
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def model(self) -> StubModel:
+        return self.server.model  # type: ignore[attr-defined]
+
+    def log_message(self, format, *args):  # noqa: A002 - stdlib signature
+        pass
+
+    def _send_json(self, payload: dict, status: int = 200) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):  # noqa: N802 - stdlib naming
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json({"object": "list", "data": [{"id": "stub-model", "object": "model"}]})
+        else:
+            self._send_json({"error": {"message": "not found"}}, status=404)
+
+    def do_POST(self):  # noqa: N802 - stdlib naming
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        self.model.count_request()
+        path = self.path.rstrip("/")
+        if path.endswith("/chat/completions"):
+            self._chat(body)
+        elif path.endswith("/completions"):
+            self._completions(body)
+        else:
+            self._send_json({"error": {"message": "not found"}}, status=404)
+
+    def _chat(self, body: dict) -> None:
+        model = self.model
+        schema, tool_name = _structured_schema(body)
+        content = (
+            json.dumps(model.from_schema(schema)) if schema is not None else model.text()
+        )
+        prompt_tokens = _estimate_tokens(_prompt_text(body))
+        completion_tokens = _estimate_tokens(content)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        if body.get("stream"):
+            self._stream_chat(body, content, tool_name, usage, completion_id, created)
+            return
+
+        with model.generation():
+            time.sleep(model.seconds_for(completion_tokens, prompt_tokens))
+        message: dict[str, Any] = {"role": "assistant", "content": content}
+        finish_reason = "stop"
+        if tool_name is not None:
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": f"call_{uuid.uuid4().hex[:8]}",
+                        "type": "function",
+                        "function": {"name": tool_name, "arguments": content},
+                    }
+                ],
+            }
+            finish_reason = "tool_calls"
+        self._send_json(
+            {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": body.get("model", "stub-model"),
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": usage,
+            }
+        )
+
+    def _stream_chat(self, body, content, tool_name, usage, completion_id, created) -> None:
+        model = self.model
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta: dict, finish_reason=None, **extra) -> None:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body.get("model", "stub-model"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                **extra,
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        with model.generation():
+            self._stream_pieces(content, tool_name, usage, event)
+        event({}, "tool_calls" if tool_name is not None else "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body.get("model", "stub-model"),
+                "choices": [],
+                "usage": usage,
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _stream_pieces(self, content, tool_name, usage, event) -> None:
+        model = self.model
+        time.sleep(model.time_to_first_token(usage["prompt_tokens"]))
+        pieces = [content[i : i + 4] for i in range(0, len(content), 4)] or [""]
+        per_piece = 1.0 / model.token_rate if model.token_rate > 0 else 0.0
+        for i, piece in enumerate(pieces):
+            if tool_name is not None:
+                call: dict[str, Any] = {"index": 0, "function": {"arguments": piece}}
+                if i == 0:
+                    call.update(id=f"call_{uuid.uuid4().hex[:8]}", type="function")
+                    call["function"]["name"] = tool_name
+                delta = {"role": "assistant", "tool_calls": [call]} if i == 0 else {"tool_calls": [call]}
+            else:
+                delta = {"role": "assistant", "content": piece} if i == 0 else {"content": piece}
+            event(delta)
+            if per_piece:
+                time.sleep(per_piece)
+
+    def _completions(self, body: dict) -> None:
+        model = self.model
+        prompts = body.get("prompt", "")
+        prompts = [prompts] if isinstance(prompts, str) else list(prompts)
+        texts = [model.text() for _ in prompts]
+        completion_tokens = sum(_estimate_tokens(text) for text in texts)
+        prompt_tokens = sum(_estimate_tokens(p) for p in prompts)
+        # A batch shares one decode pass: pay for the longest completion only.
+        with model.generation():
+            time.sleep(model.seconds_for(max((_estimate_tokens(t) for t in texts), default=0), prompt_tokens))
+        self._send_json(
+            {
+                "id": f"cmpl-{uuid.uuid4().hex[:12]}",
+                "object": "text_completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub-model"),
+                "choices": [
+                    {"index": i, "text": text, "finish_reason": "stop", "logprobs": None}
+                    for i, text in enumerate(texts)
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+        )
+
+
+class StubServer:
+    """Run the stub API on a background thread (``with StubServer() as server``)."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.2,
+        token_rate: float = 200.0,
+        completion_tokens: int = 120,
+        prefill_rate: float = 0.0,
+        list_queries: int = 1,
+        slots: int = 0,
+    ):
+        self.httpd = ThreadingHTTPServer((host, port), StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.model = StubModel(  # type: ignore[attr-defined]
+            latency, token_rate, completion_tokens, prefill_rate, list_queries, slots=slots
+        )
+        self._thread: threading.Thread | None = None
+
+    @property
+    def model(self) -> StubModel:
+        return self.httpd.model  # type: ignore[attr-defined]
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1234)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds to first token.")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="Generated tokens per second (0 = instant).")
+    parser.add_argument("--completion-tokens", type=int, default=120, help="Length of free-text completions.")
+    parser.add_argument("--prefill-rate", type=float, default=0.0, help="Prompt tokens processed per second (0 = free).")
+    parser.add_argument("--list-queries", type=int, default=1, help="Items in *_queries arrays (e.g. follow-ups).")
+    parser.add_argument("--slots", type=int, default=0, help="Generations run at once (0 = unlimited).")
+    args = parser.parse_args()
+
+    server = StubServer(
+        args.host,
+        args.port,
+        args.latency,
+        args.token_rate,
+        args.completion_tokens,
+        args.prefill_rate,
+        args.list_queries,
+        args.slots,
+    )
+    print(f"Stub OpenAI-compatible server on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""In-process stand-ins for the LLM and the search tool used by the benchmarks.
+
+``install_stubs`` patches ``agent.graph`` and selects a "stub" search provider
+so a full research run touches no network: every LLM call and search just
+sleeps for the configured latency and returns canned, schema-valid output.
+"""
+
+import asyncio
+import importlib
+import itertools
+import os
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from langchain_core.messages import AIMessage, AIMessageChunk  # noqa: E402
+
+from agent.search_providers import SearchProvider, SearchResult, register_provider  # noqa: E402
+from agent.tools_and_schemas import (  # noqa: E402
+    IncrementalReflection,
+    Reflection,
+    SearchQueryList,
+)
+
+# The package re-exports the compiled graph as ``agent.graph``, so fetch the
+# module itself.
+graph_module = importlib.import_module("agent.graph")
+
+# Follow-up queries must differ between loops, or query deduplication ends the
+# research after the first reflection.
+_follow_up_ids = itertools.count(1)
+
+
+class StubLLM:
+    """Minimal stand-in for ChatOpenAI that sleeps instead of calling a server."""
+
+    def __init__(self, latency: float, schema=None, summary_chars: int = 40):
+        self.latency = latency
+        self.schema = schema
+        self.summary_chars = summary_chars
+
+    def with_structured_output(self, schema):
+        return StubLLM(self.latency, schema, self.summary_chars)
+
+    def _result(self):
+        if self.schema is SearchQueryList:
+            return SearchQueryList(
+                query=["stub query one", "stub query two", "stub query three"],
+                rationale="stub",
+            )
+        if self.schema is IncrementalReflection:
+            return IncrementalReflection(
+                is_sufficient=False,
+                knowledge_gap="stub gap",
+                follow_up_queries=[f"stub follow up {next(_follow_up_ids)}"],
+                knowledge_state="Condensed stub notes. " * 40,
+            )
+        if self.schema is Reflection:
+            return Reflection(
+                is_sufficient=False,
+                knowledge_gap="stub gap",
+                follow_up_queries=[f"stub follow up {next(_follow_up_ids)}"],
+            )
+        summary = "Stub summary https://example.com/page "
+        return AIMessage(content=(summary * (self.summary_chars // len(summary) + 1))[: max(self.summary_chars, len(summary))])
+
+    def invoke(self, prompt, *args, **kwargs):
+        time.sleep(self.latency)
+        return self._result()
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._result()
+
+    def _chunks(self):
+        words = self._result().content.split(" ")
+        return [AIMessageChunk(content=word + " ", id="stub") for word in words]
+
+    def stream(self, prompt, *args, **kwargs):
+        chunks = self._chunks()
+        for chunk in chunks:
+            time.sleep(self.latency / len(chunks))
+            yield chunk
+
+    async def astream(self, prompt, *args, **kwargs):
+        chunks = self._chunks()
+        for chunk in chunks:
+            await asyncio.sleep(self.latency / len(chunks))
+            yield chunk
+
+
+class StubSearchProvider(SearchProvider):
+    """Search provider that sleeps and returns canned results.
+
+    Each result carries a URL derived from the query, so distinct queries
+    gather distinct sources.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency: float, results: int = 3):
+        self.latency = latency
+        self.results = results
+
+    def _results(self, query: str, max_results: int) -> list[SearchResult]:
+        digest = zlib.crc32(query.encode("utf-8"))
+        return [
+            SearchResult(
+                f"Result {i} for {query}", f"https://example.com/{digest}/{i}", "stub snippet.", self.name
+            )
+            for i in range(1, min(self.results, max_results) + 1)
+        ]
+
+    def search(self, query: str, max_results: int) -> list[SearchResult]:
+        time.sleep(self.latency)
+        return self._results(query, max_results)
+
+    async def asearch(self, query: str, max_results: int) -> list[SearchResult]:
+        await asyncio.sleep(self.latency)
+        return self._results(query, max_results)
+
+
+def install_search_stub(search_latency: float) -> None:
+    """Select the "stub" search provider, leaving the LLM clients untouched."""
+    register_provider("stub", lambda configurable: StubSearchProvider(search_latency))
+    os.environ["SEARCH_PROVIDERS"] = "stub"
+
+
+def install_stubs(llm_latency: float, search_latency: float, summary_chars: int = 40) -> None:
+    """Patch the graph module so no network is used."""
+    graph_module.get_local_llm = lambda *args, **kwargs: StubLLM(llm_latency, summary_chars=summary_chars)
+    install_search_stub(search_latency)
@@ -1,13 +1,156 @@
 # mypy: disable - error - code = "no-untyped-def,misc"
+import asyncio
+import json
+import logging
+import os
 import pathlib
-from fastapi import FastAPI, Request, Response
-from fastapi.staticfiles import StaticFiles
+
 import fastapi.exceptions
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.staticfiles import StaticFiles
+
+from agent.batch import (
+    BatchJob,
+    BatchJobs,
+    parse_questions,
+    request_concurrency,
+    request_configurable,
+    resolve_batch_path,
+    run_batch,
+    run_batch_file,
+)
+from agent.configuration import Configuration, reload_configuration
+from agent.instrumentation import render_prometheus
+
+logger = logging.getLogger(__name__)
 
 # Define the FastAPI app
 app = FastAPI()
 
 
+@app.get("/metrics")
+async def metrics():
+    """Expose node spans, LLM pool, scheduler and cache counters for Prometheus."""
+    return Response(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/config/reload")
+async def config_reload():
+    """Re-read configuration overrides from the environment for new runs."""
+    reload_configuration()
+    return {"reloaded": True}
+
+
+def _batch_settings(body: dict) -> tuple[int, dict]:
+    """Return the validated concurrency and per-run configuration of a batch request."""
+    # The cap is a server-side setting (environment), never the request's.
+    maximum = Configuration.from_runnable_config().batch_max_concurrency
+    return request_concurrency(body.get("concurrency"), maximum), request_configurable(body.get("configurable"))
+
+
+@app.post("/batch")
+async def batch(request: Request):
+    """Run a batch of questions and stream each result as an NDJSON line.
+
+    The body is JSON: ``{"questions": [{"id": ..., "question": ...}, ...],
+    "concurrency": 4, "configurable": {...}}``. The last line is
+    ``{"report": {...}}`` with throughput and latency. Only the per-run
+    fields in ``REQUEST_CONFIGURABLE_KEYS`` may be set, and ``concurrency`` is
+    clamped to ``batch_max_concurrency``.
+    """
+    body = await request.json()
+    try:
+        questions = parse_questions(json.dumps(q) for q in body.get("questions") or [])
+        concurrency, configurable = _batch_settings(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def produce() -> None:
+        report = await run_batch(
+            questions,
+            results.put,
+            concurrency=concurrency,
+            configurable=configurable,
+        )
+        await results.put({"report": report.as_dict()})
+
+    async def stream():
+        task = asyncio.create_task(produce())
+        try:
+            while True:
+                item = await results.get()
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+                if "report" in item:
+                    break
+        finally:
+            task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+_batch_jobs = BatchJobs()
+
+
+@app.post("/batch/jobs")
+async def batch_job(request: Request):
+    """Start a file-to-file batch job in the background (resumes by default).
+
+    The body is JSON: ``{"input_path": ..., "output_path": ..., "concurrency": 4,
+    "configurable": {...}, "resume": true}``. Paths are relative to the
+    ``batch_dir`` setting and may not leave it; ``configurable`` and
+    ``concurrency`` are checked as for ``/batch``. Poll ``GET /batch/jobs/{job_id}``.
+    """
+    body = await request.json()
+    if not body.get("input_path") or not body.get("output_path"):
+        raise HTTPException(status_code=400, detail="input_path and output_path are required")
+    # Server-side setting only (environment), never the request's configurable.
+    root = Configuration.from_runnable_config().batch_dir
+    try:
+        job = BatchJob(resolve_batch_path(root, body["input_path"]), resolve_batch_path(root, body["output_path"]))
+        concurrency, configurable = _batch_settings(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not os.path.isfile(job.input_path):
+        raise HTTPException(status_code=404, detail="Input file not found in the batch directory")
+
+    async def run() -> None:
+        try:
+            await run_batch_file(
+                job.input_path,
+                job.output_path,
+                concurrency=concurrency,
+                configurable=configurable,
+                resume=body.get("resume", True),
+                report=job.report,
+            )
+        except Exception as e:
+            job.finish(f"{type(e).__name__}: {e}")
+        else:
+            job.finish()
+
+    job.task = asyncio.create_task(run())
+    return {"job_id": _batch_jobs.add(job)}
+
+
+@app.get("/batch/jobs/{job_id}")
+async def batch_job_status(job_id: str):
+    """Progress of a batch job: status, counts, throughput and latency so far."""
+    job = _batch_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown batch job")
+    root = pathlib.Path(Configuration.from_runnable_config().batch_dir).resolve()
+    return {
+        "job_id": job_id,
+        "status": job.status,
+        "error": job.error,
+        "input_path": str(pathlib.Path(job.input_path).relative_to(root)),
+        "output_path": str(pathlib.Path(job.output_path).relative_to(root)),
+        "report": job.report.as_dict(),
+    }
+
+
 def create_frontend_router(build_dir="../frontend/dist"):
     """Creates a router to serve the React frontend.
 
@@ -21,8 +164,8 @@ def create_frontend_router(build_dir="../frontend/dist"):
     static_files_path = build_path / "assets"  # Vite uses 'assets' subdir
 
     if not build_path.is_dir() or not (build_path / "index.html").is_file():
-        print(
-            f"WARN: Frontend build directory not found or incomplete at {build_path}. Serving frontend will likely fail."
+        logger.warning(
+            "Frontend build directory not found or incomplete at %s. Serving frontend will likely fail.", build_path
         )
         # Return a dummy router if build isn't ready
         from starlette.routing import Route
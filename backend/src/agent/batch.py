@@ -0,0 +1,413 @@
+"""Batch research: run a JSONL file of questions through the graph.
+
+Each input line is a JSON object with a ``question`` and optionally an ``id``
+(default: the line number) and ``max_research_loops``. Questions run through
+the compiled graph (``graph.ainvoke``) on one event loop, with at most
+``concurrency`` in flight. Every question gets its own thread, and they all
+share the process-wide search, summary, page and run caches, LLM clients and
+concurrency limits.
+
+Each result is appended to the output JSONL and flushed as soon as its
+question finishes:
+
+    {"id": ..., "question": ..., "answer": ..., "sources": [...],
+     "stop_reason": ..., "research_loops": ..., "seconds": ..., "error": null}
+
+Runs resume by default: ids that already have a successful result in the
+output file are skipped. Failed questions are retried, and a line cut off by
+an interruption is ignored. The returned ``BatchReport`` gives aggregate
+throughput and per-question latency.
+
+CLI:
+
+    python -m agent.batch questions.jsonl results.jsonl --concurrency 4
+    python -m agent.batch questions.jsonl results.jsonl --config max_research_loops=1
+
+The same runner backs the ``/batch`` endpoints in ``agent.app``. Jobs started
+there only read and write files inside ``batch_dir``, may only set the
+per-run fields in ``REQUEST_CONFIGURABLE_KEYS``, and run at most
+``batch_max_concurrency`` questions at once.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import pathlib
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 4
+# Finished HTTP jobs are kept this long, and at most this many, for polling.
+JOB_TTL_SECONDS = 3600.0
+MAX_FINISHED_JOBS = 100
+
+# Configuration fields a batch request over HTTP may set for its runs. The
+# rest (endpoints, hosts, file and cache paths, process-wide limits) are
+# server-side settings.
+REQUEST_CONFIGURABLE_KEYS = frozenset(
+    {
+        "query_generator_model",
+        "search_llm_model",
+        "reflection_model",
+        "answer_model",
+        "number_of_initial_queries",
+        "max_research_loops",
+        "incremental_reflection",
+        "query_dedup_similarity_threshold",
+        "min_information_gain",
+        "research_time_budget_seconds",
+        "research_token_budget",
+        "answer_context_token_budget",
+        "search_max_results",
+    }
+)
+
+
+@dataclass
+class BatchQuestion:
+    """One question of a batch."""
+
+    id: str
+    question: str
+    max_research_loops: int | None = None
+
+
+def parse_questions(lines: Iterable[str]) -> list[BatchQuestion]:
+    """Parse JSONL lines into questions; blank lines are skipped."""
+    questions: list[BatchQuestion] = []
+    seen: set[str] = set()
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if not isinstance(record, dict) or not str(record.get("question") or "").strip():
+            raise ValueError(f"Line {number}: expected an object with a non-empty 'question'")
+        question_id = str(record.get("id", number))
+        if question_id in seen:
+            raise ValueError(f"Line {number}: duplicate id {question_id!r}")
+        seen.add(question_id)
+        questions.append(BatchQuestion(question_id, record["question"], record.get("max_research_loops")))
+    return questions
+
+
+def read_questions(path: str) -> list[BatchQuestion]:
+    """Read the questions of a JSONL input file."""
+    with open(path, encoding="utf-8") as f:
+        return parse_questions(f)
+
+
+def completed_ids(output_path: str) -> set[str]:
+    """Ids with a successful result in an existing output file."""
+    if not os.path.exists(output_path):
+        return set()
+    done = set()
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # cut off by an interruption
+            if isinstance(record, dict) and not record.get("error"):
+                done.add(str(record.get("id")))
+    return done
+
+
+def resolve_batch_path(root: str, name: str) -> str:
+    """Resolve ``name`` inside the batch directory ``root``.
+
+    Raises:
+        ValueError: If the path escapes ``root`` (absolute paths, ``..`` or
+            symlinks pointing outside it).
+    """
+    base = pathlib.Path(root).resolve()
+    path = (base / name).resolve()
+    if path == base or not path.is_relative_to(base):
+        raise ValueError(f"Path {name!r} is outside the batch directory")
+    return str(path)
+
+
+def request_configurable(configurable: Any) -> dict:
+    """Validate the ``configurable`` of a batch request made over HTTP.
+
+    Raises:
+        ValueError: If it is not an object or sets a field outside
+            ``REQUEST_CONFIGURABLE_KEYS``.
+    """
+    if configurable is None:
+        return {}
+    if not isinstance(configurable, dict):
+        raise ValueError("configurable must be an object")
+    rejected = sorted(set(configurable) - REQUEST_CONFIGURABLE_KEYS)
+    if rejected:
+        raise ValueError(f"configurable fields not allowed in batch requests: {', '.join(rejected)}")
+    return dict(configurable)
+
+
+def request_concurrency(value: Any, maximum: int) -> int:
+    """Validate the ``concurrency`` of a batch request and clamp it to ``maximum``.
+
+    A missing value means ``DEFAULT_CONCURRENCY``.
+
+    Raises:
+        ValueError: If the value is not a positive integer.
+    """
+    if value is None:
+        value = DEFAULT_CONCURRENCY
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ValueError("concurrency must be a positive integer")
+    return min(value, max(1, maximum))
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+@dataclass
+class BatchReport:
+    """Progress and aggregate numbers of a batch run (updated live)."""
+
+    total: int = 0
+    skipped: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: float | None = None
+    latencies: list[float] = field(default_factory=list)
+
+    @property
+    def seconds(self) -> float:
+        """Seconds since the run started, or its total once finished."""
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counts, throughput and latency percentiles."""
+        done = self.succeeded + self.failed
+        return {
+            "total": self.total,
+            "skipped": self.skipped,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "pending": self.total - self.skipped - done,
+            "seconds": round(self.seconds, 3),
+            "questions_per_second": round(done / self.seconds, 4) if self.seconds else 0.0,
+            "latency_mean": round(sum(self.latencies) / len(self.latencies), 3) if self.latencies else 0.0,
+            "latency_p50": round(_percentile(self.latencies, 50), 3),
+            "latency_p95": round(_percentile(self.latencies, 95), 3),
+            "latency_max": round(max(self.latencies, default=0.0), 3),
+        }
+
+
+def _answer_text(result: dict) -> str:
+    for message in reversed(result.get("messages") or []):
+        if isinstance(message, AIMessage):
+            return message.content if isinstance(message.content, str) else str(message.content)
+    return ""
+
+
+async def run_batch(
+    questions: list[BatchQuestion],
+    on_result: Callable[[dict], Awaitable[None]],
+    *,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    configurable: dict | None = None,
+    skip: set[str] | None = None,
+    report: BatchReport | None = None,
+) -> BatchReport:
+    """Run questions through the graph with a bounded worker pool.
+
+    Args:
+        questions: The batch.
+        on_result: Awaited with each result record as its question finishes.
+        concurrency: Questions in flight at once.
+        configurable: Configuration shared by every question.
+        skip: Ids to leave out (already done).
+        report: Report to update in place (for progress polling).
+    """
+    from agent.graph import (
+        graph,  # the compiled graph; imported lazily for a light CLI start
+    )
+
+    skip = skip or set()
+    report = report or BatchReport()
+    report.total = len(questions)
+    pending = [question for question in questions if question.id not in skip]
+    report.skipped = report.total - len(pending)
+    job = uuid.uuid4().hex[:8]
+    queue: asyncio.Queue[BatchQuestion] = asyncio.Queue()
+    for question in pending:
+        queue.put_nowait(question)
+
+    async def answer(question: BatchQuestion) -> dict:
+        inputs: dict[str, Any] = {"messages": [HumanMessage(content=question.question)]}
+        if question.max_research_loops is not None:
+            inputs["max_research_loops"] = question.max_research_loops
+        config = {"configurable": {**(configurable or {}), "thread_id": f"batch-{job}-{question.id}"}}
+        start = time.perf_counter()
+        record: dict[str, Any] = {"id": question.id, "question": question.question}
+        try:
+            result = await graph.ainvoke(inputs, config)
+        except Exception as e:
+            logger.warning("Batch question %s failed: %s", question.id, e)
+            record.update(answer=None, error=f"{type(e).__name__}: {e}")
+        else:
+            record.update(
+                answer=_answer_text(result),
+                sources=result.get("sources_gathered") or [],
+                stop_reason=result.get("stop_reason") or "",
+                research_loops=result.get("research_loop_count") or 0,
+                error=None,
+            )
+        record["seconds"] = round(time.perf_counter() - start, 3)
+        return record
+
+    async def worker() -> None:
+        while not queue.empty():
+            record = await answer(queue.get_nowait())
+            if record["error"]:
+                report.failed += 1
+            else:
+                report.succeeded += 1
+                report.latencies.append(record["seconds"])
+            await on_result(record)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(pending))))))
+    report.finished_at = time.perf_counter()
+    return report
+
+
+async def run_batch_file(
+    input_path: str,
+    output_path: str,
+    *,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    configurable: dict | None = None,
+    resume: bool = True,
+    report: BatchReport | None = None,
+) -> BatchReport:
+    """Run a JSONL file of questions, appending results to ``output_path``."""
+    questions = read_questions(input_path)
+    skip = completed_ids(output_path) if resume else set()
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as out:
+
+        async def write(record: dict) -> None:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+        return await run_batch(
+            questions, write, concurrency=concurrency, configurable=configurable, skip=skip, report=report
+        )
+
+
+@dataclass
+class BatchJob:
+    """A file-to-file batch job running in the background."""
+
+    input_path: str
+    output_path: str
+    report: BatchReport = field(default_factory=BatchReport)
+    status: str = "running"
+    error: str | None = None
+    finished_at: float | None = None
+    task: asyncio.Task | None = None
+
+    def finish(self, error: str | None = None) -> None:
+        """Mark the job done, or failed with ``error``."""
+        self.status, self.error = ("failed", error) if error else ("done", None)
+        self.finished_at = time.time()
+
+
+class BatchJobs:
+    """Registry of background jobs; finished ones expire after a TTL or cap."""
+
+    def __init__(self, ttl_seconds: float = JOB_TTL_SECONDS, max_finished: int = MAX_FINISHED_JOBS):
+        """Keep finished jobs for ``ttl_seconds``, and at most ``max_finished`` of them."""
+        self.ttl_seconds = ttl_seconds
+        self.max_finished = max_finished
+        self._jobs: dict[str, BatchJob] = {}
+
+    def add(self, job: BatchJob) -> str:
+        """Register ``job`` and return its id."""
+        self.prune()
+        job_id = uuid.uuid4().hex
+        self._jobs[job_id] = job
+        return job_id
+
+    def get(self, job_id: str) -> BatchJob | None:
+        """Return the job, or ``None`` if it is unknown or has expired."""
+        self.prune()
+        return self._jobs.get(job_id)
+
+    def prune(self, now: float | None = None) -> None:
+        """Drop finished jobs past the TTL, then the oldest beyond the cap."""
+        now = time.time() if now is None else now
+        finished = sorted(
+            (job.finished_at, job_id) for job_id, job in self._jobs.items() if job.finished_at is not None
+        )
+        expired = [job_id for finished_at, job_id in finished if now - finished_at > self.ttl_seconds]
+        live = [job_id for _, job_id in finished if job_id not in expired]
+        for job_id in expired + live[: max(0, len(live) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def __len__(self) -> int:
+        """Return the number of jobs kept."""
+        return len(self._jobs)
+
+
+def _config_value(raw: str) -> Any:
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        return raw
+
+
+def main() -> None:
+    """Run the batch CLI."""
+    parser = argparse.ArgumentParser(description="Run a JSONL file of research questions through the graph.")
+    parser.add_argument("input", help="JSONL file with one {'question': ..., 'id': ...} per line.")
+    parser.add_argument("output", help="JSONL file results are appended to.")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Questions in flight at once.")
+    parser.add_argument("--no-resume", dest="resume", action="store_false", help="Overwrite the output instead of skipping finished ids.")
+    parser.add_argument(
+        "--config",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Configuration field for every question (repeatable; values parsed as JSON when possible).",
+    )
+    args = parser.parse_args()
+    configurable = {}
+    for item in args.config:
+        key, _, value = item.partition("=")
+        configurable[key.strip()] = _config_value(value)
+
+    logging.basicConfig(level=logging.WARNING)
+    report = asyncio.run(
+        run_batch_file(
+            args.input, args.output, concurrency=args.concurrency, configurable=configurable, resume=args.resume
+        )
+    )
+    stats = report.as_dict()
+    sys.stdout.write(
+        f"{stats['succeeded']} succeeded, {stats['failed']} failed, {stats['skipped']} skipped "
+        f"of {stats['total']} in {stats['seconds']:.1f}s ({stats['questions_per_second']:.2f} questions/s)\n"
+        f"latency mean {stats['latency_mean']:.2f}s, p50 {stats['latency_p50']:.2f}s, "
+        f"p95 {stats['latency_p95']:.2f}s, max {stats['latency_max']:.2f}s\n"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Micro-batching of concurrent summarization calls into n-prompt requests.
+
+Fan-out sends one summarization request per ``web_research`` branch (and per
+map-reduce chunk). A local server that runs requests one at a time leaves its
+batching capacity unused: every request pays a full decode pass. With
+``llm_batching`` enabled, non-streamed summarization prompts for the same
+endpoint and model are collected for up to ``llm_batch_window_ms`` (or until
+``llm_batch_max_size`` prompts are waiting). They are then sent as one
+``/v1/completions`` request with a list of prompts, which servers such as
+vLLM or llama.cpp decode together, and each caller gets its own completion
+back.
+
+A batch request takes a single slot of the role's LLM limiter, the same one
+non-batched calls to that model and endpoint pool use. If the server rejects
+list prompts (or answers with the wrong number of choices), the batcher marks
+the endpoint as unsupported and callers fall back to one chat call per prompt.
+
+A batcher's collector thread and dispatch workers stop after
+``IDLE_SECONDS`` without prompts, and start again with the next one.
+
+Note that ``/v1/completions`` sends the prompt as raw text, without the chat
+template the chat endpoint applies.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+
+import httpx
+
+from agent.endpoints import get_endpoint_registry, role_endpoints
+from agent.llm_pool import get_llm_pool
+from agent.scheduler import FairLimiter, llm_limiter
+
+logger = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = httpx.Timeout(600.0, connect=10.0)
+# Answers meaning "this server does not take a list of prompts here".
+_UNSUPPORTED_STATUS = {400, 404, 405, 415, 422, 501}
+IDLE_SECONDS = 30.0
+
+
+class BatchUnsupported(Exception):
+    """The endpoint does not accept batched (list-of-prompts) completions."""
+
+
+@dataclass
+class BatchResult:
+    """One caller's completion from a batched request."""
+
+    text: str
+    waited: float  # seconds the batch queued for an LLM slot
+    batch_size: int
+
+
+class MicroBatcher:
+    """Collects prompts for one endpoint/model and sends them in batches."""
+
+    def __init__(
+        self,
+        api_base: str,
+        model: str,
+        api_key: str | None,
+        *,
+        window_seconds: float,
+        max_size: int,
+        max_tokens: int,
+        limiter: FairLimiter,
+        max_batches_in_flight: int = 4,
+        idle_seconds: float = IDLE_SECONDS,
+    ):
+        """Batch calls to one model on one endpoint pool, holding ``limiter`` per batch."""
+        self.api_base = api_base
+        self.model = model
+        self.api_key = api_key
+        self.window_seconds = window_seconds
+        self.max_size = max(1, max_size)
+        self.max_tokens = max_tokens
+        self.limiter = limiter
+        self.max_batches_in_flight = max_batches_in_flight
+        self.idle_seconds = idle_seconds
+        # None until the first batch tells whether the server takes list prompts.
+        self.supported: bool | None = None
+        self.batches = 0
+        self.prompts = 0
+        self._pending: list[tuple[str, Future]] = []
+        self._cond = threading.Condition()
+        # Set while the collector runs (see _collect).
+        self._executor: ThreadPoolExecutor | None = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the collector thread is running."""
+        return self._executor is not None
+
+    def submit(self, prompt: str) -> "Future[BatchResult]":
+        """Queue a prompt; the future resolves when its batch has been answered."""
+        future: Future = Future()
+        with self._cond:
+            self._pending.append((prompt, future))
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_batches_in_flight, thread_name_prefix="llm-batch"
+                )
+                threading.Thread(target=self._collect, name=f"llm-batcher-{self.model}", daemon=True).start()
+            self._cond.notify()
+        return future
+
+    def stats(self) -> dict:
+        """Batches sent, prompts served and the mean batch size."""
+        return {
+            "batches": self.batches,
+            "prompts": self.prompts,
+            "mean_batch_size": self.prompts / self.batches if self.batches else 0.0,
+            "supported": self.supported,
+        }
+
+    def _collect(self) -> None:
+        while True:
+            with self._cond:
+                idle_deadline = time.monotonic() + self.idle_seconds
+                while not self._pending:
+                    remaining = idle_deadline - time.monotonic()
+                    if remaining <= 0:
+                        # Idle: stop; the next submit starts a new collector.
+                        # Batches still in flight finish on the old workers.
+                        executor, self._executor = self._executor, None
+                        executor.shutdown(wait=False)
+                        return
+                    self._cond.wait(remaining)
+                # The window starts with the first waiting prompt.
+                deadline = time.monotonic() + self.window_seconds
+                while len(self._pending) < self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending[: self.max_size], self._pending[self.max_size :]
+                executor = self._executor
+            executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch: list[tuple[str, Future]]) -> None:
+        waited = self.limiter.acquire()
+        try:
+            texts = self._request([prompt for prompt, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            self.limiter.release()
+        with self._cond:
+            self.batches += 1
+            self.prompts += len(batch)
+        for (_, future), text in zip(batch, texts):
+            future.set_result(BatchResult(text, waited, len(batch)))
+
+    def _request(self, prompts: list[str]) -> list[str]:
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        response = get_llm_pool().http_client(self.api_base).post(
+            f"{self.api_base.rstrip('/')}/completions",
+            json={
+                "model": self.model,
+                "prompt": prompts,
+                "max_tokens": self.max_tokens,
+                "temperature": 0.0,
+            },
+            headers=headers,
+            timeout=REQUEST_TIMEOUT,
+        )
+        if response.status_code in _UNSUPPORTED_STATUS:
+            self._unsupported(f"/completions answered {response.status_code}")
+        response.raise_for_status()
+        choices = response.json().get("choices") or []
+        if len(choices) != len(prompts):
+            self._unsupported(f"{len(choices)} choices for {len(prompts)} prompts")
+        self.supported = True
+        return [choice.get("text") or "" for choice in sorted(choices, key=lambda c: c.get("index", 0))]
+
+    def _unsupported(self, reason: str) -> None:
+        self.supported = False
+        logger.warning("Batched completions unavailable on %s (%s); using one call per prompt", self.api_base, reason)
+        raise BatchUnsupported(reason)
+
+
+_batchers: dict[tuple, MicroBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(configurable, model_name_in_config: str) -> MicroBatcher:
+    """Return the process-wide batcher for the model on its best endpoint right now."""
+    model = getattr(configurable, model_name_in_config)
+    api_base = get_endpoint_registry().route(configurable, model_name_in_config)[0]
+    # Also applies the current per-model limit to the pool's limiter.
+    limiter = llm_limiter(configurable, model_name_in_config)
+    key = (
+        api_base,
+        model,
+        role_endpoints(configurable, model_name_in_config),
+        configurable.openai_api_key,
+        configurable.llm_batch_window_ms,
+        configurable.llm_batch_max_size,
+        configurable.llm_batch_max_tokens,
+    )
+    with _batchers_lock:
+        batcher = _batchers.get(key)
+        if batcher is None:
+            batcher = _batchers[key] = MicroBatcher(
+                api_base,
+                model,
+                configurable.openai_api_key,
+                window_seconds=configurable.llm_batch_window_ms / 1000,
+                max_size=configurable.llm_batch_max_size,
+                max_tokens=configurable.llm_batch_max_tokens,
+                limiter=limiter,
+            )
+        return batcher
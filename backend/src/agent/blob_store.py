@@ -0,0 +1,196 @@
+"""Content-addressed blob store for large run-state values.
+
+LangGraph checkpoints the whole run state after every super-step, and
+``web_research_result`` grows by one summary per branch and loop. Storing the
+summaries inline makes each checkpoint write larger than the last. With
+``blob_store_path`` set, summaries of at least ``blob_min_chars`` characters
+are written once to a directory, keyed by their SHA-256 digest, and state
+only keeps a short ``blob:<digest>`` reference. ``reflection`` and
+``finalize_answer`` resolve the references when they build their prompts.
+
+The store is off by default. Checkpoints usually outlive the process (e.g. in
+Postgres), so the directory must be durable and shared by every process that
+may resume a thread, such as a mounted volume. A reference whose blob is gone
+raises ``MissingBlobError`` instead of silently turning into empty research.
+
+Blobs are zlib-compressed files written atomically, so several processes can
+share one directory. Identical summaries are stored once. Recently read blobs
+are kept in a small in-memory LRU. Writing or reading a blob refreshes its
+modification time. ``python -m agent.blob_store gc DIR --max-age-days N``
+deletes blobs untouched for longer than that, so pick ``N`` above the longest
+time a thread may sit idle before it is resumed.
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+REF_PREFIX = "blob:"
+_REF_RE = re.compile(r"blob:[0-9a-f]{64}")
+
+
+class MissingBlobError(LookupError):
+    """A blob reference in run state whose blob is not in the store."""
+
+
+def is_ref(value) -> bool:
+    """Whether a state value is a blob reference rather than inline text."""
+    return isinstance(value, str) and len(value) == 69 and _REF_RE.fullmatch(value) is not None
+
+
+class BlobStore:
+    """Directory of compressed, content-addressed text blobs."""
+
+    def __init__(self, root: str, cache_entries: int = 256):
+        """Store blobs under ``root``, keeping ``cache_entries`` recently read ones in memory."""
+        self.root = root
+        self.cache_entries = cache_entries
+        self.bytes_written = 0
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:])
+
+    def _remember(self, digest: str, text: str) -> None:
+        with self._lock:
+            self._cache[digest] = text
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+    def put(self, text: str) -> str:
+        """Store text (once per distinct content) and return its reference."""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if os.path.exists(path):
+            self._touch(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            payload = zlib.compress(data, 6)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+            with self._lock:
+                self.bytes_written += len(payload)
+        self._remember(digest, text)
+        return REF_PREFIX + digest
+
+    def get(self, ref: str) -> str:
+        """Return the text behind a reference (raises ``FileNotFoundError`` if missing)."""
+        digest = ref[len(REF_PREFIX):]
+        with self._lock:
+            text = self._cache.get(digest)
+            if text is not None:
+                self._cache.move_to_end(digest)
+                return text
+        path = self._path(digest)
+        with open(path, "rb") as f:
+            text = zlib.decompress(f.read()).decode("utf-8")
+        self._touch(path)
+        self._remember(digest, text)
+        return text
+
+    @staticmethod
+    def _touch(path: str) -> None:
+        # Keeps blobs in use younger than the gc cutoff.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def collect(self, max_age_seconds: float, now: float | None = None) -> int:
+        """Delete blobs not written or read for ``max_age_seconds``; return how many."""
+        cutoff = (time.time() if now is None else now) - max_age_seconds
+        removed = 0
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.unlink(path)
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+        with self._lock:
+            self._cache.clear()
+        return removed
+
+
+_stores: dict[str, BlobStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_blob_store(path: str) -> BlobStore | None:
+    """Return the process-wide store for a directory (``None`` when ``path`` is empty)."""
+    if not path:
+        return None
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = BlobStore(path)
+        return store
+
+
+def store_text(text: str, configurable) -> str:
+    """Return a reference for large text, or the text itself when it stays inline."""
+    store = get_blob_store(configurable.blob_store_path)
+    if store is None or len(text) < configurable.blob_min_chars:
+        return text
+    return store.put(text)
+
+
+def load_texts(values: list[str], configurable) -> list[str]:
+    """Resolve blob references in a list of state values; inline text passes through.
+
+    Raises:
+        MissingBlobError: If a reference cannot be resolved, e.g. the store is
+            disabled, not shared with the process that wrote the thread, or the
+            blob was garbage-collected.
+    """
+    store = get_blob_store(configurable.blob_store_path)
+    texts = []
+    for value in values:
+        if is_ref(value):
+            try:
+                if store is None:
+                    raise FileNotFoundError(value)
+                value = store.get(value)
+            except FileNotFoundError:
+                raise MissingBlobError(
+                    f"Blob {value} is missing from blob_store_path={configurable.blob_store_path!r}; "
+                    "the thread was written by a process with a different or unshared store"
+                ) from None
+        texts.append(value)
+    return texts
+
+
+def main() -> None:
+    """Garbage-collect a blob store directory."""
+    parser = argparse.ArgumentParser(description="Manage the research summary blob store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    gc = commands.add_parser("gc", help="Delete blobs not written or read for a while.")
+    gc.add_argument("path", help="blob_store_path directory.")
+    gc.add_argument("--max-age-days", type=float, required=True, help="Keep blobs touched within this many days.")
+    args = parser.parse_args()
+
+    removed = BlobStore(args.path).collect(args.max_age_days * 86400)
+    sys.stdout.write(f"Removed {removed} blobs from {args.path}\n")
+
+
+if __name__ == "__main__":
+    main()
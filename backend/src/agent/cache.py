@@ -0,0 +1,281 @@
+"""Bounded key/value caches with TTL for search results and other reusable work.
+
+Two interchangeable backends implement the same small interface
+(``get``/``set``/``stats``):
+
+* ``MemoryCache``: an in-process LRU, shared by every run in the process.
+* ``SQLiteCache``: an on-disk table that survives restarts and can be shared
+  by several server processes on one host.
+
+Values must be JSON-serializable. ``get_cache`` hands out one process-wide
+instance per (namespace, backend, settings) so all graph runs share it.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Protocol
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = " \t\n\"'`.,;:!?()[]{}"
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query so trivially different spellings share a cache key.
+
+    Applies Unicode NFKC folding, lower-casing, whitespace collapsing and
+    stripping of surrounding quotes/punctuation. Word order is preserved since
+    it can change what a search engine returns.
+    """
+    query = unicodedata.normalize("NFKC", query).lower()
+    query = _WHITESPACE_RE.sub(" ", query)
+    return query.strip(_EDGE_PUNCTUATION)
+
+
+def content_key(*parts: str) -> str:
+    """Return a content-addressed key (SHA-256 hex digest) for the given parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def format_cache_stats(stats: dict) -> str:
+    """Render a run's cache counters (hits/misses/evictions/saved_seconds) for logs."""
+    hits = stats.get("hits", 0)
+    misses = stats.get("misses", 0)
+    lookups = hits + misses
+    hit_rate = hits / lookups if lookups else 0.0
+    return (
+        f"{hits} hits / {misses} misses ({hit_rate:.0%} hit rate), "
+        f"{stats.get('evictions', 0)} evictions, "
+        f"{stats.get('saved_seconds', 0.0):.2f}s saved"
+    )
+
+
+class Cache(Protocol):
+    """Interface shared by the cache backends."""
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value or ``None`` on a miss or expired entry."""
+        ...
+
+    def set(self, key: str, value: Any) -> int:
+        """Store a value and return the number of entries evicted to make room."""
+        ...
+
+    def stats(self) -> dict[str, int]:
+        """Return lifetime hit/miss/eviction counters."""
+        ...
+
+
+class MemoryCache:
+    """Thread-safe in-memory LRU cache with per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0):
+        """Keep at most ``max_entries``, each for ``ttl_seconds`` (0 keeps them until evicted)."""
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value or ``None`` on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at and expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> int:
+        """Store a value and return the number of entries evicted to make room."""
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            self.evictions += evicted
+        return evicted
+
+    def stats(self) -> dict[str, int]:
+        """Return lifetime hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+            }
+
+
+class SQLiteCache:
+    """On-disk LRU cache with per-entry TTL backed by a single SQLite table.
+
+    Recency is tracked with a ``last_access`` column; when the table grows past
+    ``max_entries`` the least recently used rows are deleted.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        namespace: str = "cache",
+        max_entries: int = 10000,
+        ttl_seconds: float = 86400.0,
+    ):
+        """Open (creating if needed) the ``namespace`` table of the SQLite file at ``path``."""
+        if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", namespace):
+            raise ValueError(f"Invalid cache namespace: {namespace!r}")
+        self.path = path
+        self.table = namespace
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_last_access "
+                f"ON {self.table} (last_access)"
+            )
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value or ``None`` on a miss or expired entry."""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, expires_at = row
+            if expires_at and expires_at <= now:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._conn.execute(
+                f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, value: Any) -> int:
+        """Store a value and return the number of entries evicted to make room."""
+        now = time.time()
+        expires_at = now + self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+        payload = json.dumps(value)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (key, payload, expires_at, now),
+            )
+            (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+            evicted = max(0, count - self.max_entries)
+            if evicted:
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f"SELECT key FROM {self.table} ORDER BY last_access ASC LIMIT ?)",
+                    (evicted,),
+                )
+                self.evictions += evicted
+        return evicted
+
+    def stats(self) -> dict[str, int]:
+        """Return lifetime hit/miss/eviction counters."""
+        with self._lock:
+            (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": count,
+            }
+
+
+_caches: dict[tuple, Cache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(
+    namespace: str,
+    backend: str,
+    max_entries: int,
+    ttl_seconds: float,
+    path: str | None = None,
+) -> Cache | None:
+    """Return the process-wide cache for a namespace, or ``None`` if disabled.
+
+    Args:
+        namespace: Logical name of the cache (also the SQLite table name).
+        backend: ``"memory"``, ``"sqlite"`` or ``"none"``.
+        max_entries: Maximum number of entries before LRU eviction.
+        ttl_seconds: Entry lifetime; ``0`` disables expiry.
+        path: SQLite database file, required for the ``"sqlite"`` backend.
+    """
+    backend = (backend or "none").lower()
+    if backend == "none":
+        return None
+    key = (namespace, backend, max_entries, ttl_seconds, path)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            if backend == "memory":
+                cache = MemoryCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+            elif backend == "sqlite":
+                if not path:
+                    raise ValueError("The sqlite cache backend requires a path.")
+                cache = SQLiteCache(
+                    path, namespace=namespace, max_entries=max_entries, ttl_seconds=ttl_seconds
+                )
+            else:
+                raise ValueError(f"Unknown cache backend: {backend!r}")
+            _caches[key] = cache
+        return cache
+
+
+def all_cache_stats() -> dict[str, dict[str, int]]:
+    """Return lifetime counters of every process-wide cache, keyed by namespace and backend."""
+    with _caches_lock:
+        caches = list(_caches.items())
+    return {f"{key[0]}:{key[1]}": cache.stats() for key, cache in caches}
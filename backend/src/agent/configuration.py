@@ -1,19 +1,75 @@
 import os
-from pydantic import BaseModel, Field
-from typing import Any, Optional
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any
 
 from langchain_core.runnables import RunnableConfig
+from pydantic import BaseModel, ConfigDict, Field
+
+# Resolved configurations, keyed by the environment generation and the
+# configurable values they were built from. Every node of a run (and every
+# fan-out branch) gets the same frozen instance instead of re-reading the
+# environment and revalidating.
+_RESOLVED_MAX_ENTRIES = 256
+_resolved: "OrderedDict[tuple, Configuration]" = OrderedDict()
+# Environment overrides by generation, read once per generation; see
+# ``reload_configuration``. Runs resolve against the generation they started
+# with, so older generations are kept while runs may still be using them.
+_ENVIRONMENTS_MAX_ENTRIES = 16
+_environments: "OrderedDict[str, dict[str, str]]" = OrderedDict()
+_generation: str | None = None
+_lock = threading.Lock()
+
+
+def _environment(names, generation: str | None) -> tuple[str, dict[str, str]]:
+    # Called with ``_lock`` held. Unknown (or evicted) generations resolve
+    # against the current one.
+    global _generation
+    if generation in _environments:
+        return generation, _environments[generation]
+    if _generation is None:
+        _generation = uuid.uuid4().hex
+        _environments[_generation] = {
+            name: os.environ[name.upper()] for name in names if name.upper() in os.environ
+        }
+        if len(_environments) > _ENVIRONMENTS_MAX_ENTRIES:
+            _environments.popitem(last=False)
+    return _generation, _environments[_generation]
+
+
+def configuration_generation() -> str:
+    """Identify the current environment overrides, for a run to resolve against until it ends."""
+    with _lock:
+        return _environment(Configuration.model_fields.keys(), None)[0]
+
+
+def reload_configuration() -> None:
+    """Re-read environment overrides for runs started from now on.
+
+    Runs in progress keep the generation they started with (see
+    ``configuration_generation``).
+    """
+    global _generation
+    with _lock:
+        _generation = None
 
 
 class Configuration(BaseModel):
-    """The configuration for the agent."""
+    """The configuration for the agent.
+
+    Instances are frozen: ``from_runnable_config`` hands the same validated
+    snapshot to every node that resolves the same configurable values.
+    """
+
+    model_config = ConfigDict(frozen=True)
 
     # --- OpenAI/LM Studio Specific Configuration ---
     openai_api_base: str = Field(
         default="http://localhost:1234/v1",
         metadata={"description": "The API base URL for the OpenAI-compatible LLM (e.g., LM Studio)."},
     )
-    openai_api_key: Optional[str] = Field(
+    openai_api_key: str | None = Field(
         default="not_needed", # LM Studio often doesn't require a key
         metadata={"description": "The API key for the OpenAI-compatible LLM."},
     )
@@ -56,27 +112,426 @@ class Configuration(BaseModel):
         metadata={"description": "The maximum number of research loops to perform."},
     )
 
+    # --- Performance ---
+    enable_instrumentation: bool = Field(
+        default=True,
+        metadata={
+            "description": "Record per-node timing/token spans into run state and the /metrics endpoint."
+        },
+    )
+    stream_answer: bool = Field(
+        default=True,
+        metadata={
+            "description": "Stream the final answer token by token to LangGraph's messages stream."
+        },
+    )
+    stream_research_summaries: bool = Field(
+        default=False,
+        metadata={
+            "description": "Also stream web_research summaries token by token."
+        },
+    )
+    query_dedup_similarity_threshold: float = Field(
+        default=0.0,
+        metadata={
+            "description": "Prune queries whose estimated shingle similarity to an already-run query reaches this value (0 prunes only exact/normalized duplicates)."
+        },
+    )
+    min_information_gain: float = Field(
+        default=0.1,
+        metadata={
+            "description": "Stop researching after a loop (from the second on) whose information gain, the mean of its new-source share and summary novelty (0-1), is below this value (0 disables)."
+        },
+    )
+    research_time_budget_seconds: float = Field(
+        default=0.0,
+        metadata={
+            "description": "Stop researching once a run has spent this many wall-clock seconds; the answer is still written (0 means unlimited)."
+        },
+    )
+    research_token_budget: int = Field(
+        default=0,
+        metadata={
+            "description": "Stop researching once a run's LLM calls have used this many tokens, counted whether or not instrumentation is enabled (0 means unlimited)."
+        },
+    )
+    speculative_prefetch: bool = Field(
+        default=False,
+        metadata={
+            "description": "Stream reflection and start searching follow-up queries as soon as each one is generated, parking results in the search cache (most effective with incremental_reflection)."
+        },
+    )
+    speculative_prefetch_limit: int = Field(
+        default=3,
+        metadata={"description": "Maximum speculative searches started per reflection."},
+    )
+    speculative_prefetch_max_waste: float = Field(
+        default=0.5,
+        metadata={
+            "description": "Pause speculation while more than this share of recent speculative searches went unused."
+        },
+    )
+    max_concurrent_searches: int = Field(
+        default=4,
+        metadata={
+            "description": "Process-wide limit on web searches in flight across all runs."
+        },
+    )
+    max_concurrent_llm_calls_per_model: int = Field(
+        default=2,
+        metadata={
+            "description": "Process-wide limit on in-flight calls to each model on each endpoint."
+        },
+    )
+    llm_endpoints: str = Field(
+        default="",
+        metadata={
+            "description": "Comma-separated OpenAI-compatible API bases shared by all model roles; calls are load-balanced across them with failover (empty uses openai_api_base)."
+        },
+    )
+    query_generator_endpoints: str = Field(
+        default="",
+        metadata={"description": "API bases for query_generator_model (empty uses llm_endpoints)."},
+    )
+    search_llm_endpoints: str = Field(
+        default="",
+        metadata={"description": "API bases for search_llm_model (empty uses llm_endpoints)."},
+    )
+    reflection_endpoints: str = Field(
+        default="",
+        metadata={"description": "API bases for reflection_model (empty uses llm_endpoints)."},
+    )
+    answer_endpoints: str = Field(
+        default="",
+        metadata={"description": "API bases for answer_model (empty uses llm_endpoints)."},
+    )
+    llm_routing: str = Field(
+        default="least_outstanding",
+        metadata={
+            "description": "How a call picks its endpoint: 'least_outstanding' (fewest requests in flight) or 'ewma_latency' (lowest recent latency scaled by load)."
+        },
+    )
+    llm_max_retries: int = Field(
+        default=2,
+        metadata={
+            "description": "Client retries when a role has a single endpoint; with several, a failed call fails over to the next endpoint instead."
+        },
+    )
+    llm_endpoint_failure_threshold: int = Field(
+        default=2,
+        metadata={"description": "Consecutive failed requests after which an endpoint is routed to last (server setting, read from the environment)."},
+    )
+    llm_endpoint_cooldown_seconds: float = Field(
+        default=30.0,
+        metadata={
+            "description": "Without active health checks, retry an unhealthy endpoint after this long (server setting, read from the environment)."
+        },
+    )
+    llm_health_check_interval_seconds: float = Field(
+        default=10.0,
+        metadata={
+            "description": "Probe every endpoint's /models this often when a role has several endpoints (0 disables active checks; server setting, read from the environment)."
+        },
+    )
+    llm_batching: bool = Field(
+        default=False,
+        metadata={
+            "description": "Coalesce concurrent non-streamed summarization calls for one model into a single /v1/completions request with a list of prompts (falls back to one chat call each if the server rejects it)."
+        },
+    )
+    llm_batch_window_ms: float = Field(
+        default=20.0,
+        metadata={"description": "How long the first queued prompt waits for others to join its batch."},
+    )
+    llm_batch_max_size: int = Field(
+        default=8,
+        metadata={"description": "Maximum prompts per batched request."},
+    )
+    llm_batch_max_tokens: int = Field(
+        default=1024,
+        metadata={"description": "max_tokens per completion in batched requests."},
+    )
+    answer_context_token_budget: int = Field(
+        default=6000,
+        metadata={
+            "description": "Token budget for the summaries packed into the final answer prompt (0 disables the budget)."
+        },
+    )
+    answer_context_dedup_threshold: float = Field(
+        default=0.85,
+        metadata={
+            "description": "Shingle similarity above which a summary is dropped as a near-duplicate (1 disables)."
+        },
+    )
+    history_window_messages: int = Field(
+        default=8,
+        metadata={
+            "description": "Recent chat messages kept verbatim in the research topic; older ones are folded into a rolling summary once more than twice this many are unfolded (0 keeps the full history)."
+        },
+    )
+    history_summary_max_words: int = Field(
+        default=200,
+        metadata={"description": "Length limit for the rolling summary of older chat messages."},
+    )
+    incremental_reflection: bool = Field(
+        default=False,
+        metadata={
+            "description": "Reflect only over summaries added since the previous loop plus a rolling condensed knowledge state."
+        },
+    )
+    llm_pool_max_clients: int = Field(
+        default=32,
+        metadata={
+            "description": "Maximum number of pooled ChatOpenAI clients kept alive per process."
+        },
+    )
+    search_providers: str = Field(
+        default="duckduckgo",
+        metadata={
+            "description": "Comma-separated search backends ('duckduckgo', 'searxng', 'elasticsearch'); several are queried concurrently and merged."
+        },
+    )
+    search_quorum: int = Field(
+        default=1,
+        metadata={
+            "description": "Return once this many providers have answered (0 waits for all of them)."
+        },
+    )
+    search_deadline_seconds: float = Field(
+        default=10.0,
+        metadata={
+            "description": "Give up on providers that have not answered after this long."
+        },
+    )
+    search_max_results: int = Field(
+        default=5,
+        metadata={"description": "Maximum merged search results passed to the summarizer."},
+    )
+    searxng_url: str = Field(
+        default="http://localhost:8080",
+        metadata={"description": "Base URL of the SearxNG instance for the 'searxng' provider."},
+    )
+    elasticsearch_url: str = Field(
+        default="http://localhost:9200",
+        metadata={"description": "Base URL of the Elasticsearch cluster for the 'elasticsearch' provider."},
+    )
+    elasticsearch_index: str = Field(
+        default="documents",
+        metadata={"description": "Index searched by the 'elasticsearch' provider."},
+    )
+    summary_map_reduce_threshold_tokens: int = Field(
+        default=3000,
+        metadata={
+            "description": "Search payloads above this many (estimated) tokens are summarized with parallel map-reduce instead of one call (0 disables)."
+        },
+    )
+    summary_chunk_tokens: int = Field(
+        default=1500,
+        metadata={"description": "Maximum tokens per map-reduce chunk and per reduce input."},
+    )
+    fetch_pages: bool = Field(
+        default=False,
+        metadata={
+            "description": "Fetch the top search result pages and summarize their extracted text, not just the snippets."
+        },
+    )
+    fetch_top_k: int = Field(
+        default=3,
+        metadata={"description": "Result pages fetched per search query."},
+    )
+    fetch_deadline_seconds: float = Field(
+        default=8.0,
+        metadata={
+            "description": "Overall time budget for fetching one query's pages; unfinished pages are dropped."
+        },
+    )
+    fetch_timeout_seconds: float = Field(
+        default=5.0,
+        metadata={"description": "Connect/read timeout for a single page request."},
+    )
+    fetch_max_bytes: int = Field(
+        default=1_000_000,
+        metadata={"description": "Stop downloading a page after this many bytes."},
+    )
+    fetch_max_chars: int = Field(
+        default=6000,
+        metadata={"description": "Extracted text kept per page (downloading stops once reached)."},
+    )
+    fetch_per_host_limit: int = Field(
+        default=2,
+        metadata={"description": "Concurrent page requests allowed per host, process-wide."},
+    )
+    fetch_allow_private_hosts: bool = Field(
+        default=False,
+        metadata={
+            "description": "Allow fetching pages (and following redirects) to private, loopback and link-local addresses."
+        },
+    )
+    page_cache_backend: str = Field(
+        default="sqlite",
+        metadata={
+            "description": "Where fetched pages are cached by URL (with ETag/Last-Modified): 'sqlite', 'memory' or 'none'."
+        },
+    )
+    page_cache_path: str = Field(
+        default=".cache/agent_cache.sqlite3",
+        metadata={"description": "SQLite file used when page_cache_backend is 'sqlite'."},
+    )
+    page_cache_ttl_seconds: float = Field(
+        default=86400.0,
+        metadata={
+            "description": "Serve a cached page without revalidation for this long; older copies are revalidated."
+        },
+    )
+    page_cache_max_entries: int = Field(
+        default=4096,
+        metadata={"description": "Maximum number of cached pages before LRU eviction."},
+    )
+    blob_store_path: str = Field(
+        default="",
+        metadata={
+            "description": "Directory where large research summaries are stored by content hash, with only references kept in checkpointed state (empty keeps them inline). Must be durable and shared by every process that resumes threads."
+        },
+    )
+    blob_min_chars: int = Field(
+        default=256,
+        metadata={"description": "Summaries shorter than this stay inline in run state."},
+    )
+    local_corpus_path: str = Field(
+        default="",
+        metadata={
+            "description": "Directory of a local document index (built with `python -m agent.local_corpus ingest`); queried alongside the web when set."
+        },
+    )
+    local_corpus_top_k: int = Field(
+        default=5,
+        metadata={"description": "Passages retrieved from the local corpus per query."},
+    )
+    batch_dir: str = Field(
+        default=".batch",
+        metadata={
+            "description": "Directory that batch jobs started over HTTP read questions from and write results to; paths outside it are rejected."
+        },
+    )
+    batch_max_concurrency: int = Field(
+        default=16,
+        metadata={
+            "description": "Most questions a batch request over HTTP may run at once; larger requests are clamped to it."
+        },
+    )
+    search_cache_backend: str = Field(
+        default="memory",
+        metadata={
+            "description": "Where web search results are cached: 'memory', 'sqlite' or 'none'."
+        },
+    )
+    search_cache_path: str = Field(
+        default=".cache/agent_cache.sqlite3",
+        metadata={"description": "SQLite file used when search_cache_backend is 'sqlite'."},
+    )
+    search_cache_ttl_seconds: float = Field(
+        default=3600.0,
+        metadata={
+            "description": "How long a cached search result stays valid (0 disables expiry)."
+        },
+    )
+    search_cache_max_entries: int = Field(
+        default=2048,
+        metadata={"description": "Maximum number of cached search results before LRU eviction."},
+    )
+    run_cache_backend: str = Field(
+        default="none",
+        metadata={
+            "description": "Where finished runs (answer, summaries, sources) are cached by research topic and settings: 'memory', 'sqlite' or 'none'."
+        },
+    )
+    run_cache_mode: str = Field(
+        default="answer",
+        metadata={
+            "description": "On a run cache hit, 'answer' returns the stored answer; 'summaries' reuses the stored research and regenerates only the final answer."
+        },
+    )
+    run_cache_path: str = Field(
+        default=".cache/agent_cache.sqlite3",
+        metadata={"description": "SQLite file used when run_cache_backend is 'sqlite'."},
+    )
+    run_cache_ttl_seconds: float = Field(
+        default=86400.0,
+        metadata={
+            "description": "Research older than this is stale and redone (0 keeps it until evicted)."
+        },
+    )
+    run_cache_max_entries: int = Field(
+        default=512,
+        metadata={"description": "Maximum number of cached runs before LRU eviction."},
+    )
+    summary_cache_backend: str = Field(
+        default="memory",
+        metadata={
+            "description": "Where summaries of identical search payloads are memoized: 'memory', 'sqlite' or 'none'."
+        },
+    )
+    summary_cache_path: str = Field(
+        default=".cache/agent_cache.sqlite3",
+        metadata={"description": "SQLite file used when summary_cache_backend is 'sqlite'."},
+    )
+    summary_cache_ttl_seconds: float = Field(
+        default=0.0,
+        metadata={
+            "description": "How long a memoized summary stays valid (0 keeps it until evicted)."
+        },
+    )
+    summary_cache_max_entries: int = Field(
+        default=1024,
+        metadata={"description": "Maximum number of memoized summaries before LRU eviction."},
+    )
+
     @classmethod
     def from_runnable_config(
-        cls, config: Optional[RunnableConfig] = None
+        cls, config: RunnableConfig | None = None, generation: str | None = None
     ) -> "Configuration":
-        """Create a Configuration instance from a RunnableConfig."""
+        """Return the Configuration for a RunnableConfig.
+
+        Environment variables (UPPER_CASE field names) take precedence over
+        configurable values, as before, but are read once per generation;
+        ``reload_configuration`` starts a new one. ``generation`` pins the
+        environment a run started with (the current one by default).
+        """
         configurable = (
             config["configurable"] if config and "configurable" in config else {}
         )
+        with _lock:
+            generation, environment = _environment(cls.model_fields.keys(), generation)
+        key = (generation, *(configurable.get(name) for name in cls.model_fields))
+        try:
+            hash(key)
+        except TypeError:
+            return cls._resolve(configurable, environment)
+        with _lock:
+            resolved = _resolved.get(key)
+            if resolved is not None:
+                _resolved.move_to_end(key)
+                return resolved
+        resolved = cls._resolve(configurable, environment)
+        with _lock:
+            _resolved[key] = resolved
+            if len(_resolved) > _RESOLVED_MAX_ENTRIES:
+                _resolved.popitem(last=False)
+        return resolved
 
+    @classmethod
+    def _resolve(cls, configurable: dict, environment: dict[str, str]) -> "Configuration":
         # Get raw values from environment or config
         raw_values: dict[str, Any] = {
-            name: os.environ.get(name.upper(), configurable.get(name))
+            name: environment.get(name, configurable.get(name))
             for name in cls.model_fields.keys()
         }
 
         # Filter out None values
         values = {k: v for k, v in raw_values.items() if v is not None}
-        
+
         # Ensure OPENAI_API_KEY is truly optional and doesn't become an empty string if not set
         if "openai_api_key" in values and values["openai_api_key"] == "not_needed":
             values["openai_api_key"] = None
 
-
-        return cls(**values)
\ No newline at end of file
+        return cls(**values)
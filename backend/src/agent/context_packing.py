@@ -0,0 +1,149 @@
+"""Token-budgeted packing of research summaries for the final answer prompt.
+
+``finalize_answer`` used to paste every summary into one prompt, which on deep
+runs overflows small local context windows. ``pack_summaries`` instead:
+
+1. drops near-identical passages (word-shingle Jaccard similarity),
+2. ranks the rest by lexical relevance to the research topic (BM25-style),
+3. greedily fills the token budget, truncating the first passage that does not
+   fit at a sentence boundary and dropping the remainder.
+
+Every dropped token is attributed to a reason so the caller can report it.
+"""
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+from agent.similarity import jaccard, shingles, tokenize
+from agent.utils import estimate_tokens
+
+# Do not bother keeping a truncated passage shorter than this.
+MIN_TRUNCATED_TOKENS = 64
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+@dataclass
+class PackedContext:
+    """Result of packing summaries into a token budget."""
+
+    summaries: list[str]
+    tokens: int
+    dropped_tokens: dict[str, int] = field(default_factory=dict)
+    dropped_passages: dict[str, int] = field(default_factory=dict)
+
+    def report(self) -> dict:
+        """Return a JSON-serializable summary for run state and logs."""
+        return {
+            "kept_passages": len(self.summaries),
+            "kept_tokens": self.tokens,
+            "dropped_tokens": dict(self.dropped_tokens),
+            "dropped_passages": dict(self.dropped_passages),
+        }
+
+
+def _relevance_scores(passages: list[str], query: str) -> list[float]:
+    """Score passages against the query with BM25 over the passages themselves."""
+    query_terms = set(tokenize(query))
+    docs = [Counter(tokenize(passage)) for passage in passages]
+    if not docs or not query_terms:
+        return [0.0] * len(passages)
+    avg_len = sum(sum(doc.values()) for doc in docs) / len(docs) or 1.0
+    doc_freq = Counter(term for doc in docs for term in query_terms if term in doc)
+    k1, b = 1.2, 0.75
+    scores = []
+    for doc in docs:
+        length = sum(doc.values())
+        score = 0.0
+        for term in query_terms:
+            tf = doc.get(term, 0)
+            if not tf:
+                continue
+            idf = math.log(1 + (len(docs) - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_len))
+        scores.append(score)
+    return scores
+
+
+def _truncate(passage: str, token_budget: int) -> str:
+    """Cut a passage to roughly ``token_budget`` tokens, preferring a sentence end."""
+    char_budget = token_budget * 4
+    head = passage[:char_budget]
+    sentences = _SENTENCE_END_RE.split(head)
+    if len(sentences) > 1:
+        head = head[: len(head) - len(sentences[-1])].rstrip()
+    return head + " [...]"
+
+
+def pack_summaries(
+    summaries: list[str],
+    query: str,
+    token_budget: int,
+    dedup_threshold: float = 0.85,
+) -> PackedContext:
+    """Select, order and trim summaries so they fit in ``token_budget`` tokens.
+
+    Args:
+        summaries: Research summaries in the order they were gathered.
+        query: The research topic used to rank passages by relevance.
+        token_budget: Maximum estimated tokens of packed text; ``<= 0`` disables
+            the budget (deduplication still applies).
+        dedup_threshold: Shingle Jaccard similarity above which a passage is
+            treated as a near-duplicate of an earlier one; ``>= 1`` disables it.
+    """
+    dropped_tokens: Counter = Counter()
+    dropped_passages: Counter = Counter()
+
+    unique: list[str] = []
+    seen_shingles: list[set] = []
+    for passage in summaries:
+        passage_shingles = shingles(passage)
+        if dedup_threshold < 1 and any(
+            jaccard(passage_shingles, other) >= dedup_threshold for other in seen_shingles
+        ):
+            dropped_tokens["duplicate"] += estimate_tokens(passage)
+            dropped_passages["duplicate"] += 1
+            continue
+        unique.append(passage)
+        seen_shingles.append(passage_shingles)
+
+    if token_budget <= 0:
+        return PackedContext(
+            summaries=unique,
+            tokens=sum(estimate_tokens(p) for p in unique),
+            dropped_tokens=dict(dropped_tokens),
+            dropped_passages=dict(dropped_passages),
+        )
+
+    scores = _relevance_scores(unique, query)
+    # Stable sort: equally relevant passages keep their gathering order.
+    ranked = sorted(range(len(unique)), key=lambda i: -scores[i])
+
+    kept: list[str] = []
+    used = 0
+    for i in ranked:
+        passage = unique[i]
+        tokens = estimate_tokens(passage)
+        remaining = token_budget - used
+        if tokens <= remaining:
+            kept.append(passage)
+            used += tokens
+        elif remaining >= MIN_TRUNCATED_TOKENS:
+            truncated = _truncate(passage, remaining - 2)  # room for the marker
+            kept.append(truncated)
+            kept_tokens = estimate_tokens(truncated)
+            used += kept_tokens
+            dropped_tokens["truncated"] += max(0, tokens - kept_tokens)
+            dropped_passages["truncated"] += 1
+        else:
+            dropped_tokens["over_budget"] += tokens
+            dropped_passages["over_budget"] += 1
+
+    return PackedContext(
+        summaries=kept,
+        tokens=used,
+        dropped_tokens=dict(dropped_tokens),
+        dropped_passages=dict(dropped_passages),
+    )
@@ -0,0 +1,409 @@
+"""Per-role pools of LLM endpoints with latency-aware routing and failover.
+
+Each model role (``query_generator_model``, ``search_llm_model``,
+``reflection_model``, ``answer_model``) can be served by several
+OpenAI-compatible hosts. The endpoints come from ``<role>_endpoints``, then
+from the shared ``llm_endpoints``, and fall back to ``openai_api_base`` alone.
+
+Traffic is observed where it happens, in the transport of each endpoint's
+shared ``httpx`` pool (see ``agent.llm_pool``). That gives per endpoint:
+
+* outstanding requests (from send until the response body is closed);
+* an EWMA of the latency to response headers;
+* passive health: ``llm_endpoint_failure_threshold`` consecutive connection
+  errors, timeouts, 429 or 5xx answers mark the endpoint unhealthy.
+
+An unhealthy endpoint is routed to last. It becomes healthy again once an
+active check (``GET /models`` every ``llm_health_check_interval_seconds``)
+or a real request succeeds, or after ``llm_endpoint_cooldown_seconds`` when
+active checks are off.
+
+``route`` orders a role's endpoints for one call, using either the fewest
+outstanding requests or the lowest EWMA latency scaled by load. The call
+goes to the first endpoint and fails over to the others in order.
+Routing decisions and endpoint state are exported on ``/metrics``.
+
+The health settings (failure threshold, cooldown, check interval) belong to
+the process-wide registry, so they are server configuration: read from the
+environment when the registry is first used, not from a run's configurable
+values.
+"""
+
+import functools
+import logging
+import threading
+import time
+from typing import Callable
+
+import httpx
+import openai
+
+from agent.configuration import Configuration
+from agent.instrumentation import registry
+
+logger = logging.getLogger(__name__)
+
+ROLE_ENDPOINT_FIELDS = {
+    "query_generator_model": "query_generator_endpoints",
+    "search_llm_model": "search_llm_endpoints",
+    "reflection_model": "reflection_endpoints",
+    "answer_model": "answer_endpoints",
+}
+ROUTING_POLICIES = ("least_outstanding", "ewma_latency")
+# Errors after which a call is retried on the next endpoint of the role.
+FAILOVER_EXCEPTIONS = (
+    openai.APIConnectionError,  # includes timeouts
+    openai.InternalServerError,
+    openai.RateLimitError,
+)
+EWMA_ALPHA = 0.3
+HEALTH_CHECK_TIMEOUT = httpx.Timeout(2.0)
+
+
+class EndpointState:
+    """Live counters for one API base."""
+
+    __slots__ = (
+        "api_base",
+        "outstanding",
+        "ewma_latency",
+        "requests",
+        "failures",
+        "consecutive_failures",
+        "healthy",
+        "unhealthy_since",
+        "routed",
+    )
+
+    def __init__(self, api_base: str):
+        """Start with no requests outstanding and no latency samples."""
+        self.api_base = api_base
+        self.outstanding = 0
+        self.ewma_latency: float | None = None
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.healthy = True
+        self.unhealthy_since = 0.0
+        self.routed = 0
+
+    def as_dict(self) -> dict:
+        """Counters for ``/metrics``."""
+        return {
+            "outstanding": self.outstanding,
+            "ewma_latency_seconds": self.ewma_latency or 0.0,
+            "requests": self.requests,
+            "failures": self.failures,
+            "healthy": int(self.healthy),
+            "routed": self.routed,
+        }
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_endpoints(raw: str, default: str) -> tuple[str, ...]:
+    endpoints = tuple(dict.fromkeys(base.strip().rstrip("/") for base in raw.split(",") if base.strip()))
+    return endpoints or (default,)
+
+
+def role_endpoints(configurable, model_name_in_config: str) -> tuple[str, ...]:
+    """Return the API bases serving a model role, in configured order."""
+    field = ROLE_ENDPOINT_FIELDS.get(model_name_in_config)
+    raw = (getattr(configurable, field) if field else "") or configurable.llm_endpoints
+    return _parse_endpoints(raw, configurable.openai_api_base)
+
+
+class EndpointRegistry:
+    """Process-wide endpoint state, routing and health checking."""
+
+    def __init__(self, failure_threshold: int = 2, cooldown_seconds: float = 30.0, check_interval: float = 10.0):
+        """Trip an endpoint after ``failure_threshold`` failures in a row.
+
+        It is retried after ``cooldown_seconds``, or once an active check
+        every ``check_interval`` seconds (0 disables them) succeeds.
+        """
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._states: dict[str, EndpointState] = {}
+        self._lock = threading.Lock()
+        self._checker: threading.Thread | None = None
+        self._check_interval = check_interval
+
+    def _state_locked(self, api_base: str) -> EndpointState:
+        state = self._states.get(api_base)
+        if state is None:
+            state = self._states[api_base] = EndpointState(api_base)
+        return state
+
+    # --- Passive observation (called from the HTTP transports) ---
+
+    def begin(self, api_base: str) -> float:
+        """Record a request sent to ``api_base`` and return its start time."""
+        with self._lock:
+            state = self._state_locked(api_base)
+            state.outstanding += 1
+            state.requests += 1
+        return time.perf_counter()
+
+    def respond(self, api_base: str, started: float, status_code: int) -> None:
+        """Response headers arrived."""
+        latency = time.perf_counter() - started
+        if status_code == 429 or status_code >= 500:
+            self._failure(api_base, f"HTTP {status_code}")
+            return
+        with self._lock:
+            state = self._state_locked(api_base)
+            state.ewma_latency = (
+                latency
+                if state.ewma_latency is None
+                else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * state.ewma_latency
+            )
+            self._mark_healthy_locked(state)
+        registry.observe(
+            "agent_llm_endpoint_latency_seconds",
+            latency,
+            "Latency from request to response headers per LLM endpoint.",
+            endpoint=api_base,
+        )
+
+    def done(self, api_base: str) -> None:
+        """Record that the response body was closed (or the request failed)."""
+        with self._lock:
+            state = self._state_locked(api_base)
+            state.outstanding = max(0, state.outstanding - 1)
+
+    def error(self, api_base: str, exc: BaseException) -> None:
+        """Record a request that failed before any response."""
+        self._failure(api_base, type(exc).__name__)
+        self.done(api_base)
+
+    def _failure(self, api_base: str, reason: str) -> None:
+        with self._lock:
+            state = self._state_locked(api_base)
+            state.failures += 1
+            state.consecutive_failures += 1
+            tripped = state.healthy and state.consecutive_failures >= self.failure_threshold
+            if tripped:
+                state.healthy = False
+                state.unhealthy_since = time.monotonic()
+        registry.inc(
+            "agent_llm_endpoint_failures_total",
+            help="Failed requests per LLM endpoint.",
+            endpoint=api_base,
+            reason=reason,
+        )
+        if tripped:
+            logger.warning("LLM endpoint %s marked unhealthy (%s)", api_base, reason)
+
+    def _mark_healthy_locked(self, state: EndpointState) -> None:
+        state.consecutive_failures = 0
+        if not state.healthy:
+            state.healthy = True
+            logger.info("LLM endpoint %s healthy again", state.api_base)
+
+    # --- Routing ---
+
+    def route(self, configurable, model_name_in_config: str) -> tuple[str, ...]:
+        """Order a role's endpoints for one call: the first is tried first."""
+        endpoints = role_endpoints(configurable, model_name_in_config)
+        if len(endpoints) == 1:
+            return endpoints
+        self._ensure_checker()
+        policy = configurable.llm_routing
+        if policy not in ROUTING_POLICIES:
+            raise ValueError(f"Unknown llm_routing {policy!r}; expected one of {ROUTING_POLICIES}")
+        now = time.monotonic()
+        with self._lock:
+            states = [self._state_locked(api_base) for api_base in endpoints]
+            for state in states:
+                # Without active checks, give an unhealthy endpoint a new try
+                # once its cooldown has passed.
+                if not state.healthy and not self._check_interval and now - state.unhealthy_since >= self.cooldown_seconds:
+                    state.healthy = True
+                    state.consecutive_failures = 0
+            ordered = sorted(states, key=functools.partial(_score, policy))
+            ordered[0].routed += 1
+        chosen = ordered[0].api_base
+        registry.inc(
+            "agent_llm_routes_total",
+            help="LLM calls routed per role and endpoint.",
+            role=model_name_in_config,
+            endpoint=chosen,
+        )
+        logger.debug(
+            "Routed %s to %s (%s)",
+            model_name_in_config,
+            chosen,
+            ", ".join(f"{s.api_base}: {s.outstanding} out, {s.ewma_latency or 0:.3f}s" for s in ordered),
+        )
+        return tuple(state.api_base for state in ordered)
+
+    # --- Active health checks ---
+
+    def _ensure_checker(self) -> None:
+        if self._check_interval <= 0 or self._checker is not None:
+            return
+        with self._lock:
+            if self._checker is None:
+                self._checker = threading.Thread(target=self._check_loop, name="llm-health", daemon=True)
+                self._checker.start()
+
+    def _check_loop(self) -> None:
+        with httpx.Client(timeout=HEALTH_CHECK_TIMEOUT) as client:
+            while True:
+                for api_base in self.endpoints():
+                    self.check(api_base, client)
+                time.sleep(self._check_interval)
+
+    def check(self, api_base: str, client: httpx.Client) -> bool:
+        """Probe ``GET {api_base}/models`` and update the endpoint's health."""
+        try:
+            ok = client.get(f"{api_base}/models").status_code < 500
+        except httpx.HTTPError:
+            ok = False
+        with self._lock:
+            state = self._state_locked(api_base)
+            if ok:
+                self._mark_healthy_locked(state)
+            elif state.healthy:
+                state.healthy = False
+                state.unhealthy_since = time.monotonic()
+                logger.warning("LLM endpoint %s failed its health check", api_base)
+        return ok
+
+    def endpoints(self) -> list[str]:
+        """Every API base seen so far."""
+        with self._lock:
+            return list(self._states)
+
+    def stats(self) -> dict[str, dict]:
+        """Counters per endpoint."""
+        with self._lock:
+            return {api_base: state.as_dict() for api_base, state in self._states.items()}
+
+
+def _score(policy: str, state: EndpointState) -> tuple:
+    # Healthy endpoints first; ties go to the endpoint routed to least.
+    if policy == "ewma_latency":
+        load = (state.ewma_latency or 0.0) * (state.outstanding + 1)
+    else:
+        load = (state.outstanding, state.ewma_latency or 0.0)
+    return (not state.healthy, load, state.routed)
+
+
+class _ClosingStream(httpx.SyncByteStream):
+    def __init__(self, stream: httpx.SyncByteStream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close = on_close
+        self._closed = False
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self._on_close()
+
+
+class _AsyncClosingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close = on_close
+        self._closed = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self._on_close()
+
+
+class TrackedTransport(httpx.BaseTransport):
+    """Wraps an ``httpx`` transport to report traffic for one endpoint."""
+
+    def __init__(self, transport: httpx.BaseTransport, api_base: str):
+        """Wrap ``transport``, reporting its requests as sent to ``api_base``."""
+        self._transport = transport
+        self._api_base = api_base
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        """Send the request, recording its outcome for the endpoint."""
+        endpoint_registry = get_endpoint_registry()
+        started = endpoint_registry.begin(self._api_base)
+        try:
+            response = self._transport.handle_request(request)
+        except Exception as e:
+            endpoint_registry.error(self._api_base, e)
+            raise
+        except BaseException:
+            endpoint_registry.done(self._api_base)
+            raise
+        endpoint_registry.respond(self._api_base, started, response.status_code)
+        response.stream = _ClosingStream(response.stream, functools.partial(endpoint_registry.done, self._api_base))
+        return response
+
+    def close(self) -> None:
+        """Close the wrapped transport."""
+        self._transport.close()
+
+
+class AsyncTrackedTransport(httpx.AsyncBaseTransport):
+    """Async version of ``TrackedTransport``."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, api_base: str):
+        """Wrap ``transport``, reporting its requests as sent to ``api_base``."""
+        self._transport = transport
+        self._api_base = api_base
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send the request, recording its outcome for the endpoint."""
+        endpoint_registry = get_endpoint_registry()
+        started = endpoint_registry.begin(self._api_base)
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception as e:
+            endpoint_registry.error(self._api_base, e)
+            raise
+        except BaseException:  # cancelled: not the endpoint's fault
+            endpoint_registry.done(self._api_base)
+            raise
+        endpoint_registry.respond(self._api_base, started, response.status_code)
+        response.stream = _AsyncClosingStream(response.stream, functools.partial(endpoint_registry.done, self._api_base))
+        return response
+
+    async def aclose(self) -> None:
+        """Close the wrapped transport."""
+        await self._transport.aclose()
+
+
+_registry: EndpointRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_endpoint_registry() -> EndpointRegistry:
+    """Return the process-wide endpoint registry, created from the server configuration on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                server = Configuration.from_runnable_config()
+                _registry = EndpointRegistry(
+                    server.llm_endpoint_failure_threshold,
+                    server.llm_endpoint_cooldown_seconds,
+                    server.llm_health_check_interval_seconds,
+                )
+    return _registry
+
+
+def endpoint_stats() -> dict[str, dict]:
+    """Return the process-wide per-endpoint counters."""
+    return get_endpoint_registry().stats()
@@ -1,34 +1,82 @@
-import os
+"""The research agent graph: query generation, research, reflection and answer nodes.
+
+Every node has a sync and an async implementation: the graph runs the sync one
+under ``invoke``/``stream`` and the async one under ``ainvoke``/``astream``.
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from typing import Annotated, Any, get_origin, get_type_hints
 
-from agent.tools_and_schemas import SearchQueryList, Reflection
 from dotenv import load_dotenv
 from langchain_core.messages import AIMessage
-from langgraph.types import Send
-from langgraph.graph import StateGraph
-from langgraph.graph import START, END
-from langchain_core.runnables import RunnableConfig
-# from google.genai import Client # Remove: No longer using genai_client directly
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Overwrite, Send
+
+from agent import search_providers
+from agent.batching import BatchUnsupported, get_batcher
+from agent.blob_store import load_texts, store_text
+from agent.cache import content_key, format_cache_stats, get_cache, normalize_query
+from agent.configuration import Configuration, configuration_generation
+from agent.context_packing import pack_summaries
+from agent.endpoints import FAILOVER_EXCEPTIONS, get_endpoint_registry
+from agent.history import compacted_topic, plan_fold
+from agent.instrumentation import (
+    instrumented_node,
+    phase,
+    record_cache,
+    record_llm_usage,
+)
+from agent.llm_pool import get_llm_pool
+from agent.local_corpus import format_passages, open_corpus
+from agent.loop_control import measure_gain, stop_reason
+from agent.page_fetcher import afetch_pages, fetch_pages, fetch_stats, format_pages
+from agent.prefetch import Speculation, get_prefetcher
+from agent.prompts import (
+    answer_instructions,
+    chunk_summary_instructions,
+    get_current_date,
+    history_summary_instructions,
+    incremental_reflection_instructions,
+    query_writer_instructions,
+    reduce_summary_instructions,
+    reflection_instructions,
+    web_searcher_instructions,
+)
+from agent.query_dedup import prune_queries
+from agent.run_cache import (
+    RUN_CACHE_MODES,
+    get_run_cache,
+    lookup_run,
+    run_cache_entry,
+    run_cache_key,
+)
+from agent.scheduler import allm_slot, asearch_slot, llm_slot, search_slot
+from agent.sources import extract_urls, source_entries
 
+# from google.genai import Client # Remove: No longer using genai_client directly
 from agent.state import (
+    RUN_SCOPED_FIELDS,
     OverallState,
     QueryGenerationState,
     ReflectionState,
     WebSearchState,
 )
-from agent.configuration import Configuration
-from agent.prompts import (
-    get_current_date,
-    query_writer_instructions,
-    web_searcher_instructions,
-    reflection_instructions,
-    answer_instructions,
+from agent.summarizer import (
+    amap_reduce_summarize,
+    map_reduce_summarize,
+    needs_map_reduce,
 )
-# from langchain_google_genai import ChatGoogleGenerativeAI # Remove
-from langchain_openai import ChatOpenAI # Add
-from langchain_community.tools import DuckDuckGoSearchRun # Add example search tool
+from agent.tools_and_schemas import IncrementalReflection, Reflection, SearchQueryList
 
+# from langchain_google_genai import ChatGoogleGenerativeAI # Remove
 from agent.utils import (
     # get_citations, # This will likely be incompatible
+    estimate_tokens,
+    format_conversation,
     get_research_topic,
     # insert_citation_markers, # This will likely be incompatible
     # resolve_urls, # This will likely be incompatible
@@ -36,6 +84,8 @@ from agent.utils import (
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Remove GEMINI_API_KEY check, or adapt if you still use Google Search tools that need it
 # if os.getenv("GEMINI_API_KEY") is None:
 #     raise ValueError("GEMINI_API_KEY is not set")
@@ -44,66 +94,354 @@ load_dotenv()
 # genai_client = Client(api_key=os.getenv("GEMINI_API_KEY"))
 
 
-# Helper to get ChatOpenAI instance
+# Helper to get a pooled ChatOpenAI instance (reused across nodes, branches and runs)
 def get_local_llm(configurable: Configuration, model_name_in_config: str, temperature: float = 0.7):
+    """Return a client for one call, routed across the role's endpoints.
+
+    With several endpoints the call goes to the best one right now and fails
+    over to the others in routing order (see agent.endpoints), so call this
+    once per LLM call, after taking the LLM slot.
+    """
     model_identifier = getattr(configurable, model_name_in_config)
     api_key = configurable.openai_api_key if configurable.openai_api_key else "not_needed"
-    return ChatOpenAI(
-        model=model_identifier,
-        openai_api_base=configurable.openai_api_base,
-        openai_api_key=api_key,
-        temperature=temperature,
-        max_retries=2, # Optional
+    pool = get_llm_pool()
+    if pool.max_clients != configurable.llm_pool_max_clients:
+        pool.resize(configurable.llm_pool_max_clients)
+    endpoints = get_endpoint_registry().route(configurable, model_name_in_config)
+    clients = [
+        pool.get(
+            api_base=api_base,
+            model=model_identifier,
+            temperature=temperature,
+            api_key=api_key,
+            max_retries=configurable.llm_max_retries if len(endpoints) == 1 else 0,
+        )
+        for api_base in endpoints
+    ]
+    if len(clients) == 1:
+        return clients[0]
+    return clients[0].with_fallbacks(clients[1:], exceptions_to_handle=FAILOVER_EXCEPTIONS)
+
+
+def _configuration(state, config: RunnableConfig) -> Configuration:
+    # Resolve against the environment generation the run started with (see
+    # ``start_run``), so a configuration reload only affects new runs.
+    return Configuration.from_runnable_config(config, state.get("config_generation"))
+
+
+def _instrumented(node_name: str):
+    # Node spans (timing, tokens, retries, cache hits); see agent.instrumentation.
+    return instrumented_node(
+        node_name, lambda state, config: _configuration(state, config).enable_instrumentation
     )
 
-# Nodes
-def generate_query(state: OverallState, config: RunnableConfig) -> QueryGenerationState:
-    configurable = Configuration.from_runnable_config(config)
 
+def _llm_wait_stats(waited: float | None, calls: int = 1) -> dict:
+    # Per-call backpressure counters, summed across branches into scheduler_stats
+    # (``None`` means no LLM call was made, e.g. on a summary cache hit).
+    return {"llm_calls": calls, "llm_wait_seconds": waited} if waited is not None else {}
+
+
+def _call_llm(llm, prompt: str, config: RunnableConfig, stream: bool) -> tuple[Any, dict]:
+    """Invoke (or stream) an LLM call and time it.
+
+    When streaming, tokens flow to LangGraph's ``messages`` stream mode as they
+    are generated (the node's ``config`` carries the stream callbacks), and the
+    chunks are merged into the final message. Returns the message and
+    ``{time_to_first_token_seconds, total_seconds, chunks}``.
+    """
+    start = time.perf_counter()
+    with phase("llm"):
+        if not stream:
+            message = llm.invoke(prompt, config)
+            total = time.perf_counter() - start
+            record_llm_usage(prompt, message)
+            return message, {"time_to_first_token_seconds": total, "total_seconds": total, "chunks": 1}
+
+        message, first_token, chunks = None, None, 0
+        for chunk in llm.stream(prompt, config):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            message = chunk if message is None else message + chunk
+            chunks += 1
+    total = time.perf_counter() - start
+    record_llm_usage(prompt, message)
+    return message, {"time_to_first_token_seconds": first_token or total, "total_seconds": total, "chunks": chunks}
+
+
+async def _acall_llm(llm, prompt: str, config: RunnableConfig, stream: bool) -> tuple[Any, dict]:
+    start = time.perf_counter()
+    with phase("llm"):
+        if not stream:
+            message = await llm.ainvoke(prompt, config)
+            total = time.perf_counter() - start
+            record_llm_usage(prompt, message)
+            return message, {"time_to_first_token_seconds": total, "total_seconds": total, "chunks": 1}
+
+        message, first_token, chunks = None, None, 0
+        async for chunk in llm.astream(prompt, config):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            message = chunk if message is None else message + chunk
+            chunks += 1
+    total = time.perf_counter() - start
+    record_llm_usage(prompt, message)
+    return message, {"time_to_first_token_seconds": first_token or total, "total_seconds": total, "chunks": chunks}
+
+
+# Nodes
+#
+# Every node has a synchronous implementation and an async twin (``a``-prefixed)
+# that awaits the LLM and the search tool instead of blocking a worker thread.
+# Both are registered on the same graph node, so ``graph.invoke``/``graph.stream``
+# use the sync path and ``graph.ainvoke``/``graph.astream`` (what the LangGraph
+# server uses) stay on the event loop. Prompt building and result handling are
+# shared so the two paths cannot drift apart.
+def _generate_query_prompt(state: OverallState, configurable: Configuration) -> str:
     if state.get("initial_search_query_count") is None:
         state["initial_search_query_count"] = configurable.number_of_initial_queries
 
-    llm = get_local_llm(configurable, "query_generator_model", temperature=1.0)
-    structured_llm = llm.with_structured_output(SearchQueryList)
-
     current_date = get_current_date()
-    formatted_prompt = query_writer_instructions.format(
+    return query_writer_instructions.format(
         current_date=current_date,
-        research_topic=get_research_topic(state["messages"]),
+        research_topic=_research_topic(state),
         number_queries=state["initial_search_query_count"],
     )
-    result = structured_llm.invoke(formatted_prompt)
-    return {"query_list": result.query}
 
 
-def continue_to_web_research(state: QueryGenerationState):
+def _generate_query_output(
+    state: OverallState, configurable: Configuration, result: SearchQueryList, waited: float
+) -> QueryGenerationState:
+    # Skip queries this conversation already searched (e.g. in an earlier turn),
+    # but always keep at least one so the run still has something to research.
+    dedup = prune_queries(
+        result.query,
+        state.get("search_query") or [],
+        configurable.query_dedup_similarity_threshold,
+    )
+    query_list = dedup.kept or result.query[:1]
+    return {
+        "query_list": query_list,
+        "query_dedup": [dedup.report(loop=0)],
+        "scheduler_stats": _llm_wait_stats(waited),
+        # Start of this run's wall-clock budget.
+        "run_started_at": time.time(),
+        "stop_reason": "",
+        # This run's topic, reused by the other nodes (see agent.history).
+        "research_topic": state["research_topic"],
+        "history_summary": state.get("history_summary") or "",
+        "history_summary_count": state.get("history_summary_count") or 0,
+        # Where this run's entries start in the thread's accumulated lists.
+        "run_summary_offset": len(state.get("web_research_result") or []),
+        "run_query_offset": len(state.get("search_query") or []),
+        "run_source_offset": len(state.get("sources_gathered") or []),
+    }
+
+
+def _research_topic(state: OverallState) -> str:
+    # generate_query computes the (possibly compacted) topic once per run.
+    return state.get("research_topic") or get_research_topic(state["messages"])
+
+
+def _history_fold_prompt(state: OverallState, configurable: Configuration) -> tuple[str, int] | None:
+    """Return the prompt folding older messages into the rolling summary, and the new folded count."""
+    plan = plan_fold(
+        len(state["messages"]), state.get("history_summary_count") or 0, configurable.history_window_messages
+    )
+    if plan is None:
+        return None
+    return history_summary_instructions.format(
+        max_words=configurable.history_summary_max_words,
+        summary=state.get("history_summary") or "(none yet)",
+        messages=format_conversation(state["messages"][plan.start : plan.end]),
+    ), plan.end
+
+
+def _history_output(state: OverallState, configurable: Configuration, summary: str, folded: int) -> dict:
+    if configurable.history_window_messages <= 0:
+        return {"research_topic": get_research_topic(state["messages"])}
+    return {
+        "research_topic": compacted_topic(state["messages"], summary, folded),
+        "history_summary": summary,
+        "history_summary_count": folded,
+    }
+
+
+def _compact_history(state: OverallState, configurable: Configuration, config: RunnableConfig) -> dict:
+    """Fold messages that left the history window, then build this run's topic."""
+    summary, folded = state.get("history_summary") or "", state.get("history_summary_count") or 0
+    fold = _history_fold_prompt(state, configurable)
+    if fold is not None:
+        prompt, folded = fold
+        with llm_slot(configurable, "search_llm_model", config):
+            llm = get_local_llm(configurable, "search_llm_model", temperature=0.0)
+            with phase("llm"):
+                response = llm.invoke(prompt)
+        record_llm_usage(prompt, response)
+        summary = _message_text(response)
+    return _history_output(state, configurable, summary, folded)
+
+
+async def _acompact_history(state: OverallState, configurable: Configuration, config: RunnableConfig) -> dict:
+    summary, folded = state.get("history_summary") or "", state.get("history_summary_count") or 0
+    fold = _history_fold_prompt(state, configurable)
+    if fold is not None:
+        prompt, folded = fold
+        async with allm_slot(configurable, "search_llm_model", config):
+            llm = get_local_llm(configurable, "search_llm_model", temperature=0.0)
+            with phase("llm"):
+                response = await llm.ainvoke(prompt)
+        record_llm_usage(prompt, response)
+        summary = _message_text(response)
+    return _history_output(state, configurable, summary, folded)
+
+
+@_instrumented("generate_query")
+def generate_query(state: OverallState, config: RunnableConfig) -> QueryGenerationState:
+    """Write the search queries for the user's question."""
+    configurable = _configuration(state, config)
+    state.update(_compact_history(state, configurable, config))
+    formatted_prompt = _generate_query_prompt(state, configurable)
+
+    with llm_slot(configurable, "query_generator_model", config) as waited:
+        llm = get_local_llm(configurable, "query_generator_model", temperature=1.0)
+        with phase("llm"):
+            result = llm.with_structured_output(SearchQueryList).invoke(formatted_prompt)
+    record_llm_usage(formatted_prompt, result)
+    return _generate_query_output(state, configurable, result, waited)
+
+
+@_instrumented("generate_query")
+async def agenerate_query(state: OverallState, config: RunnableConfig) -> QueryGenerationState:
+    """Async version of ``generate_query``."""
+    configurable = _configuration(state, config)
+    state.update(await _acompact_history(state, configurable, config))
+    formatted_prompt = _generate_query_prompt(state, configurable)
+
+    async with allm_slot(configurable, "query_generator_model", config) as waited:
+        llm = get_local_llm(configurable, "query_generator_model", temperature=1.0)
+        with phase("llm"):
+            result = await llm.with_structured_output(SearchQueryList).ainvoke(formatted_prompt)
+    record_llm_usage(formatted_prompt, result)
+    return _generate_query_output(state, configurable, result, waited)
+
+
+def _research_sends(search_query: str, idx: int, configurable: Configuration, generation: str | None) -> list[Send]:
+    # Every query goes to the web; with a local corpus configured it is also
+    # answered from the on-disk index in parallel. Branches carry the run's
+    # configuration generation along with their query.
+    payload = {"search_query": search_query, "id": idx, "config_generation": generation}
+    sends = [Send("web_research", payload)]
+    if configurable.local_corpus_path:
+        sends.append(Send("local_research", payload))
+    return sends
+
+
+def continue_to_web_research(state: QueryGenerationState, config: RunnableConfig):
+    """Send each search query to its research branches."""
+    configurable = _configuration(state, config)
     return [
-        Send("web_research", {"search_query": search_query, "id": int(idx)})
+        send
         for idx, search_query in enumerate(state["query_list"])
+        for send in _research_sends(search_query, int(idx), configurable, state.get("config_generation"))
     ]
 
 
-def web_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
-    configurable = Configuration.from_runnable_config(config)
-    
-    print(f"--- Performing web research for query: {state['search_query']} ---")
+def _run_search_tool(query: str, configurable: Configuration) -> str:
+    # Providers (DuckDuckGo, SearxNG, Elasticsearch, ...) come from configuration;
+    # several are queried concurrently and merged, see agent.search_providers.
+    return search_providers.format_results(search_providers.search(query, configurable))
+
+
+async def _arun_search_tool(query: str, configurable: Configuration) -> str:
+    return search_providers.format_results(await search_providers.asearch(query, configurable))
+
+
+def _search_cache(configurable: Configuration):
+    return get_cache(
+        "search_results",
+        configurable.search_cache_backend,
+        max_entries=configurable.search_cache_max_entries,
+        ttl_seconds=configurable.search_cache_ttl_seconds,
+        path=configurable.search_cache_path,
+    )
+
+
+def _search_cache_key(configurable: Configuration, query: str) -> str:
+    # Results differ per provider selection, so it is part of the key.
+    return f"{search_providers.providers_label(configurable)}:{normalize_query(query)}"
+
+
+def _search_cache_lookup(cache, key: str):
+    """Return (text, stats) on a cache hit, otherwise None."""
+    if cache is None:
+        return None
+    entry = cache.get(key)
+    record_cache(hit=entry is not None)
+    if entry is None:
+        return None
+    return entry["text"], {"hits": 1, "saved_seconds": entry["latency"]}
+
+
+def _search_cache_store(cache, key: str, text: str, latency: float) -> dict:
+    stats = {"misses": 1}
+    if cache is not None:
+        stats["evictions"] = cache.set(key, {"text": text, "latency": latency})
+    return stats
+
+
+def _search(query: str, configurable: Configuration, config: RunnableConfig) -> tuple[str, dict, float]:
+    """Run a web search through the shared result cache and the search limiter.
+
+    Returns the result text, this call's cache counters and the seconds spent
+    queued for a search slot.
+    """
+    cache = _search_cache(configurable)
+    key = _search_cache_key(configurable, query)
+    # A speculative search for this query may still be running; join it
+    # rather than searching twice.
+    get_prefetcher().wait(key, configurable.search_deadline_seconds)
+    cached = _search_cache_lookup(cache, key)
+    if cached is not None:
+        return (*cached, 0.0)
 
-    # Initialize a search tool (e.g., DuckDuckGo)
-    # For Google Search, you'd use GoogleSearchRun and ensure GOOGLE_API_KEY/GOOGLE_CSE_ID are set
-    search_tool = DuckDuckGoSearchRun()
+    waited = 0.0
     try:
-        search_results_text = search_tool.run(state["search_query"])
+        with search_slot(configurable, config) as waited:
+            start = time.perf_counter()
+            with phase("search"):
+                text = _run_search_tool(query, configurable)
     except Exception as e:
-        print(f"Error during web search for '{state['search_query']}': {e}")
-        search_results_text = "Error performing web search."
+        logger.warning("Error during web search for %r: %s", query, e)
+        return "Error performing web search.", {"misses": 1, "errors": 1}, waited
+    return text, _search_cache_store(cache, key, text, time.perf_counter() - start), waited
 
-    # Use a local LLM to summarize the search results
+
+async def _asearch(query: str, configurable: Configuration, config: RunnableConfig) -> tuple[str, dict, float]:
+    cache = _search_cache(configurable)
+    key = _search_cache_key(configurable, query)
+    await get_prefetcher().await_inflight(key, configurable.search_deadline_seconds)
+    cached = _search_cache_lookup(cache, key)
+    if cached is not None:
+        return (*cached, 0.0)
+
+    waited = 0.0
+    try:
+        async with asearch_slot(configurable, config) as waited:
+            start = time.perf_counter()
+            with phase("search"):
+                text = await _arun_search_tool(query, configurable)
+    except Exception as e:
+        logger.warning("Error during web search for %r: %s", query, e)
+        return "Error performing web search.", {"misses": 1, "errors": 1}, waited
+    return text, _search_cache_store(cache, key, text, time.perf_counter() - start), waited
+
+
+def _summarization_prompt(state: WebSearchState, search_results_text: str) -> str:
     # The original web_searcher_instructions might need adjustment as it expected Google Search tool behavior
-    llm = get_local_llm(configurable, "search_llm_model", temperature=0.0)
-    
-    summarization_prompt = f"""{web_searcher_instructions.format(
+    return f"""{web_searcher_instructions.format(
         current_date=get_current_date(),
-        research_topic=state["search_query"] 
+        research_topic=state["search_query"]
     )}
 
     Search Results:
@@ -112,102 +450,733 @@ def web_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
     Please provide a concise summary of the findings based *only* on the provided search results.
     Include relevant URLs if found in the search results.
     """
-    
-    summary_response = llm.invoke(summarization_prompt)
-    summary_content = summary_response.content if hasattr(summary_response, "content") else str(summary_response)
-
-    # --- Citation and Source Handling (Simplified / Placeholder) ---
-    # The original citation mechanism (get_citations, insert_citation_markers, resolve_urls)
-    # relied on Google's genai_client grounding_metadata, which is not available here.
-    # You'll need to implement a new way to extract and format sources if desired.
-    # For now, we'll just pass the raw summary and a simplified source list.
-    
-    # Example: try to extract URLs from the search_results_text (very basic)
-    import re
-    urls_found = re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', search_results_text)
-    
-    simple_sources = [{"label": url.split('/')[2], "short_url": f"source-{state['id']}-{i}", "value": url} for i, url in enumerate(list(set(urls_found))[:5])] # Top 5 unique
 
-    print(f"--- Web research for '{state['search_query']}' completed. Summary: {summary_content[:100]}... ---")
+
+def _chunk_summary_prompt(state: WebSearchState, chunk: str, part: int, parts: int) -> str:
+    return chunk_summary_instructions.format(
+        part=part,
+        parts=parts,
+        research_topic=state["search_query"],
+        current_date=get_current_date(),
+        chunk=chunk,
+    )
+
+
+def _reduce_summary_prompt(state: WebSearchState, partials: list[str]) -> str:
+    return reduce_summary_instructions.format(
+        research_topic=state["search_query"],
+        current_date=get_current_date(),
+        summaries="\n\n---\n\n".join(partials),
+    )
+
+
+def _message_text(response) -> str:
+    return response.content if hasattr(response, "content") else str(response)
+
+
+def _summarization_stats(report: dict, batch_errors: list[Exception]) -> dict:
+    """Add the batched calls that failed over to per-prompt calls to the map-reduce report."""
+    return {**report, "batch_errors": len(batch_errors)} if batch_errors else report
+
+
+def _summarize(
+    state: WebSearchState, configurable: Configuration, config: RunnableConfig, search_results_text: str
+) -> tuple[str, dict, dict]:
+    """Summarize search results in one call, or with map-reduce above the size threshold.
+
+    Returns the summary, the LLM backpressure counters and the summarization
+    counters (the map-reduce report and failed batched calls, if any).
+    """
+    batcher = get_batcher(configurable, "search_llm_model") if configurable.llm_batching else None
+    waits: list[float] = []
+    batch_errors: list[Exception] = []
+
+    def complete(prompt: str, stream: bool = False) -> str:
+        if batcher is not None and not stream and batcher.supported is not False:
+            try:
+                with phase("llm"):
+                    result = batcher.submit(prompt).result()
+            except BatchUnsupported:
+                pass
+            except Exception as e:
+                # Fall back to the per-prompt path below, which has endpoint
+                # failover and client retries that the batched call lacks.
+                logger.warning("Batched summarization failed, retrying per prompt: %s", e)
+                batch_errors.append(e)
+            else:
+                waits.append(result.waited)
+                record_llm_usage(prompt, result.text)
+                return result.text
+        with llm_slot(configurable, "search_llm_model", config) as waited:
+            llm = get_local_llm(configurable, "search_llm_model", temperature=0.0)
+            response, _ = _call_llm(llm, prompt, config, stream)
+        waits.append(waited)
+        return _message_text(response)
+
+    if not needs_map_reduce(search_results_text, configurable.summary_map_reduce_threshold_tokens):
+        summary = complete(_summarization_prompt(state, search_results_text), configurable.stream_research_summaries)
+        return summary, _llm_wait_stats(sum(waits)), _summarization_stats({}, batch_errors)
+
+    summary, report = map_reduce_summarize(
+        search_results_text,
+        complete,
+        functools.partial(_chunk_summary_prompt, state),
+        functools.partial(_reduce_summary_prompt, state),
+        chunk_tokens=configurable.summary_chunk_tokens,
+        # Batched chunks share one request, so submit a whole batch at once.
+        max_workers=(
+            configurable.llm_batch_max_size
+            if batcher is not None
+            else configurable.max_concurrent_llm_calls_per_model
+        ),
+    )
+    stats = _summarization_stats(report.stats(), batch_errors)
+    return summary, _llm_wait_stats(sum(waits), len(waits)), stats
+
+
+async def _asummarize(
+    state: WebSearchState, configurable: Configuration, config: RunnableConfig, search_results_text: str
+) -> tuple[str, dict, dict]:
+    """Async version of ``_summarize``."""
+    batcher = get_batcher(configurable, "search_llm_model") if configurable.llm_batching else None
+    waits: list[float] = []
+    batch_errors: list[Exception] = []
+
+    async def acomplete(prompt: str, stream: bool = False) -> str:
+        if batcher is not None and not stream and batcher.supported is not False:
+            try:
+                with phase("llm"):
+                    result = await asyncio.wrap_future(batcher.submit(prompt))
+            except BatchUnsupported:
+                pass
+            except Exception as e:
+                # Fall back to the per-prompt path below, which has endpoint
+                # failover and client retries that the batched call lacks.
+                logger.warning("Batched summarization failed, retrying per prompt: %s", e)
+                batch_errors.append(e)
+            else:
+                waits.append(result.waited)
+                record_llm_usage(prompt, result.text)
+                return result.text
+        async with allm_slot(configurable, "search_llm_model", config) as waited:
+            llm = get_local_llm(configurable, "search_llm_model", temperature=0.0)
+            response, _ = await _acall_llm(llm, prompt, config, stream)
+        waits.append(waited)
+        return _message_text(response)
+
+    if not needs_map_reduce(search_results_text, configurable.summary_map_reduce_threshold_tokens):
+        summary = await acomplete(
+            _summarization_prompt(state, search_results_text), configurable.stream_research_summaries
+        )
+        return summary, _llm_wait_stats(sum(waits)), _summarization_stats({}, batch_errors)
+
+    summary, report = await amap_reduce_summarize(
+        search_results_text,
+        acomplete,
+        functools.partial(_chunk_summary_prompt, state),
+        functools.partial(_reduce_summary_prompt, state),
+        chunk_tokens=configurable.summary_chunk_tokens,
+    )
+    stats = _summarization_stats(report.stats(), batch_errors)
+    return summary, _llm_wait_stats(sum(waits), len(waits)), stats
+
+
+def _summary_cache(configurable: Configuration):
+    return get_cache(
+        "search_summaries",
+        configurable.summary_cache_backend,
+        max_entries=configurable.summary_cache_max_entries,
+        ttl_seconds=configurable.summary_cache_ttl_seconds,
+        path=configurable.summary_cache_path,
+    )
+
+
+def _summary_cache_key(configurable: Configuration, search_results_text: str) -> str:
+    # Content-addressed: identical search payloads summarized by the same model
+    # with the same instructions always produce a reusable summary.
+    return content_key(configurable.search_llm_model, web_searcher_instructions, search_results_text)
+
+
+def _summary_cache_lookup(cache, key: str):
+    """Return (summary, urls, stats) on a cache hit, otherwise None."""
+    if cache is None:
+        return None
+    entry = cache.get(key)
+    record_cache(hit=entry is not None)
+    if entry is None:
+        return None
+    return entry["summary"], entry["urls"], {"hits": 1, "saved_seconds": entry["latency"]}
+
+
+def _summary_cache_store(cache, key: str, summary_content: str, urls: list[str], latency: float) -> dict:
+    stats = {"misses": 1}
+    if cache is not None:
+        stats["evictions"] = cache.set(
+            key, {"summary": summary_content, "urls": urls, "latency": latency}
+        )
+    return stats
+
+
+def _page_urls(configurable: Configuration, search_results_text: str, search_cache_stats: dict) -> list[str]:
+    # Top-ranked result URLs whose pages are fetched for the summarizer (none
+    # when fetching is off or the search failed).
+    if not configurable.fetch_pages or search_cache_stats.get("errors"):
+        return []
+    return extract_urls(search_results_text, limit=configurable.fetch_top_k)
+
+
+def _with_pages(search_results_text: str, pages) -> str:
+    page_text = format_pages(pages)
+    return f"{search_results_text}\n\nFetched page content:\n{page_text}" if page_text else search_results_text
+
+
+def _web_research_output(
+    state: WebSearchState,
+    configurable: Configuration,
+    summary_content: str,
+    urls: list[str],
+    cache_stats: dict,
+    scheduler_stats: dict,
+    page_fetch_stats: dict,
+    map_reduce_stats: dict,
+) -> OverallState:
+    # --- Citation and Source Handling (Simplified) ---
+    # The original citation mechanism relied on Google's grounding metadata,
+    # which is not available here; sources are the result URLs instead.
+    sources = source_entries(urls)
+
+    logger.debug("Web research for %r completed. Summary: %.100s...", state["search_query"], summary_content)
 
     return {
-        "sources_gathered": simple_sources, # Simplified sources
+        "sources_gathered": sources,
+        "source_hits": len(sources),
         "search_query": [state["search_query"]],
-        "web_research_result": [summary_content], # Summary from local LLM
+        "web_research_result": [store_text(summary_content, configurable)], # Summary from local LLM
+        "cache_stats": cache_stats,
+        "scheduler_stats": scheduler_stats,
+        "fetch_stats": page_fetch_stats,
+        "summarization_stats": map_reduce_stats,
     }
 
 
-def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
-    configurable = Configuration.from_runnable_config(config)
-    state["research_loop_count"] = state.get("research_loop_count", 0) + 1
+@_instrumented("web_research")
+def web_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
+    """Search the web for one query and summarize the results."""
+    configurable = _configuration(state, config)
     
-    # The original code used 'reasoning_model' from state or config.
-    # We'll use 'reflection_model' as defined in our new Configuration.
-    # If you want to keep 'reasoning_model' as a dynamic override, adjust accordingly.
-    reasoning_model_name_key = "reflection_model" # state.get("reasoning_model") or configurable.reflection_model
+    logger.debug("Performing web research for query: %r", state["search_query"])
+    search_results_text, search_cache_stats, search_waited = _search(state["search_query"], configurable, config)
+
+    # Optionally enrich the snippets with the extracted text of the top pages.
+    pages = []
+    page_urls = _page_urls(configurable, search_results_text, search_cache_stats)
+    if page_urls:
+        with phase("fetch"):
+            pages = fetch_pages(page_urls, configurable)
+        search_results_text = _with_pages(search_results_text, pages)
+
+    # Identical search payloads reuse a stored summary instead of another LLM call
+    # (failed searches are never memoized).
+    summary_cache = _summary_cache(configurable) if not search_cache_stats.get("errors") else None
+    summary_key = _summary_cache_key(configurable, search_results_text)
+    cached = _summary_cache_lookup(summary_cache, summary_key)
+    llm_stats, map_reduce_stats = {}, {}
+    if cached is not None:
+        summary_content, urls, summary_cache_stats = cached
+    else:
+        # Use a local LLM to summarize the search results
+        start = time.perf_counter()
+        summary_content, llm_stats, map_reduce_stats = _summarize(state, configurable, config, search_results_text)
+        urls = extract_urls(search_results_text)
+        summary_cache_stats = _summary_cache_store(
+            summary_cache, summary_key, summary_content, urls, time.perf_counter() - start
+        )
+
+    return _web_research_output(
+        state,
+        configurable,
+        summary_content,
+        urls,
+        {"search": search_cache_stats, "summary": summary_cache_stats},
+        {**llm_stats, "search_wait_seconds": search_waited},
+        fetch_stats(pages),
+        map_reduce_stats,
+    )
+
+
+@_instrumented("web_research")
+async def aweb_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
+    """Async version of ``web_research``."""
+    configurable = _configuration(state, config)
+
+    logger.debug("Performing web research for query: %r", state["search_query"])
+    search_results_text, search_cache_stats, search_waited = await _asearch(state["search_query"], configurable, config)
+
+    pages = []
+    page_urls = _page_urls(configurable, search_results_text, search_cache_stats)
+    if page_urls:
+        with phase("fetch"):
+            pages = await afetch_pages(page_urls, configurable)
+        search_results_text = _with_pages(search_results_text, pages)
+
+    summary_cache = _summary_cache(configurable) if not search_cache_stats.get("errors") else None
+    summary_key = _summary_cache_key(configurable, search_results_text)
+    cached = _summary_cache_lookup(summary_cache, summary_key)
+    llm_stats, map_reduce_stats = {}, {}
+    if cached is not None:
+        summary_content, urls, summary_cache_stats = cached
+    else:
+        start = time.perf_counter()
+        summary_content, llm_stats, map_reduce_stats = await _asummarize(
+            state, configurable, config, search_results_text
+        )
+        urls = extract_urls(search_results_text)
+        summary_cache_stats = _summary_cache_store(
+            summary_cache, summary_key, summary_content, urls, time.perf_counter() - start
+        )
+
+    return _web_research_output(
+        state,
+        configurable,
+        summary_content,
+        urls,
+        {"search": search_cache_stats, "summary": summary_cache_stats},
+        {**llm_stats, "search_wait_seconds": search_waited},
+        fetch_stats(pages),
+        map_reduce_stats,
+    )
+
+
+def _local_research(state: WebSearchState, configurable: Configuration) -> OverallState:
+    with open_corpus(configurable.local_corpus_path) as corpus:
+        if corpus is None:
+            logger.warning("Local corpus index not found at %r", configurable.local_corpus_path)
+            return {}
+        with phase("retrieval"):
+            passages = corpus.search(state["search_query"], configurable.local_corpus_top_k)
+    if not passages:
+        return {}
+    return {
+        # Same shape as web_research; search_query is recorded there only, so
+        # it still counts each query once.
+        "sources_gathered": source_entries(
+            [passage.source for passage in passages], [passage.title for passage in passages]
+        ),
+        "source_hits": len(passages),
+        "web_research_result": [store_text(format_passages(state["search_query"], passages), configurable)],
+    }
+
+
+@_instrumented("local_research")
+def local_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
+    """Retrieve passages for the query from the local document corpus index."""
+    return _local_research(state, _configuration(state, config))
+
+
+@_instrumented("local_research")
+async def alocal_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
+    """Async version of ``local_research``."""
+    # Index reads are blocking (mmap page faults), so keep them off the event loop.
+    return await asyncio.to_thread(_local_research, state, _configuration(state, config))
+
+
+def _research_summaries(state: OverallState, configurable: Configuration, start: int = 0) -> list[str]:
+    # Summaries may be stored out of state as blob references; only the
+    # requested slice is loaded.
+    return load_texts(state["web_research_result"][start:], configurable)
+
+
+def _prompt_summaries(state: OverallState, configurable: Configuration, start: int = 0) -> list[str]:
+    # With history compaction, earlier turns reach the prompts through the
+    # conversation (window and rolling summary), so only this run's research
+    # is sent and prompts stay flat as the thread grows.
+    if configurable.history_window_messages <= 0:
+        return _research_summaries(state, configurable, start)
+    return _research_summaries(state, configurable, max(start, state.get("run_summary_offset") or 0))
+
+
+def _reflected_summary_end(state: OverallState) -> int:
+    # Index in web_research_result past the summaries already folded into
+    # this run's knowledge state.
+    return (state.get("run_summary_offset") or 0) + (state.get("reflected_summary_count") or 0)
+
 
+def _reflection_prompt(state: OverallState, configurable: Configuration) -> tuple[str, type[Reflection]]:
+    """Build the reflection prompt and the schema the model should answer with.
+
+    In incremental mode only the summaries added since the previous loop are
+    sent, together with the rolling condensed knowledge state, so the prompt
+    stays roughly constant in size as the number of loops grows.
+    """
     current_date = get_current_date()
-    formatted_prompt = reflection_instructions.format(
+    if configurable.incremental_reflection:
+        new_summaries = _prompt_summaries(state, configurable, _reflected_summary_end(state))
+        return incremental_reflection_instructions.format(
+            current_date=current_date,
+            research_topic=_research_topic(state),
+            knowledge_state=state.get("knowledge_state") or "(nothing yet)",
+            summaries="\n\n---\n\n".join(new_summaries),
+        ), IncrementalReflection
+    return reflection_instructions.format(
         current_date=current_date,
-        research_topic=get_research_topic(state["messages"]),
-        summaries="\n\n---\n\n".join(state["web_research_result"]),
+        research_topic=_research_topic(state),
+        summaries="\n\n---\n\n".join(_prompt_summaries(state, configurable)),
+    ), Reflection
+
+
+def _max_research_loops(state: OverallState, configurable: Configuration) -> int:
+    if state.get("max_research_loops") is not None:
+        return state["max_research_loops"]
+    return configurable.max_research_loops
+
+
+def _prefetch_search(query: str, key: str, configurable: Configuration, config: RunnableConfig) -> None:
+    # Runs on a prefetch thread: search and park the result in the search
+    # cache, where the next loop's web_research will find it.
+    cache = _search_cache(configurable)
+    if cache.get(key) is not None:
+        return
+    with search_slot(configurable, config):
+        start = time.perf_counter()
+        text = _run_search_tool(query, configurable)
+    cache.set(key, {"text": text, "latency": time.perf_counter() - start})
+
+
+def _speculation(state: OverallState, configurable: Configuration, config: RunnableConfig) -> Speculation | None:
+    """Set up speculative follow-up searches for this reflection, if worthwhile.
+
+    Only when another loop can follow, results can be parked in the search
+    cache and recent speculation has not been mostly wasted.
+    """
+    if not configurable.speculative_prefetch or _search_cache(configurable) is None:
+        return None
+    if state["research_loop_count"] >= _max_research_loops(state, configurable):
+        return None
+    prefetcher = get_prefetcher()
+    if prefetcher.paused(configurable.speculative_prefetch_max_waste):
+        logger.debug("Speculative prefetch paused, recent waste %.0f%%", prefetcher.waste_ratio() * 100)
+        return None
+
+    def launch(query: str) -> bool:
+        key = _search_cache_key(configurable, query)
+        return prefetcher.submit(key, functools.partial(_prefetch_search, query, key, configurable, config))
+
+    return Speculation(state["search_query"], configurable.speculative_prefetch_limit, launch)
+
+
+def _stream_reflection(llm, schema: type[Reflection], prompt: str, speculation: Speculation) -> Reflection:
+    text = ""
+    for chunk in llm.stream(prompt, response_format=schema):
+        piece = chunk.content if isinstance(chunk.content, str) else ""
+        text += piece
+        speculation.feed(text, piece)
+    return schema.model_validate_json(text)
+
+
+async def _astream_reflection(llm, schema: type[Reflection], prompt: str, speculation: Speculation) -> Reflection:
+    text = ""
+    async for chunk in llm.astream(prompt, response_format=schema):
+        piece = chunk.content if isinstance(chunk.content, str) else ""
+        text += piece
+        speculation.feed(text, piece)
+    return schema.model_validate_json(text)
+
+
+def _reflection_output(
+    state: OverallState,
+    configurable: Configuration,
+    result: Reflection,
+    formatted_prompt: str,
+    waited: float,
+    speculation: Speculation | None = None,
+) -> ReflectionState:
+    # Drop follow-ups that repeat (or, optionally, closely rephrase) a query
+    # already run in this session before they are dispatched as branches.
+    dedup = prune_queries(
+        result.follow_up_queries,
+        state["search_query"],
+        configurable.query_dedup_similarity_threshold,
     )
-    
-    llm = get_local_llm(configurable, reasoning_model_name_key, temperature=1.0)
-    structured_llm = llm.with_structured_output(Reflection)
-    
-    result = structured_llm.invoke(formatted_prompt)
+    if dedup.pruned["exact"] or dedup.pruned["near"]:
+        logger.info("Pruned duplicate follow-up queries: %s", dedup.pruned)
 
-    return {
+    prompt_tokens = estimate_tokens(formatted_prompt)
+    logger.debug("Reflection loop %d: ~%d prompt tokens", state["research_loop_count"], prompt_tokens)
+
+    # Decide here whether research goes on, so evaluate_research only routes
+    # and the reason ends up in run state.
+    source_count = len(state.get("sources_gathered") or [])
+    # Novelty is judged within this run: loading and shingling the whole
+    # thread's research every loop would make reflection grow with the thread.
+    run_start = state.get("run_summary_offset") or 0
+    gain = measure_gain(
+        source_count - (state.get("assessed_source_count") or 0),
+        (state.get("source_hits") or 0) - (state.get("assessed_source_hits") or 0),
+        _research_summaries(state, configurable, run_start),
+        max(0, (state.get("assessed_summary_count") or 0) - run_start),
+    )
+    reason = stop_reason(
+        is_sufficient=result.is_sufficient,
+        loop=state["research_loop_count"],
+        max_loops=_max_research_loops(state, configurable),
+        follow_up_queries=dedup.kept,
+        gain=gain,
+        min_gain=configurable.min_information_gain,
+        started_at=state.get("run_started_at"),
+        time_budget_seconds=configurable.research_time_budget_seconds,
+        tokens_spent=state.get("run_tokens") or 0,
+        token_budget=configurable.research_token_budget,
+    )
+    if reason:
+        logger.info("Research stops after loop %d: %s", state["research_loop_count"], reason)
+
+    output = {
         "is_sufficient": result.is_sufficient,
         "knowledge_gap": result.knowledge_gap,
-        "follow_up_queries": result.follow_up_queries,
+        "follow_up_queries": dedup.kept,
+        "query_dedup": [dedup.report(loop=state["research_loop_count"])],
         "research_loop_count": state["research_loop_count"],
         "number_of_ran_queries": len(state["search_query"]),
+        "reflection_prompt_tokens": [prompt_tokens],
+        "scheduler_stats": _llm_wait_stats(waited),
+        "loop_gain": [gain.report(loop=state["research_loop_count"])],
+        "assessed_source_count": source_count,
+        "assessed_source_hits": state.get("source_hits") or 0,
+        "assessed_summary_count": len(state["web_research_result"]),
+        "stop_reason": reason,
     }
+    if speculation is not None:
+        # Speculative searches only pay off if the loop actually continues.
+        output["prefetch_stats"] = speculation.settle([] if reason else dedup.kept)
+    if isinstance(result, IncrementalReflection):
+        output["knowledge_state"] = result.knowledge_state
+        output["reflected_summary_count"] = len(state["web_research_result"]) - (state.get("run_summary_offset") or 0)
+    return output
+
+
+@_instrumented("reflection")
+def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
+    """Assess the research so far and decide whether to keep going."""
+    configurable = _configuration(state, config)
+    state["research_loop_count"] = state.get("research_loop_count", 0) + 1
+    
+    # The original code used 'reasoning_model' from state or config.
+    # We'll use 'reflection_model' as defined in our new Configuration.
+    # If you want to keep 'reasoning_model' as a dynamic override, adjust accordingly.
+    reasoning_model_name_key = "reflection_model" # state.get("reasoning_model") or configurable.reflection_model
+
+    formatted_prompt, schema = _reflection_prompt(state, configurable)
+    
+    speculation = _speculation(state, configurable, config)
+
+    with llm_slot(configurable, reasoning_model_name_key, config) as waited:
+        llm = get_local_llm(configurable, reasoning_model_name_key, temperature=1.0)
+        with phase("llm"):
+            if speculation is None:
+                result = llm.with_structured_output(schema).invoke(formatted_prompt)
+            else:
+                result = _stream_reflection(llm, schema, formatted_prompt, speculation)
+    record_llm_usage(formatted_prompt, result)
+    return _reflection_output(state, configurable, result, formatted_prompt, waited, speculation)
+
+
+@_instrumented("reflection")
+async def areflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
+    """Async version of ``reflection``."""
+    configurable = _configuration(state, config)
+    state["research_loop_count"] = state.get("research_loop_count", 0) + 1
+
+    formatted_prompt, schema = _reflection_prompt(state, configurable)
+
+    speculation = _speculation(state, configurable, config)
+
+    async with allm_slot(configurable, "reflection_model", config) as waited:
+        llm = get_local_llm(configurable, "reflection_model", temperature=1.0)
+        with phase("llm"):
+            if speculation is None:
+                result = await llm.with_structured_output(schema).ainvoke(formatted_prompt)
+            else:
+                result = await _astream_reflection(llm, schema, formatted_prompt, speculation)
+    record_llm_usage(formatted_prompt, result)
+    return _reflection_output(state, configurable, result, formatted_prompt, waited, speculation)
 
 
 def evaluate_research(
     state: ReflectionState,
     config: RunnableConfig,
 ) -> OverallState: # Type hint was OverallState, but it returns str or list of Send
-    configurable = Configuration.from_runnable_config(config)
-    max_research_loops = (
-        state.get("max_research_loops")
-        if state.get("max_research_loops") is not None
-        else configurable.max_research_loops
-    )
-    if state["is_sufficient"] or state["research_loop_count"] >= max_research_loops:
+    """Route to another research loop or to the final answer."""
+    configurable = _configuration(state, config)
+    # reflection records why research should end (sufficient, loop limit, no
+    # new follow-ups, low information gain, time or token budget).
+    if state["stop_reason"]:
         return "finalize_answer"
     else:
         return [
-            Send(
-                "web_research",
-                {
-                    "search_query": follow_up_query,
-                    "id": state["number_of_ran_queries"] + int(idx),
-                },
-            )
+            send
             for idx, follow_up_query in enumerate(state["follow_up_queries"])
+            for send in _research_sends(
+                follow_up_query,
+                state["number_of_ran_queries"] + int(idx),
+                configurable,
+                state.get("config_generation"),
+            )
         ]
 
 
-def finalize_answer(state: OverallState, config: RunnableConfig):
-    configurable = Configuration.from_runnable_config(config)
-    # Similar to reflection, using 'answer_model' from our new Configuration
-    answer_model_name_key = "answer_model" # state.get("reasoning_model") or configurable.answer_model
+def _run_cache_key(state: OverallState, configurable: Configuration) -> str:
+    return run_cache_key(
+        get_research_topic(state["messages"]), configurable, _max_research_loops(state, configurable)
+    )
+
+
+def _check_run_cache(state: OverallState, configurable: Configuration) -> OverallState:
+    """Serve a repeated topic from the run cache (see agent.run_cache)."""
+    if configurable.run_cache_mode not in RUN_CACHE_MODES:
+        raise ValueError(f"Unknown run_cache_mode {configurable.run_cache_mode!r}; expected one of {RUN_CACHE_MODES}")
+    key = _run_cache_key(state, configurable)
+    entry = lookup_run(get_run_cache(configurable), key, configurable.run_cache_ttl_seconds)
+    record_cache(hit=entry is not None)
+    if entry is None:
+        return {"run_cache": {"status": "miss", "key": key}}
+
+    report = {
+        "status": configurable.run_cache_mode,
+        "key": key,
+        "age_seconds": time.time() - entry["researched_at"],
+    }
+    logger.info("Run cache hit (%s), research from %.0fs ago", report["status"], report["age_seconds"])
+    update = {
+        "run_cache": report,
+        "sources_gathered": entry["sources_gathered"],
+        "stop_reason": "cached",
+    }
+    if configurable.run_cache_mode == "answer":
+        update["messages"] = [AIMessage(content=entry["answer"])]
+        return update
+    # Regenerate the answer over the cached research only. The cached text is
+    # stored out of state again under this run's blob store settings.
+    update["web_research_result"] = [store_text(summary, configurable) for summary in entry["web_research_result"]]
+    update["run_summary_offset"] = len(state.get("web_research_result") or [])
+    update["search_query"] = entry["search_query"]
+    # generate_query is skipped, so set this run's topic from the existing
+    # history summary (no new fold).
+    update["research_topic"] = _history_output(
+        state, configurable, state.get("history_summary") or "", state.get("history_summary_count") or 0
+    )["research_topic"]
+    return update
+
+
+@_instrumented("check_run_cache")
+def check_run_cache(state: OverallState, config: RunnableConfig) -> OverallState:
+    """Look the question up in the run cache."""
+    return _check_run_cache(state, _configuration(state, config))
+
+
+@_instrumented("check_run_cache")
+async def acheck_run_cache(state: OverallState, config: RunnableConfig) -> OverallState:
+    """Async version of ``check_run_cache``."""
+    # The sqlite backend blocks, so keep it off the event loop.
+    return await asyncio.to_thread(_check_run_cache, state, _configuration(state, config))
+
+
+# Run-scoped fields with a reducer are reset through Overwrite, or the reducer
+# would merge the empty value into the previous run's.
+_REDUCED_FIELDS = {
+    key for key, hint in get_type_hints(OverallState, include_extras=True).items() if get_origin(hint) is Annotated
+}
+
+
+def start_run(state: OverallState) -> OverallState:
+    """Reset the run-scoped fields the thread's previous run left in state.
+
+    Also pins the configuration generation the rest of the run resolves
+    against.
+    """
+    return {
+        **{key: Overwrite(empty()) if key in _REDUCED_FIELDS else empty() for key, empty in RUN_SCOPED_FIELDS.items()},
+        "config_generation": configuration_generation(),
+    }
+
+
+async def astart_run(state: OverallState) -> OverallState:
+    """Async version of ``start_run``."""
+    return start_run(state)
+
 
+def route_start(state: OverallState, config: RunnableConfig) -> str:
+    """Go through the run cache first when it is enabled."""
+    # Only runs with the run cache enabled pay for the extra step.
+    if get_run_cache(_configuration(state, config)) is None:
+        return "generate_query"
+    return "check_run_cache"
+
+
+def route_run_cache(state: OverallState) -> str:
+    """Route a run cache hit to the end or to the answer, a miss to research."""
+    status = state["run_cache"]["status"]
+    if status == "answer":
+        return END
+    if status == "summaries":
+        return "finalize_answer"
+    return "generate_query"
+
+
+def _store_run(state: OverallState, configurable: Configuration, answer: str) -> None:
+    # Only research actually done in this run is cached; answers regenerated
+    # from a cache hit would otherwise make stale research look fresh.
+    if (state.get("run_cache") or {}).get("status") != "miss":
+        return
+    cache = get_run_cache(configurable)
+    if cache is not None:
+        cache.set(state["run_cache"]["key"], run_cache_entry(answer, state, configurable))
+
+
+def _answer_prompt(state: OverallState, configurable: Configuration) -> tuple[str, dict]:
+    """Build the answer prompt and the context packing report."""
     current_date = get_current_date()
-    formatted_prompt = answer_instructions.format(
-        current_date=current_date,
-        research_topic=get_research_topic(state["messages"]),
-        summaries="\n---\n\n".join(state["web_research_result"]),
+    research_topic = _research_topic(state)
+    if configurable.incremental_reflection and state.get("knowledge_state"):
+        # Everything up to reflected_summary_count is already folded into the
+        # condensed knowledge state; only append what reflection has not seen.
+        summaries = [state["knowledge_state"]] + _prompt_summaries(state, configurable, _reflected_summary_end(state))
+    else:
+        summaries = _prompt_summaries(state, configurable)
+
+    # Keep the final call within a predictable token budget.
+    packed = pack_summaries(
+        summaries,
+        research_topic,
+        token_budget=configurable.answer_context_token_budget,
+        dedup_threshold=configurable.answer_context_dedup_threshold,
     )
+    report = packed.report()
+    if packed.dropped_tokens:
+        logger.info("Answer context packed to ~%d tokens, dropped: %s", packed.tokens, packed.dropped_tokens)
+
+    return answer_instructions.format(
+        current_date=current_date,
+        research_topic=research_topic,
+        summaries="\n---\n\n".join(packed.summaries),
+    ), report
+
 
-    llm = get_local_llm(configurable, answer_model_name_key, temperature=0.0)
-    result = llm.invoke(formatted_prompt)
+def _answer_output(
+    state: OverallState, result, context_report: dict, waited: float, timing: dict
+) -> OverallState:
     result_content = result.content if hasattr(result, 'content') else str(result)
 
+    logger.info(
+        "Answer: first token after %.2fs, complete after %.2fs (%d chunks)",
+        timing["time_to_first_token_seconds"],
+        timing["total_seconds"],
+        timing["chunks"],
+    )
+
+    # cache_stats is reset by start_run, so these are this run's numbers.
+    for name, stats in state.get("cache_stats", {}).items():
+        logger.info("%s cache: %s", name.capitalize(), format_cache_stats(stats))
+
     # --- Simplified Citation Handling for Final Answer ---
     # The original citation mechanism is incompatible.
     # We can append the simplified sources to the end of the content, or just rely on the summary.
@@ -232,28 +1201,91 @@ def finalize_answer(state: OverallState, config: RunnableConfig):
     # Our simplified `simple_sources` in `web_research` node tries to match this.
 
     return {
-        "messages": [AIMessage(content=final_content)],
-        "sources_gathered": state.get("sources_gathered", []), # Pass along the (simplified) sources
+        # Reuse the streamed message id so clients merge the final message
+        # with the chunks they already rendered instead of showing it twice.
+        "messages": [AIMessage(content=final_content, id=getattr(result, "id", None))],
+        "answer_context": context_report,
+        "answer_timing": timing,
+        "scheduler_stats": _llm_wait_stats(waited),
     }
 
 
+@_instrumented("finalize_answer")
+def finalize_answer(state: OverallState, config: RunnableConfig):
+    """Write the final answer with citations from the research summaries."""
+    configurable = _configuration(state, config)
+    # Similar to reflection, using 'answer_model' from our new Configuration
+    answer_model_name_key = "answer_model" # state.get("reasoning_model") or configurable.answer_model
+
+    formatted_prompt, context_report = _answer_prompt(state, configurable)
+
+    with llm_slot(configurable, answer_model_name_key, config) as waited:
+        llm = get_local_llm(configurable, answer_model_name_key, temperature=0.0)
+        result, timing = _call_llm(llm, formatted_prompt, config, configurable.stream_answer)
+    output = _answer_output(state, result, context_report, waited, timing)
+    _store_run(state, configurable, output["messages"][0].content)
+    return output
+
+
+@_instrumented("finalize_answer")
+async def afinalize_answer(state: OverallState, config: RunnableConfig):
+    """Async version of ``finalize_answer``."""
+    configurable = _configuration(state, config)
+    formatted_prompt, context_report = _answer_prompt(state, configurable)
+
+    async with allm_slot(configurable, "answer_model", config) as waited:
+        llm = get_local_llm(configurable, "answer_model", temperature=0.0)
+        result, timing = await _acall_llm(llm, formatted_prompt, config, configurable.stream_answer)
+    output = _answer_output(state, result, context_report, waited, timing)
+    await asyncio.to_thread(_store_run, state, configurable, output["messages"][0].content)
+    return output
+
+
 # Create our Agent Graph
 builder = StateGraph(OverallState, config_schema=Configuration)
 
 # Define the nodes we will cycle between
-builder.add_node("generate_query", generate_query)
-builder.add_node("web_research", web_research)
-builder.add_node("reflection", reflection)
-builder.add_node("finalize_answer", finalize_answer)
+# (sync implementation for invoke/stream, async twin for ainvoke/astream)
+builder.add_node("start_run", RunnableLambda(start_run, afunc=astart_run, name="start_run"))
+builder.add_node(
+    "check_run_cache",
+    RunnableLambda(check_run_cache, afunc=acheck_run_cache, name="check_run_cache"),
+)
+builder.add_node(
+    "generate_query",
+    RunnableLambda(generate_query, afunc=agenerate_query, name="generate_query"),
+)
+builder.add_node(
+    "web_research",
+    RunnableLambda(web_research, afunc=aweb_research, name="web_research"),
+)
+builder.add_node(
+    "local_research",
+    RunnableLambda(local_research, afunc=alocal_research, name="local_research"),
+)
+builder.add_node(
+    "reflection",
+    RunnableLambda(reflection, afunc=areflection, name="reflection"),
+)
+builder.add_node(
+    "finalize_answer",
+    RunnableLambda(finalize_answer, afunc=afinalize_answer, name="finalize_answer"),
+)
 
-# Set the entrypoint as `generate_query`
-builder.add_edge(START, "generate_query")
+# Reset the run-scoped state, then start with `generate_query`, or first look
+# for a cached run of the same topic
+builder.add_edge(START, "start_run")
+builder.add_conditional_edges("start_run", route_start, ["check_run_cache", "generate_query"])
+builder.add_conditional_edges(
+    "check_run_cache", route_run_cache, ["generate_query", "finalize_answer", END]
+)
 builder.add_conditional_edges(
-    "generate_query", continue_to_web_research, ["web_research"]
+    "generate_query", continue_to_web_research, ["web_research", "local_research"]
 )
 builder.add_edge("web_research", "reflection")
+builder.add_edge("local_research", "reflection")
 builder.add_conditional_edges(
-    "reflection", evaluate_research, ["web_research", "finalize_answer"]
+    "reflection", evaluate_research, ["web_research", "local_research", "finalize_answer"]
 )
 builder.add_edge("finalize_answer", END)
 
@@ -0,0 +1,57 @@
+"""Bounded conversation history for the research topic of long chats.
+
+The research topic is the whole conversation ("User: ..." / "Assistant: ..."
+lines), and it goes into the query, reflection and answer prompts of every
+run. In a long chat, that makes every prompt grow with the chat. With
+``history_window_messages`` set, the topic instead becomes
+
+* a rolling summary of the older messages, and
+* the most recent messages, verbatim.
+
+The summary lives in run state (``history_summary``, plus the number of
+messages folded into it), so each turn only folds the messages that have
+left the window since the last fold. Folding starts once more than twice
+the window is unfolded, and it always leaves exactly the window. So there is
+one small summarization call every ``history_window_messages / 2`` turns,
+not one per turn, and the verbatim part never exceeds twice the window.
+
+The topic is computed once per run (in ``generate_query``) and reused by the
+other nodes through ``research_topic`` in state.
+"""
+
+from dataclasses import dataclass
+from typing import List
+
+from langchain_core.messages import AnyMessage
+
+from agent.utils import format_conversation, get_research_topic
+
+
+@dataclass
+class FoldPlan:
+    """Messages ``[start, end)`` to fold into the rolling summary."""
+
+    start: int
+    end: int
+
+
+def plan_fold(message_count: int, folded: int, window: int) -> FoldPlan | None:
+    """Return the messages to fold now, or ``None`` while the history still fits.
+
+    Args:
+        message_count: Messages in the conversation.
+        folded: Messages already folded into the summary.
+        window: Recent messages always kept verbatim (0 disables compaction).
+    """
+    if window <= 0 or message_count - folded <= 2 * window:
+        return None
+    return FoldPlan(folded, message_count - window)
+
+
+def compacted_topic(messages: List[AnyMessage], summary: str, folded: int) -> str:
+    """Return the research topic: summary of the folded messages plus the rest verbatim."""
+    if not folded or not summary:
+        return get_research_topic(messages)
+    return f"Summary of the earlier conversation:\n{summary}\n\nRecent conversation:\n" + format_conversation(
+        messages[folded:]
+    )
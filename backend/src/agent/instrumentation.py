@@ -0,0 +1,421 @@
+"""Per-node timing spans, token accounting and Prometheus-style metrics.
+
+Each graph node runs inside a ``node_span``. While it is active, the span
+collects:
+
+* wall-clock time per phase (``search``, ``llm``, ...) via ``phase``,
+* prompt/completion tokens per LLM call via ``record_llm_usage`` (provider
+  usage metadata when available, otherwise a cheap estimate),
+* HTTP requests made by the pooled LLM clients, from which retries are
+  derived (``record_http_request`` is installed as an ``httpx`` event hook),
+* cache hits and misses via ``record_cache``.
+
+The current span lives in a context variable, so helpers deep in the call
+stack can report without threading it through every signature, and both the
+sync (thread) and async (task) node paths are covered. When a node finishes,
+its numbers are added to a process-wide registry rendered by
+``render_prometheus`` for the ``/metrics`` endpoint, and returned as a
+``node_metrics`` entry for run state.
+
+Instrumentation is switched off per run with ``enable_instrumentation=False``;
+spans are then neither published nor returned, and only their token count
+reaches run state (as ``run_tokens``, which ``research_token_budget`` needs).
+"""
+
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from agent.utils import estimate_tokens
+
+# Upper bounds (seconds) of the latency histogram buckets.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class MetricsRegistry:
+    """Thread-safe counters and latency histograms keyed by name and labels."""
+
+    def __init__(self):
+        """Start with every counter at zero."""
+        self._lock = threading.Lock()
+        self._counters: dict[tuple, float] = defaultdict(float)
+        self._histograms: dict[tuple, list] = {}
+        self._help: dict[str, tuple[str, str]] = {}
+
+    def inc(self, name: str, value: float = 1.0, help: str = "", **labels: str) -> None:
+        """Increase a counter."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(name, ("counter", help))
+            self._counters[key] += value
+
+    def observe(self, name: str, value: float, help: str = "", **labels: str) -> None:
+        """Record one observation in a latency histogram."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(name, ("histogram", help))
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # [bucket counts..., sum, count]
+                histogram = self._histograms[key] = [0] * len(LATENCY_BUCKETS) + [0.0, 0]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def render(self) -> list[str]:
+        """Render all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(value) for key, value in self._histograms.items()}
+            help_texts = dict(self._help)
+
+        lines: list[str] = []
+        for name in sorted(help_texts):
+            kind, help_text = help_texts[name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(LATENCY_BUCKETS, histogram):
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', str(bound)),))} {count}")
+                lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {histogram[-1]}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(histogram[-2])}")
+                lines.append(f"{name}_count{_labels(labels)} {histogram[-1]}")
+        return lines
+
+    def clear(self) -> None:
+        """Reset every metric."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._help.clear()
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+registry = MetricsRegistry()
+
+
+class NodeSpan:
+    """Timing and usage counters for one node execution."""
+
+    __slots__ = (
+        "node",
+        "enabled",
+        "start",
+        "duration",
+        "phases",
+        "llm_calls",
+        "prompt_tokens",
+        "completion_tokens",
+        "http_requests",
+        "cache_hits",
+        "cache_misses",
+        "_open_phases",
+        "_phase_lock",
+    )
+
+    def __init__(self, node: str, enabled: bool = True):
+        """Start timing ``node``; a disabled span only counts tokens for run state."""
+        self.node = node
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self.duration: float | None = None
+        self.phases: dict[str, float] = defaultdict(float)
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.http_requests = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Phase name -> (blocks of that phase running, when the first started).
+        self._open_phases: dict[str, tuple[int, float]] = {}
+        self._phase_lock = threading.Lock()
+
+    def enter_phase(self, name: str) -> None:
+        """Start a block of phase ``name``."""
+        with self._phase_lock:
+            running, started = self._open_phases.get(name, (0, time.perf_counter()))
+            self._open_phases[name] = (running + 1, started)
+
+    def exit_phase(self, name: str) -> None:
+        """End a block of phase ``name``.
+
+        Blocks of one phase that overlap (parallel calls on threads or tasks)
+        are counted once, so a phase never adds up to more than wall-clock time.
+        """
+        with self._phase_lock:
+            running, started = self._open_phases.pop(name)
+            if running > 1:
+                self._open_phases[name] = (running - 1, started)
+            else:
+                self.phases[name] += time.perf_counter() - started
+
+    @property
+    def retries(self) -> int:
+        """HTTP requests beyond one per LLM call are client retries."""
+        return max(0, self.http_requests - self.llm_calls)
+
+    def finish(self) -> None:
+        """Freeze the span's duration (idempotent)."""
+        if self.duration is None:
+            self.duration = time.perf_counter() - self.start
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the span as a JSON-serializable record."""
+        self.finish()
+        return {
+            "node": self.node,
+            "seconds": round(self.duration, 4),
+            "phases": {phase: round(seconds, 4) for phase, seconds in self.phases.items()},
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
+
+    def state_update(self) -> dict[str, Any]:
+        """Return the run-state update: the tokens spent, and the span when enabled."""
+        update: dict[str, Any] = {}
+        if self.prompt_tokens or self.completion_tokens:
+            update["run_tokens"] = self.prompt_tokens + self.completion_tokens
+        if self.enabled:
+            update["node_metrics"] = [self.as_dict()]
+        return update
+
+    def publish(self) -> None:
+        """Add the span's numbers to the process-wide registry."""
+        self.finish()
+        node = self.node
+        registry.inc("agent_node_runs_total", help="Node executions.", node=node)
+        registry.observe(
+            "agent_node_duration_seconds", self.duration, help="Node wall-clock time.", node=node
+        )
+        for phase_name, seconds in self.phases.items():
+            registry.observe(
+                "agent_phase_duration_seconds",
+                seconds,
+                help="Time spent per phase (search, llm, ...) inside a node.",
+                node=node,
+                phase=phase_name,
+            )
+        if self.llm_calls:
+            registry.inc("agent_llm_calls_total", self.llm_calls, help="LLM calls.", node=node)
+            registry.inc(
+                "agent_llm_tokens_total", self.prompt_tokens, help="LLM tokens.", node=node, type="prompt"
+            )
+            registry.inc(
+                "agent_llm_tokens_total",
+                self.completion_tokens,
+                help="LLM tokens.",
+                node=node,
+                type="completion",
+            )
+        if self.retries:
+            registry.inc("agent_llm_retries_total", self.retries, help="LLM HTTP retries.", node=node)
+        for result, count in (("hit", self.cache_hits), ("miss", self.cache_misses)):
+            if count:
+                registry.inc(
+                    "agent_cache_lookups_total", count, help="Cache lookups.", node=node, result=result
+                )
+
+
+_current_span: contextvars.ContextVar[NodeSpan | None] = contextvars.ContextVar(
+    "agent_current_span", default=None
+)
+
+
+@contextmanager
+def node_span(node: str, enabled: bool = True) -> Iterator[NodeSpan]:
+    """Run a block as one instrumented node execution."""
+    span = NodeSpan(node, enabled)
+    # Set even when disabled: the run's token count must not depend on it.
+    token = _current_span.set(span)
+    try:
+        yield span
+    finally:
+        _current_span.reset(token)
+        if enabled:
+            span.publish()
+
+
+def instrumented_node(name: str, is_enabled: Callable[[Any, Any], bool]) -> Callable:
+    """Decorate a (sync or async) graph node so it runs inside a ``node_span``.
+
+    ``is_enabled`` receives the node's state and ``RunnableConfig`` and
+    decides whether the run is instrumented. The span record is merged into the node's output
+    under ``node_metrics``.
+    """
+
+    def decorate(fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(state, config):
+                with node_span(name, is_enabled(state, config)) as span:
+                    output = await fn(state, config)
+                    return {**output, **span.state_update()}
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(state, config):
+            with node_span(name, is_enabled(state, config)) as span:
+                output = fn(state, config)
+                return {**output, **span.state_update()}
+
+        return wrapper
+
+    return decorate
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Attribute the block's wall-clock time to a phase of the current span.
+
+    Overlapping blocks of the same phase are counted once (see ``NodeSpan.exit_phase``).
+    """
+    span = _current_span.get()
+    if span is None:
+        yield
+        return
+    span.enter_phase(name)
+    try:
+        yield
+    finally:
+        span.exit_phase(name)
+
+
+def add_phase_time(name: str, seconds: float) -> None:
+    """Attribute already-measured time (e.g. a queue wait) to a phase."""
+    span = _current_span.get()
+    if span is not None and seconds:
+        span.phases[name] += seconds
+
+
+def record_llm_usage(prompt: str, response: Any) -> None:
+    """Count one LLM call and its tokens against the current span.
+
+    Uses the provider's ``usage_metadata`` when the response carries it and
+    falls back to estimating from the prompt and response text (structured
+    outputs are measured through their JSON form).
+    """
+    span = _current_span.get()
+    if span is None:
+        return
+    span.llm_calls += 1
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        span.prompt_tokens += usage.get("input_tokens", 0)
+        span.completion_tokens += usage.get("output_tokens", 0)
+        return
+    if hasattr(response, "content"):
+        completion = response.content if isinstance(response.content, str) else str(response.content)
+    elif hasattr(response, "model_dump_json"):
+        completion = response.model_dump_json()
+    else:
+        completion = str(response)
+    span.prompt_tokens += estimate_tokens(prompt)
+    span.completion_tokens += estimate_tokens(completion)
+
+
+def record_cache(hit: bool) -> None:
+    """Count a cache lookup against the current span."""
+    span = _current_span.get()
+    if span is None:
+        return
+    if hit:
+        span.cache_hits += 1
+    else:
+        span.cache_misses += 1
+
+
+def record_http_request(request: Any = None) -> None:
+    """``httpx`` request hook: count an outgoing LLM HTTP request."""
+    span = _current_span.get()
+    if span is not None:
+        span.http_requests += 1
+
+
+async def arecord_http_request(request: Any = None) -> None:
+    """Async ``httpx`` request hook (``AsyncClient`` needs coroutine hooks)."""
+    record_http_request(request)
+
+
+def _gauge_lines(name: str, help_text: str, samples: list[tuple[dict, float]]) -> list[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(tuple(sorted(labels.items())))} {_number(value)}")
+    return lines
+
+
+def render_prometheus() -> str:
+    """Render node metrics plus pool, scheduler and cache counters as Prometheus text."""
+    # Imported lazily: these modules are optional consumers of this one.
+    from agent.cache import all_cache_stats
+    from agent.endpoints import endpoint_stats
+    from agent.llm_pool import pool_stats
+    from agent.scheduler import scheduler_stats
+
+    lines = registry.render()
+
+    lines += _gauge_lines(
+        "agent_llm_pool",
+        "Pooled LLM client counters (hits, misses, evictions, sizes).",
+        [({"stat": stat}, value) for stat, value in pool_stats().items()],
+    )
+    lines += _gauge_lines(
+        "agent_scheduler",
+        "Concurrency limiter state and backpressure (queue depth, waits).",
+        [
+            ({"limiter": limiter, "stat": stat}, value)
+            for limiter, stats in scheduler_stats().items()
+            for stat, value in stats.items()
+        ],
+    )
+    lines += _gauge_lines(
+        "agent_llm_endpoint",
+        "Per-endpoint LLM routing state (outstanding, EWMA latency, health, counters).",
+        [
+            ({"endpoint": endpoint, "stat": stat}, value)
+            for endpoint, stats in endpoint_stats().items()
+            for stat, value in stats.items()
+        ],
+    )
+    lines += _gauge_lines(
+        "agent_cache",
+        "Process-wide cache counters per namespace.",
+        [
+            ({"cache": cache, "stat": stat}, value)
+            for cache, stats in all_cache_stats().items()
+            for stat, value in stats.items()
+        ],
+    )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,159 @@
+"""Process-wide registry of reusable ChatOpenAI clients.
+
+Constructing a ``ChatOpenAI`` also constructs a fresh OpenAI SDK client and
+HTTP connection pool, so building one per node call means every fan-out
+``web_research`` branch pays client construction and TCP setup again. The
+registry below keeps a bounded LRU of ready clients keyed on
+``(api_base, model, temperature, api_key)`` and shares one keep-alive
+``httpx`` connection pool per API base between all of them. The pools'
+transports report each endpoint's traffic to ``agent.endpoints`` for routing.
+"""
+
+import threading
+from collections import OrderedDict
+
+import httpx
+from langchain_openai import ChatOpenAI
+
+from agent.endpoints import AsyncTrackedTransport, TrackedTransport
+from agent.instrumentation import arecord_http_request, record_http_request
+
+DEFAULT_MAX_CLIENTS = 32
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+
+
+class LLMClientPool:
+    """Bounded LRU cache of ChatOpenAI clients with shared HTTP pools.
+
+    Thread-safe; a single instance is shared by every graph run in the process.
+    """
+
+    def __init__(
+        self,
+        max_clients: int = DEFAULT_MAX_CLIENTS,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+    ):
+        """Keep up to ``max_clients`` clients over per-endpoint connection pools with these limits."""
+        self.max_clients = max_clients
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._lock = threading.Lock()
+        self._clients: OrderedDict[tuple, ChatOpenAI] = OrderedDict()
+        self._http_clients: dict[str, tuple[httpx.Client, httpx.AsyncClient]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(
+        self,
+        api_base: str,
+        model: str,
+        temperature: float,
+        api_key: str | None,
+        max_retries: int = 2,
+    ) -> ChatOpenAI:
+        """Return a pooled client for the given endpoint/model, creating it on a miss."""
+        key = (api_base, model, float(temperature), api_key, max_retries)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                self.hits += 1
+                return client
+
+            self.misses += 1
+            http_client, http_async_client = self._http_clients_for(api_base)
+            client = ChatOpenAI(
+                model=model,
+                openai_api_base=api_base,
+                openai_api_key=api_key,
+                temperature=temperature,
+                max_retries=max_retries,
+                http_client=http_client,
+                http_async_client=http_async_client,
+            )
+            self._clients[key] = client
+            self._evict_locked()
+            return client
+
+    def http_client(self, api_base: str) -> httpx.Client:
+        """Return the shared keep-alive HTTP client for an API base (for raw requests)."""
+        with self._lock:
+            return self._http_clients_for(api_base)[0]
+
+    def resize(self, max_clients: int) -> None:
+        """Change the maximum number of pooled clients, evicting if needed."""
+        with self._lock:
+            self.max_clients = max(1, max_clients)
+            self._evict_locked()
+
+    def stats(self) -> dict[str, int]:
+        """Return hit/miss/eviction counters and current pool sizes."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "clients": len(self._clients),
+                "http_pools": len(self._http_clients),
+            }
+
+    def clear(self) -> None:
+        """Drop every pooled client and close the shared HTTP pools."""
+        with self._lock:
+            self._clients.clear()
+            http_clients = list(self._http_clients.values())
+            self._http_clients.clear()
+        for http_client, _ in http_clients:
+            http_client.close()
+        # The async clients are left to the garbage collector: closing them
+        # requires the event loop they were used on.
+
+    def _http_clients_for(self, api_base: str) -> tuple[httpx.Client, httpx.AsyncClient]:
+        http_clients = self._http_clients.get(api_base)
+        if http_clients is None:
+            # The request hooks let node spans count HTTP attempts (and so retries).
+            http_clients = (
+                httpx.Client(
+                    transport=TrackedTransport(httpx.HTTPTransport(limits=self._limits), api_base),
+                    event_hooks={"request": [record_http_request]},
+                ),
+                httpx.AsyncClient(
+                    transport=AsyncTrackedTransport(httpx.AsyncHTTPTransport(limits=self._limits), api_base),
+                    event_hooks={"request": [arecord_http_request]},
+                ),
+            )
+            self._http_clients[api_base] = http_clients
+        return http_clients
+
+    def _evict_locked(self) -> None:
+        while len(self._clients) > self.max_clients:
+            self._clients.popitem(last=False)
+            self.evictions += 1
+        # Forget connection pools whose API base no longer has a pooled client.
+        # They are not closed here: an evicted client may still be mid-request
+        # on another thread, so the pool is left to the garbage collector.
+        live_bases = {key[0] for key in self._clients}
+        for api_base in list(self._http_clients):
+            if api_base not in live_bases:
+                del self._http_clients[api_base]
+
+
+_pool = LLMClientPool()
+
+
+def get_llm_pool() -> LLMClientPool:
+    """Return the process-wide client pool."""
+    return _pool
+
+
+def pool_stats() -> dict[str, int]:
+    """Return the process-wide pool counters."""
+    return _pool.stats()
@@ -0,0 +1,596 @@
+"""Persistent, memory-mapped BM25 index over a local document corpus.
+
+Lets the agent research internal documents held on disk alongside (or
+instead of) the public web, with no external service. The index is a
+directory of immutable *segments* plus a ``manifest.json``:
+
+* ``docs.bin`` / ``docs.idx``: stored passages (JSON records) and their
+  ``uint64`` byte offsets,
+* ``doclen.bin``: ``uint32`` token count per passage,
+* ``lex_hash.bin`` / ``lex_off.bin`` / ``lex_df.bin``: the term dictionary as
+  parallel arrays sorted by a 64-bit term hash (postings offset, document
+  frequency),
+* ``post.bin``: ``uint32`` ``(passage, term frequency)`` pairs per term.
+
+Every file is opened with ``mmap`` and read through ``memoryview`` casts, so
+opening an index is O(segments) and queries touch only the pages of the
+terms they look up; the OS page cache is shared between processes. Arrays
+use the host's native byte order.
+
+Ingest is incremental: each ``add_documents``/``ingest_paths`` call writes
+new segments (bounded in size so memory stays flat for large corpora),
+re-ingesting a modified file tombstones its old passages, files gone from an
+ingested directory are tombstoned, and ``compact`` rewrites everything into a
+single segment. Tombstoned passages are left out of search results and of
+the BM25 statistics (passage count, document frequencies, average length). Use the CLI to build an index:
+
+    python -m agent.local_corpus ingest ./corpus-index ~/docs
+    python -m agent.local_corpus query ./corpus-index "retention policy"
+"""
+
+import argparse
+import bisect
+import hashlib
+import heapq
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import shutil
+import threading
+from array import array
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator
+
+from agent.similarity import tokenize
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+DEFAULT_SEGMENT_DOCS = 50_000
+DEFAULT_CHUNK_WORDS = 200
+DEFAULT_CHUNK_OVERLAP = 40
+TEXT_SUFFIXES = {".txt", ".md", ".markdown", ".rst", ".html", ".htm", ".csv", ".json", ".log"}
+
+_TAG_RE = re.compile(r"<(script|style)\b.*?</\1>|<[^>]+>", re.IGNORECASE | re.DOTALL)
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+
+def term_hash(term: str) -> int:
+    """Stable 64-bit hash of a term (the dictionary key on disk)."""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def chunk_text(text: str, chunk_words: int = DEFAULT_CHUNK_WORDS, overlap: int = DEFAULT_CHUNK_OVERLAP) -> list[str]:
+    """Split text into overlapping windows of about ``chunk_words`` words."""
+    words = text.split()
+    if len(words) <= chunk_words:
+        return [" ".join(words)] if words else []
+    step = max(1, chunk_words - overlap)
+    return [" ".join(words[i : i + chunk_words]) for i in range(0, len(words) - overlap, step)]
+
+
+@dataclass
+class Passage:
+    """One retrieved chunk of a document."""
+
+    source: str
+    title: str
+    text: str
+    score: float
+    segment: str
+    doc_id: int
+
+
+def _map(path: str, typecode: str) -> tuple[mmap.mmap | None, memoryview]:
+    # mmap refuses empty files; an empty segment array is just an empty view.
+    if os.path.getsize(path) == 0:
+        return None, memoryview(array(typecode))
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return mapped, memoryview(mapped).cast(typecode)
+
+
+class Segment:
+    """Read-only view of one on-disk segment."""
+
+    def __init__(self, directory: str, name: str):
+        """Memory-map segment ``name`` of the index in ``directory``."""
+        self.name = name
+        base = os.path.join(directory, name)
+        self._maps = []
+        self.docs_data = self._open(os.path.join(base, "docs.bin"), "B")
+        self.docs_idx = self._open(os.path.join(base, "docs.idx"), "Q")
+        self.doclen = self._open(os.path.join(base, "doclen.bin"), "I")
+        self.lex_hash = self._open(os.path.join(base, "lex_hash.bin"), "Q")
+        self.lex_off = self._open(os.path.join(base, "lex_off.bin"), "Q")
+        self.lex_df = self._open(os.path.join(base, "lex_df.bin"), "I")
+        self.postings = self._open(os.path.join(base, "post.bin"), "I")
+
+    def _open(self, path: str, typecode: str) -> memoryview:
+        mapped, view = _map(path, typecode)
+        self._maps.append((mapped, view))
+        return view
+
+    @property
+    def num_docs(self) -> int:
+        """Number of passages in the segment, deleted ones included."""
+        return len(self.doclen)
+
+    def lookup(self, hashed: int) -> tuple[int, int] | None:
+        """Return (postings offset, document frequency) of a term, if present."""
+        i = bisect.bisect_left(self.lex_hash, hashed)
+        if i < len(self.lex_hash) and self.lex_hash[i] == hashed:
+            return self.lex_off[i], self.lex_df[i]
+        return None
+
+    def postings_for(self, offset: int, df: int) -> Iterator[tuple[int, int]]:
+        """Yield ``(doc_id, term frequency)`` pairs of a term's posting list."""
+        pairs = self.postings[offset : offset + 2 * df]
+        return zip(pairs[0::2], pairs[1::2])
+
+    def document(self, doc_id: int) -> dict:
+        """Return the stored record of a passage."""
+        start, end = self.docs_idx[doc_id], self.docs_idx[doc_id + 1]
+        return json.loads(bytes(self.docs_data[start:end]))
+
+    def close(self) -> None:
+        """Release the memory maps."""
+        for mapped, view in self._maps:
+            view.release()
+            if mapped is not None:
+                mapped.close()
+        self._maps.clear()
+
+
+class SegmentWriter:
+    """Accumulates passages in memory and writes them out as one segment."""
+
+    def __init__(self):
+        """Start an empty segment."""
+        self.records: list[bytes] = []
+        self.doclens = array("I")
+        self.postings: dict[int, list[int]] = {}
+        self._hashes: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        """Return the number of passages added."""
+        return len(self.doclens)
+
+    def add(self, source: str, title: str, text: str) -> int:
+        """Add a passage and return its id in the segment."""
+        doc_id = len(self.doclens)
+        terms = Counter(tokenize(text))
+        hashes = self._hashes
+        for term, tf in terms.items():
+            hashed = hashes.get(term)
+            if hashed is None:
+                hashed = hashes[term] = term_hash(term)
+            self.postings.setdefault(hashed, []).extend((doc_id, tf))
+        self.doclens.append(sum(terms.values()))
+        self.records.append(json.dumps({"source": source, "title": title, "text": text}).encode("utf-8"))
+        return doc_id
+
+    def write(self, directory: str, name: str) -> dict:
+        """Write the segment files under ``directory/name``; return its manifest entry."""
+        tmp = os.path.join(directory, f".{name}.tmp")
+        os.makedirs(tmp, exist_ok=True)
+        offsets, position = array("Q", [0]), 0
+        with open(os.path.join(tmp, "docs.bin"), "wb") as f:
+            for record in self.records:
+                f.write(record)
+                position += len(record)
+                offsets.append(position)
+        lex_hash, lex_off, lex_df, postings = array("Q"), array("Q"), array("I"), array("I")
+        for hashed in sorted(self.postings):
+            pairs = self.postings[hashed]
+            lex_hash.append(hashed)
+            lex_off.append(len(postings))
+            lex_df.append(len(pairs) // 2)
+            postings.extend(pairs)
+        for filename, values in (
+            ("docs.idx", offsets),
+            ("doclen.bin", self.doclens),
+            ("lex_hash.bin", lex_hash),
+            ("lex_off.bin", lex_off),
+            ("lex_df.bin", lex_df),
+            ("post.bin", postings),
+        ):
+            with open(os.path.join(tmp, filename), "wb") as f:
+                values.tofile(f)
+        os.replace(tmp, os.path.join(directory, name))
+        return {"name": name, "docs": len(self.doclens), "tokens": sum(self.doclens)}
+
+
+class CorpusIndex:
+    """A segmented BM25 index directory; see the module docstring for the format."""
+
+    def __init__(self, path: str, segment_docs: int = DEFAULT_SEGMENT_DOCS):
+        """Open the index at ``path``; new segments hold up to ``segment_docs`` passages."""
+        self.path = path
+        self.segment_docs = segment_docs
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self.manifest = self._read_manifest()
+        self.segments = {entry["name"]: Segment(path, entry["name"]) for entry in self.manifest["segments"]}
+        self._live: tuple[int, int] | None = None
+
+    # --- Manifest ---
+
+    def _read_manifest(self) -> dict:
+        manifest_path = os.path.join(self.path, MANIFEST)
+        if not os.path.exists(manifest_path):
+            return {"version": FORMAT_VERSION, "next_segment": 1, "segments": [], "sources": {}, "deleted": {}}
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported corpus index version {manifest.get('version')} in {self.path}")
+        return manifest
+
+    def _write_manifest(self) -> None:
+        self._live = None
+        tmp = os.path.join(self.path, MANIFEST + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp, os.path.join(self.path, MANIFEST))
+
+    def _flush(self, writer: SegmentWriter) -> str | None:
+        if not len(writer):
+            return None
+        name = f"seg-{self.manifest['next_segment']:06d}"
+        self.manifest["next_segment"] += 1
+        self.manifest["segments"].append(writer.write(self.path, name))
+        self.segments[name] = Segment(self.path, name)
+        self._live = None
+        return name
+
+    # --- Ingest ---
+
+    def add_documents(
+        self,
+        documents: Iterable[tuple[str, str, str]],
+        chunk_words: int = DEFAULT_CHUNK_WORDS,
+        overlap: int = DEFAULT_CHUNK_OVERLAP,
+    ) -> int:
+        """Chunk and index ``(source, title, text)`` documents; return the passage count."""
+        with self._lock:
+            placements = self._add_locked(documents, chunk_words, overlap)
+            self._write_manifest()
+        return sum(end - start for _, _, start, end in placements)
+
+    def _add_locked(self, documents, chunk_words, overlap) -> list[tuple[str, str | None, int, int]]:
+        """Index documents into new segments; return ``(source, segment, start, end)`` per document."""
+        placements: list[tuple[str, str | None, int, int]] = []
+        writer, in_writer = SegmentWriter(), []
+
+        def flush() -> None:
+            name = self._flush(writer)
+            placements.extend((source, name, start, end) for source, start, end in in_writer)
+
+        for source, title, text in documents:
+            start = len(writer)
+            for chunk in chunk_text(text, chunk_words, overlap):
+                writer.add(source, title, chunk)
+            in_writer.append((source, start, len(writer)))
+            # Flush only between documents so one document never spans segments.
+            if len(writer) >= self.segment_docs:
+                flush()
+                writer, in_writer = SegmentWriter(), []
+        flush()
+        return placements
+
+    def ingest_paths(
+        self,
+        paths: Iterable[str],
+        chunk_words: int = DEFAULT_CHUNK_WORDS,
+        overlap: int = DEFAULT_CHUNK_OVERLAP,
+    ) -> dict[str, int]:
+        """Index text files under ``paths``, skipping files unchanged since the last ingest.
+
+        Modified files are re-indexed and their previous passages tombstoned.
+        Indexed files under ``paths`` that no longer exist are tombstoned and
+        forgotten.
+        """
+        counts: Counter = Counter()
+        sources = self.manifest["sources"]
+        signatures: dict[str, dict] = {}
+        roots = [os.path.abspath(os.path.expanduser(path)) for path in paths]
+        seen: set[str] = set()
+
+        def documents() -> Iterator[tuple[str, str, str]]:
+            for file_path in _iter_files(roots):
+                seen.add(file_path)
+                stat = os.stat(file_path)
+                signature = {"mtime": stat.st_mtime, "size": stat.st_size}
+                previous = sources.get(file_path)
+                if previous and previous["mtime"] == signature["mtime"] and previous["size"] == signature["size"]:
+                    counts["skipped"] += 1
+                    continue
+                counts["updated" if previous else "added"] += 1
+                if previous:
+                    self._tombstone(previous)
+                signatures[file_path] = signature
+                yield file_path, os.path.basename(file_path), _read_text(file_path)
+
+        with self._lock:
+            for source, segment, start, end in self._add_locked(documents(), chunk_words, overlap):
+                entry = dict(signatures[source])
+                if segment is not None and end > start:
+                    entry.update(segment=segment, start=start, end=end)
+                    counts["passages"] += end - start
+                sources[source] = entry
+            for source in [s for s in sources if s not in seen and _under(s, roots) and not os.path.isfile(s)]:
+                self._tombstone(sources.pop(source))
+                counts["deleted"] += 1
+            self._write_manifest()
+        return dict(counts)
+
+    def _tombstone(self, source_entry: dict) -> None:
+        if "segment" not in source_entry:
+            return
+        self.manifest["deleted"].setdefault(source_entry["segment"], []).append(
+            [source_entry["start"], source_entry["end"]]
+        )
+
+    def compact(self) -> None:
+        """Rewrite all live passages into a single segment and drop the old ones."""
+        with self._lock:
+            writer, old = SegmentWriter(), list(self.segments.values())
+            locations: dict[tuple[str, int], int] = {}
+            for segment in old:
+                is_deleted = _range_test(self._deleted_ranges(segment.name))
+                for doc_id in range(segment.num_docs):
+                    if is_deleted(doc_id):
+                        continue
+                    record = segment.document(doc_id)
+                    locations[(segment.name, doc_id)] = writer.add(record["source"], record["title"], record["text"])
+            self.manifest["segments"] = []
+            self.segments = {}
+            name = self._flush(writer)
+            for source, entry in self.manifest["sources"].items():
+                if "segment" in entry and (entry["segment"], entry["start"]) in locations:
+                    start = locations[(entry["segment"], entry["start"])]
+                    entry.update(segment=name, start=start, end=start + entry["end"] - entry["start"])
+            self.manifest["deleted"] = {}
+            self._write_manifest()
+            for segment in old:
+                segment.close()
+                shutil.rmtree(os.path.join(self.path, segment.name), ignore_errors=True)
+
+    # --- Query ---
+
+    def _deleted_ranges(self, segment_name: str) -> list[list[int]]:
+        return self.manifest["deleted"].get(segment_name, [])
+
+    def _live_stats(self) -> tuple[int, int]:
+        """Return live (not tombstoned) passage and token counts, cached per manifest."""
+        live = self._live
+        if live is None:
+            docs = sum(entry["docs"] for entry in self.manifest["segments"])
+            tokens = sum(entry["tokens"] for entry in self.manifest["segments"])
+            for name, ranges in self.manifest["deleted"].items():
+                segment = self.segments.get(name)
+                for start, end in ranges:
+                    docs -= end - start
+                    if segment is not None:
+                        tokens -= sum(segment.doclen[start:end])
+            live = self._live = (docs, tokens)
+        return live
+
+    def search(self, query: str, k: int = 5) -> list[Passage]:
+        """Return the ``k`` best BM25 matches for ``query`` across all segments.
+
+        Tombstoned passages are dropped from the postings before scoring, so
+        they neither take result slots nor count in the statistics.
+        """
+        terms = set(tokenize(query))
+        segments = list(self.segments.values())
+        total_docs, total_tokens = self._live_stats()
+        if not terms or total_docs <= 0:
+            return []
+        avg_len = (total_tokens / total_docs) or 1.0
+
+        # Document frequencies are global, so scores compare across segments.
+        found: list[tuple[Segment, int, tuple[int, int], Callable[[int], bool] | None]] = []
+        doc_freq: Counter = Counter()
+        for term in terms:
+            hashed = term_hash(term)
+            for segment in segments:
+                hit = segment.lookup(hashed)
+                if hit is None:
+                    continue
+                deleted = self._deleted_ranges(segment.name)
+                is_deleted = _range_test(deleted) if deleted else None
+                df = hit[1]
+                if is_deleted is not None:
+                    df = sum(1 for doc_id, _ in segment.postings_for(*hit) if not is_deleted(doc_id))
+                if df:
+                    found.append((segment, hashed, hit, is_deleted))
+                    doc_freq[hashed] += df
+
+        scores: dict[tuple[str, int], float] = {}
+        for segment, hashed, hit, is_deleted in found:
+            idf = math.log(1 + (total_docs - doc_freq[hashed] + 0.5) / (doc_freq[hashed] + 0.5))
+            doclen = segment.doclen
+            name = segment.name
+            for doc_id, tf in segment.postings_for(*hit):
+                if is_deleted is not None and is_deleted(doc_id):
+                    continue
+                norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * doclen[doc_id] / avg_len)
+                key = (name, doc_id)
+                scores[key] = scores.get(key, 0.0) + idf * tf * (_BM25_K1 + 1) / (tf + norm)
+
+        results = []
+        for (name, doc_id), score in heapq.nlargest(k, scores.items(), key=lambda item: item[1]):
+            record = self.segments[name].document(doc_id)
+            results.append(Passage(record["source"], record["title"], record["text"], score, name, doc_id))
+        return results
+
+    def stats(self) -> dict:
+        """Return passage, segment, source and on-disk size counts."""
+        size = 0
+        for root, _, files in os.walk(self.path):
+            size += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+        return {
+            "segments": len(self.segments),
+            "passages": sum(segment.num_docs for segment in self.segments.values()),
+            "deleted": sum(end - start for ranges in self.manifest["deleted"].values() for start, end in ranges),
+            "sources": len(self.manifest["sources"]),
+            "bytes": size,
+        }
+
+    def close(self) -> None:
+        """Release every segment's memory maps."""
+        for segment in self.segments.values():
+            segment.close()
+        self.segments = {}
+
+
+def _range_test(ranges: list[list[int]]) -> Callable[[int], bool]:
+    # Tombstoned ranges never overlap (one per ingested document), so a
+    # bisect over their sorted starts finds the only candidate.
+    ordered = sorted(ranges)
+    starts = [start for start, _ in ordered]
+
+    def contains(doc_id: int) -> bool:
+        i = bisect.bisect_right(starts, doc_id) - 1
+        return i >= 0 and doc_id < ordered[i][1]
+
+    return contains
+
+
+def _under(path: str, roots: list[str]) -> bool:
+    return any(path == root or path.startswith(root.rstrip(os.sep) + os.sep) for root in roots)
+
+
+def _iter_files(paths: Iterable[str]) -> Iterator[str]:
+    for path in paths:
+        path = os.path.abspath(os.path.expanduser(path))
+        if os.path.isfile(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for filename in sorted(files):
+                if os.path.splitext(filename)[1].lower() in TEXT_SUFFIXES:
+                    yield os.path.join(root, filename)
+
+
+def _read_text(path: str) -> str:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    if os.path.splitext(path)[1].lower() in (".html", ".htm"):
+        text = _TAG_RE.sub(" ", text)
+    return text
+
+
+# Open readers by index path, most recently used last. A reader that is
+# replaced (its manifest changed) or evicted is closed once no search is using
+# it any more.
+_MAX_OPEN_INDEXES = 4
+
+
+class _OpenIndex:
+    __slots__ = ("mtime", "index", "users", "retired")
+
+    def __init__(self, mtime: float, index: CorpusIndex):
+        self.mtime = mtime
+        self.index = index
+        self.users = 0
+        self.retired = False
+
+
+_indexes: "OrderedDict[str, _OpenIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _retire_locked(entry: _OpenIndex) -> None:
+    entry.retired = True
+    if entry.users == 0:
+        entry.index.close()
+
+
+@contextmanager
+def open_corpus(path: str) -> Iterator[CorpusIndex | None]:
+    """Use the process-wide reader for the index at ``path`` (None if it does not exist).
+
+    The index is reopened when its manifest changes, so ingests made by
+    another process become visible without a restart. At most
+    ``_MAX_OPEN_INDEXES`` paths stay open; replaced and evicted readers are
+    closed (memory maps released) after their last search.
+    """
+    manifest_path = os.path.join(path, MANIFEST)
+    try:
+        mtime = os.path.getmtime(manifest_path)
+    except OSError:
+        yield None
+        return
+    with _indexes_lock:
+        entry = _indexes.get(path)
+        if entry is None or entry.mtime != mtime:
+            if entry is not None:
+                _retire_locked(entry)
+            entry = _indexes[path] = _OpenIndex(mtime, CorpusIndex(path))
+        _indexes.move_to_end(path)
+        while len(_indexes) > _MAX_OPEN_INDEXES:
+            _retire_locked(_indexes.popitem(last=False)[1])
+        entry.users += 1
+    try:
+        yield entry.index
+    finally:
+        with _indexes_lock:
+            entry.users -= 1
+            if entry.retired and entry.users == 0:
+                entry.index.close()
+
+
+def format_passages(query: str, passages: list[Passage]) -> str:
+    """Render retrieved passages as a research result for the reflection/answer prompts."""
+    if not passages:
+        return f"No local documents matched '{query}'."
+    lines = [f"Local documents for '{query}':"]
+    for i, passage in enumerate(passages, 1):
+        lines.append(f"[{i}] {passage.title} ({passage.source}):\n{passage.text}")
+    return "\n\n".join(lines)
+
+
+def main() -> None:
+    """Run the corpus index CLI."""
+    parser = argparse.ArgumentParser(description="Build and query a local corpus index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="Index (or re-index changed) text files.")
+    ingest.add_argument("index")
+    ingest.add_argument("paths", nargs="+")
+    ingest.add_argument("--chunk-words", type=int, default=DEFAULT_CHUNK_WORDS)
+    ingest.add_argument("--overlap", type=int, default=DEFAULT_CHUNK_OVERLAP)
+    query = sub.add_parser("query", help="Print the best passages for a query.")
+    query.add_argument("index")
+    query.add_argument("text")
+    query.add_argument("-k", type=int, default=5)
+    for name, help_text in (("stats", "Show index statistics."), ("compact", "Merge all segments into one.")):
+        sub.add_parser(name, help=help_text).add_argument("index")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    index = CorpusIndex(args.index)
+    if args.command == "ingest":
+        logger.info("%s", index.ingest_paths(args.paths, args.chunk_words, args.overlap))
+    elif args.command == "query":
+        for passage in index.search(args.text, args.k):
+            logger.info("%7.3f  %s\n         %s", passage.score, passage.source, passage.text[:200])
+    elif args.command == "compact":
+        index.compact()
+        logger.info("%s", index.stats())
+    else:
+        logger.info("%s", index.stats())
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Adaptive stopping policy for the research loop.
+
+Without it a run only stops when the reflection model declares the research
+sufficient or ``max_research_loops`` is reached, so late loops often re-find
+the same sources and restate the same facts. After every reflection the loop
+is scored by its information gain:
+
+* source gain: the share of the sources the loop retrieved that were not
+  already in ``sources_gathered`` (which only keeps distinct sources);
+* novelty: for each new summary, one minus its highest word-shingle Jaccard
+  similarity to any earlier summary of the run, averaged over the loop.
+
+The gain is the mean of the two, or novelty alone when the loop produced no
+sources. From the second loop on, research ends early when the gain falls
+below ``min_information_gain``, and at any loop when the run's wall-clock or
+token budget is spent. Tokens are counted in run state (``run_tokens``)
+whether or not instrumentation is enabled. The first reason that applies is recorded in run state
+as ``stop_reason``.
+"""
+
+import time
+from dataclasses import dataclass
+
+from agent.similarity import jaccard, shingles
+
+
+@dataclass
+class LoopGain:
+    """Information gained by one research loop."""
+
+    new_sources: int
+    total_sources: int
+    novelty: float
+
+    @property
+    def gain(self) -> float:
+        """Mean of source gain and novelty, or novelty alone without sources."""
+        if self.total_sources:
+            return (self.new_sources / self.total_sources + self.novelty) / 2
+        return self.novelty
+
+    def report(self, loop: int) -> dict:
+        """Return the per-loop record kept in run state."""
+        return {
+            "loop": loop,
+            "new_sources": self.new_sources,
+            "total_sources": self.total_sources,
+            "novelty": round(self.novelty, 4),
+            "gain": round(self.gain, 4),
+        }
+
+
+def measure_gain(
+    new_sources: int,
+    retrieved_sources: int,
+    summaries: list[str],
+    assessed_summary_count: int,
+) -> LoopGain:
+    """Score what the loop added since the previous assessment.
+
+    Args:
+        new_sources: Distinct sources first gathered in this loop.
+        retrieved_sources: Sources the loop's branches reported, repeats included.
+        summaries: The run's research summaries so far.
+        assessed_summary_count: How many of them the previous loop had seen.
+    """
+    earlier = [shingles(summary) for summary in summaries[:assessed_summary_count]]
+    novelties = []
+    for summary in summaries[assessed_summary_count:]:
+        words = shingles(summary)
+        overlap = max((jaccard(words, other) for other in earlier), default=0.0)
+        novelties.append(1.0 - overlap)
+    novelty = sum(novelties) / len(novelties) if novelties else 0.0
+
+    return LoopGain(new_sources=new_sources, total_sources=max(new_sources, retrieved_sources), novelty=novelty)
+
+
+def stop_reason(
+    *,
+    is_sufficient: bool,
+    loop: int,
+    max_loops: int,
+    follow_up_queries: list[str],
+    gain: LoopGain,
+    min_gain: float,
+    started_at: float | None,
+    time_budget_seconds: float,
+    tokens_spent: int,
+    token_budget: int,
+) -> str:
+    """Return why research should end after this loop, or ``""`` to continue."""
+    if is_sufficient:
+        return "sufficient"
+    if loop >= max_loops:
+        return "max_loops"
+    if not follow_up_queries:
+        return "no_new_queries"
+    if min_gain > 0 and loop >= 2 and gain.gain < min_gain:
+        return "low_gain"
+    if time_budget_seconds > 0 and started_at is not None and time.time() - started_at >= time_budget_seconds:
+        return "time_budget"
+    if token_budget > 0 and tokens_spent >= token_budget:
+        return "token_budget"
+    return ""
@@ -0,0 +1,361 @@
+"""Bounded fetching and text extraction of search result pages.
+
+Search snippets alone make for shallow summaries. When ``fetch_pages`` is
+enabled, ``web_research`` fetches the top ``fetch_top_k`` result pages and
+hands their extracted text to the summarizer. Fetching is built to stay
+cheap and predictable under fan-out:
+
+* one shared ``httpx.AsyncClient`` (keep-alive pool) for every run in the
+  process, driven by a dedicated event loop thread so the sync and async
+  node paths share it;
+* at most ``fetch_per_host_limit`` concurrent requests per host;
+* only public addresses: hosts that resolve to private, loopback, link-local
+  or otherwise reserved addresses are refused, at every redirect hop, unless
+  ``fetch_allow_private_hosts`` is set. The request then goes to the address
+  that was checked (with the original ``Host`` header and TLS server name),
+  so a second DNS answer cannot point it elsewhere;
+* per-request timeouts, a byte cap per page and an overall deadline for the
+  whole batch; pages not done by then are cancelled and left out;
+* streaming extraction: HTML is decoded and fed to an ``HTMLParser`` chunk by
+  chunk, and the download stops once enough text has been extracted;
+* a disk cache keyed by URL. Fresh entries are served without a request.
+  Stale entries are revalidated with ``If-None-Match``/``If-Modified-Since``,
+  and a ``304`` reuses the stored text.
+"""
+
+import asyncio
+import codecs
+import ipaddress
+import re
+import socket
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+
+from agent.cache import get_cache
+
+USER_AGENT = "Mozilla/5.0 (compatible; local-deep-research/0.1)"
+_CHARSET_RE = re.compile(r"charset=([\w-]+)", re.IGNORECASE)
+_SPACE_RE = re.compile(r"[ \t\r\f\v]+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+MAX_REDIRECTS = 5
+
+
+class BlockedAddressError(ValueError):
+    """The URL points at an address the fetcher may not connect to."""
+
+
+class _TextExtractor(HTMLParser):
+    """Incremental HTML-to-text converter (skips scripts, styles and markup)."""
+
+    _SKIP = {"script", "style", "noscript", "svg", "template", "iframe"}
+    _BLOCK = {
+        "p", "div", "br", "li", "tr", "section", "article", "header", "footer", "blockquote",
+        "pre", "table", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6", "main", "aside", "nav",
+    }
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.chars = 0
+        self._parts: list[str] = []
+        self._skip_depth = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in self._BLOCK:
+            self._parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "title":
+            self._in_title = False
+        elif tag in self._BLOCK:
+            self._parts.append("\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth and data.strip():
+            self._parts.append(data)
+            self.chars += len(data)
+
+    def text(self) -> str:
+        text = _SPACE_RE.sub(" ", "".join(self._parts))
+        return _BLANK_LINES_RE.sub("\n\n", "\n".join(line.strip() for line in text.split("\n"))).strip()
+
+
+@dataclass
+class FetchedPage:
+    """Outcome of fetching one URL.
+
+    ``status`` is one of ``fetched``, ``cached``, ``not_modified``, ``stale``
+    (refresh failed, older copy used), ``skipped`` (not text), ``blocked``
+    (not a public address), ``error`` or ``timeout``.
+    """
+
+    url: str
+    status: str
+    title: str = ""
+    text: str = ""
+    bytes: int = 0
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def is_public_address(address: str) -> bool:
+    """Whether ``address`` is a globally routable IP (not private, loopback, link-local, ...)."""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def resolve_public_url(url: str) -> str:
+    """Resolve the URL's host and return an address to connect to, if every address is public.
+
+    Raises:
+        BlockedAddressError: If the scheme is not HTTP(S), the host is missing
+            or any address it resolves to is not public.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise BlockedAddressError(f"Refusing to fetch {url!r}")
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            parts.hostname, parts.port or (443 if parts.scheme == "https" else 80), type=socket.SOCK_STREAM
+        )
+    except socket.gaierror as e:
+        raise BlockedAddressError(f"Cannot resolve {parts.hostname!r}: {e}") from e
+    for info in infos:
+        if not is_public_address(info[4][0]):
+            raise BlockedAddressError(f"Refusing to fetch {url!r}: {info[4][0]} is not a public address")
+    if not infos:
+        raise BlockedAddressError(f"Cannot resolve {parts.hostname!r}")
+    return infos[0][4][0].split("%", 1)[0]
+
+
+def _pinned_request(client: httpx.AsyncClient, url: str, address: str, headers: dict, timeout) -> httpx.Request:
+    # Connect to ``address`` rather than letting the transport resolve the
+    # host again, while the server still sees (and TLS verifies) the host.
+    original = httpx.URL(url)
+    return client.build_request(
+        "GET",
+        original.copy_with(host=address),
+        headers={**headers, "Host": original.netloc.decode("ascii")},
+        timeout=timeout,
+        extensions={"sni_hostname": original.raw_host.decode("ascii")},
+    )
+
+
+class PageFetcher:
+    """Shared async fetcher; all coroutines run on its private event loop."""
+
+    def __init__(self, max_connections: int = 64):
+        """Pool up to ``max_connections`` connections across all hosts."""
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=16)
+        self._client: httpx.AsyncClient | None = None
+        # Entries live only while a request holds their semaphore.
+        self._host_semaphores: weakref.WeakValueDictionary[tuple[str, int], asyncio.Semaphore] = (
+            weakref.WeakValueDictionary()
+        )
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._start_lock = threading.Lock()
+
+    # --- Event loop plumbing ---
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="page-fetcher", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def fetch(self, urls: list[str], configurable) -> list[FetchedPage]:
+        """Fetch pages from synchronous code (blocks up to the fetch deadline)."""
+        future = asyncio.run_coroutine_threadsafe(self._fetch_all(urls, configurable), self._ensure_loop())
+        return future.result()
+
+    async def afetch(self, urls: list[str], configurable) -> list[FetchedPage]:
+        """Fetch pages from any event loop without blocking it."""
+        future = asyncio.run_coroutine_threadsafe(self._fetch_all(urls, configurable), self._ensure_loop())
+        return await asyncio.wrap_future(future)
+
+    # --- Fetching (runs on the fetcher loop) ---
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=self._limits,
+                follow_redirects=False,  # followed in ``_download`` so every hop is checked
+                headers={"User-Agent": USER_AGENT, "Accept": "text/html,text/plain;q=0.9,*/*;q=0.1"},
+            )
+        return self._client
+
+    def _host_semaphore(self, host: str, limit: int) -> asyncio.Semaphore:
+        key = (host, limit)
+        semaphore = self._host_semaphores.get(key)
+        if semaphore is None:
+            semaphore = self._host_semaphores[key] = asyncio.Semaphore(limit)
+        return semaphore
+
+    async def _fetch_all(self, urls: list[str], configurable) -> list[FetchedPage]:
+        cache = get_cache(
+            "fetched_pages",
+            configurable.page_cache_backend,
+            max_entries=configurable.page_cache_max_entries,
+            ttl_seconds=0,
+            path=configurable.page_cache_path,
+        )
+        tasks = [asyncio.ensure_future(self._fetch_one(url, configurable, cache)) for url in urls]
+        if not tasks:
+            return []
+        done, pending = await asyncio.wait(tasks, timeout=configurable.fetch_deadline_seconds)
+        for task in pending:
+            task.cancel()
+        pages = []
+        for url, task in zip(urls, tasks):
+            if task in done and not task.cancelled() and task.exception() is None:
+                pages.append(task.result())
+            else:
+                status = "timeout" if task in pending else "error"
+                pages.append(FetchedPage(url, status))
+        return pages
+
+    async def _fetch_one(self, url: str, configurable, cache) -> FetchedPage:
+        entry = await asyncio.to_thread(cache.get, url) if cache is not None else None
+        if entry is not None and time.time() - entry["fetched_at"] < configurable.page_cache_ttl_seconds:
+            return FetchedPage(url, "cached", entry["title"], entry["text"])
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        async with self._host_semaphore(_host(url), configurable.fetch_per_host_limit):
+            try:
+                page, validators = await self._download(url, headers, configurable)
+            except BlockedAddressError:
+                return FetchedPage(url, "blocked")
+            except (httpx.HTTPError, UnicodeError, ValueError):
+                if entry is not None:
+                    return FetchedPage(url, "stale", entry["title"], entry["text"])
+                return FetchedPage(url, "error")
+
+        if page.status == "not_modified" and entry is not None:
+            page = FetchedPage(url, "not_modified", entry["title"], entry["text"])
+            validators = {"etag": entry.get("etag"), "last_modified": entry.get("last_modified")}
+        if cache is not None and page.status in ("fetched", "not_modified"):
+            record = {"title": page.title, "text": page.text, "fetched_at": time.time(), **validators}
+            await asyncio.to_thread(cache.set, url, record)
+        return page
+
+    async def _download(self, url: str, headers: dict, configurable) -> tuple[FetchedPage, dict]:
+        timeout = httpx.Timeout(configurable.fetch_timeout_seconds)
+        target = url
+        for _ in range(MAX_REDIRECTS + 1):
+            if configurable.fetch_allow_private_hosts:
+                request = self._http().build_request("GET", target, headers=headers, timeout=timeout)
+            else:
+                address = await resolve_public_url(target)
+                request = _pinned_request(self._http(), target, address, headers, timeout)
+            response = await self._http().send(request, stream=True)
+            if not response.is_redirect:
+                break
+            await response.aclose()
+            # Resolve the location against the URL with its host name, not the
+            # pinned address the request went to.
+            target = str(httpx.URL(target).join(response.headers["location"]))
+        else:
+            raise httpx.TooManyRedirects(f"More than {MAX_REDIRECTS} redirects", request=request)
+
+        try:
+            validators = {
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+            }
+            if response.status_code == 304:
+                return FetchedPage(url, "not_modified"), validators
+            response.raise_for_status()
+
+            content_type = response.headers.get("content-type", "text/html").lower()
+            is_html = "html" in content_type
+            if not is_html and not content_type.startswith("text/"):
+                return FetchedPage(url, "skipped"), validators
+            match = _CHARSET_RE.search(content_type)
+            try:
+                decoder = codecs.getincrementaldecoder(match.group(1) if match else "utf-8")(errors="replace")
+            except LookupError:
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+            extractor = _TextExtractor() if is_html else None
+            plain: list[str] = []
+            received, max_chars = 0, configurable.fetch_max_chars
+            async for chunk in response.aiter_bytes():
+                received += len(chunk)
+                decoded = decoder.decode(chunk[: max(0, configurable.fetch_max_bytes - received + len(chunk))])
+                if extractor is not None:
+                    extractor.feed(decoded)
+                    extracted = extractor.chars
+                else:
+                    plain.append(decoded)
+                    extracted = sum(len(part) for part in plain)
+                # Stop downloading once the page is over budget either way.
+                if received >= configurable.fetch_max_bytes or extracted >= max_chars:
+                    break
+        finally:
+            await response.aclose()
+
+        if extractor is not None:
+            extractor.close()
+            title, text = extractor.title.strip(), extractor.text()
+        else:
+            title, text = "", "".join(plain).strip()
+        return FetchedPage(url, "fetched", title, text[:max_chars], received), validators
+
+
+_fetcher = PageFetcher()
+
+
+def fetch_pages(urls: list[str], configurable) -> list[FetchedPage]:
+    """Fetch and extract pages with the process-wide fetcher (sync)."""
+    return _fetcher.fetch(urls, configurable)
+
+
+async def afetch_pages(urls: list[str], configurable) -> list[FetchedPage]:
+    """Async version of ``fetch_pages``."""
+    return await _fetcher.afetch(urls, configurable)
+
+
+def format_pages(pages: list[FetchedPage]) -> str:
+    """Render the usable pages as a text block for the summarization prompt."""
+    blocks = [
+        f"Page: {page.title or page.url}\n{page.url}\n{page.text}"
+        for page in pages
+        if page.text
+    ]
+    return "\n\n".join(blocks)
+
+
+def fetch_stats(pages: list[FetchedPage]) -> dict[str, Any]:
+    """Per-call counters (pages by status, bytes downloaded) for run state."""
+    stats: dict[str, Any] = {"bytes": sum(page.bytes for page in pages)}
+    for page in pages:
+        stats[page.status] = stats.get(page.status, 0) + 1
+    return stats
@@ -0,0 +1,166 @@
+"""Speculative prefetch of follow-up searches while reflection is generating.
+
+Normally ``reflection`` has to finish its LLM call before ``evaluate_research``
+can dispatch the next loop's ``web_research`` branches, so the two slowest
+steps of every loop run back to back. With ``speculative_prefetch`` enabled,
+reflection streams its JSON answer instead and parses it as it grows. As soon
+as a follow-up query string is complete, that query is searched in the
+background and the result is parked in the search cache. The next loop's
+searches then hit the cache or join the search that is still in flight.
+The gain is largest when more output follows the follow-up list, as with
+``incremental_reflection`` (the knowledge state comes after it); otherwise
+only the follow-ups finished before the last one overlap with generation.
+
+A speculative search counts as used when the query is actually dispatched,
+and as wasted when it is pruned as a duplicate, the model declares the
+research sufficient, or the run stops. Waste is capped three ways:
+
+* at most ``speculative_prefetch_limit`` speculative searches per reflection,
+  and none once the partial answer already says ``is_sufficient``;
+* a bounded number of speculative searches in flight per process;
+* speculation pauses while more than ``speculative_prefetch_max_waste`` of
+  the recent speculative searches in the process were wasted.
+"""
+
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from typing import Callable
+
+from langchain_core.utils.json import parse_partial_json
+
+from agent.cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """Process-wide runner and bookkeeping for speculative searches."""
+
+    def __init__(self, max_workers: int = 4, window: int = 50, min_samples: int = 10):
+        """Run up to ``max_workers`` searches; the hit rate covers the last ``window`` outcomes."""
+        self.max_inflight = max_workers * 2
+        self.min_samples = min_samples
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._inflight: dict[str, Future] = {}
+        self._outcomes: deque[bool] = deque(maxlen=window)  # True = used
+        self._lock = threading.Lock()
+
+    def waste_ratio(self) -> float:
+        """Share of the recent speculative searches that were wasted."""
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return 1.0 - sum(self._outcomes) / len(self._outcomes)
+
+    def paused(self, max_waste: float) -> bool:
+        """Whether recent waste is too high to keep speculating."""
+        with self._lock:
+            samples = len(self._outcomes)
+        return samples >= self.min_samples and self.waste_ratio() > max_waste
+
+    def submit(self, key: str, work: Callable[[], None]) -> bool:
+        """Start ``work`` for a search cache key unless it is already running or the pool is full."""
+        with self._lock:
+            if key in self._inflight or len(self._inflight) >= self.max_inflight:
+                return False
+            future = self._executor.submit(self._run, key, work)
+            self._inflight[key] = future
+        future.add_done_callback(lambda _: self._forget(key, future))
+        return True
+
+    def _run(self, key: str, work: Callable[[], None]) -> None:
+        try:
+            work()
+        except Exception as e:
+            logger.debug("Speculative search for %s failed: %s", key, e)
+
+    def _forget(self, key: str, future: Future) -> None:
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def wait(self, key: str, timeout: float) -> None:
+        """Block until a speculative search for ``key`` finishes (no-op if none is running)."""
+        with self._lock:
+            future = self._inflight.get(key)
+        if future is not None:
+            wait_futures([future], timeout=timeout)
+
+    async def await_inflight(self, key: str, timeout: float) -> None:
+        """Async version of ``wait``."""
+        with self._lock:
+            future = self._inflight.get(key)
+        if future is not None:
+            await asyncio.wait([asyncio.wrap_future(future)], timeout=timeout)
+
+    def record(self, used: int, wasted: int) -> None:
+        """Add settled speculative searches to the waste window."""
+        with self._lock:
+            self._outcomes.extend([True] * used + [False] * wasted)
+
+
+_prefetcher = Prefetcher()
+
+
+def get_prefetcher() -> Prefetcher:
+    """Return the process-wide prefetcher."""
+    return _prefetcher
+
+
+class Speculation:
+    """The speculative searches launched during one reflection call.
+
+    Args:
+        already_run: Queries the session has searched (never speculated on).
+        limit: Maximum speculative searches for this reflection.
+        launch: Starts a background search for a query; returns whether it did.
+    """
+
+    def __init__(self, already_run: list[str], limit: int, launch: Callable[[str], bool]):
+        """Track speculative searches for one run, launching at most ``limit``."""
+        self.limit = limit
+        self.launched: list[str] = []
+        self._launch = launch
+        self._seen = {normalize_query(query) for query in already_run}
+        self._stopped = False
+
+    def feed(self, text: str, chunk: str) -> None:
+        """Inspect the partial JSON answer after a new chunk arrived."""
+        # A follow-up can only have completed if the chunk closed a string.
+        if self._stopped or '"' not in chunk or len(self.launched) >= self.limit:
+            return
+        partial = parse_partial_json(text)
+        if not isinstance(partial, dict):
+            return
+        if partial.get("is_sufficient") is True:
+            self._stopped = True
+            return
+        queries = partial.get("follow_up_queries")
+        if not isinstance(queries, list):
+            return
+        # The last item may still be growing, unless a later field (e.g. the
+        # incremental knowledge_state) has started.
+        if list(partial)[-1] == "follow_up_queries":
+            queries = queries[:-1]
+        for query in queries:
+            if len(self.launched) >= self.limit:
+                break
+            normalized = normalize_query(query) if isinstance(query, str) else ""
+            if not normalized or normalized in self._seen:
+                continue
+            self._seen.add(normalized)
+            if self._launch(query):
+                self.launched.append(normalized)
+
+    def settle(self, dispatched: list[str], prefetcher: Prefetcher | None = None) -> dict:
+        """Count used vs wasted speculation once the real follow-ups are known."""
+        dispatched_set = {normalize_query(query) for query in dispatched}
+        used = sum(1 for query in self.launched if query in dispatched_set)
+        wasted = len(self.launched) - used
+        if self.launched:
+            (prefetcher or _prefetcher).record(used, wasted)
+        return {"launched": len(self.launched), "used": used, "wasted": wasted}
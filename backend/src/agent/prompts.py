@@ -34,6 +34,20 @@ Topic: What revenue grew more last year apple stock or the number of people buyi
 Context: {research_topic}"""
 
 
+history_summary_instructions = """Condense the earlier part of a conversation between a user and a research assistant so the assistant can keep researching the user's latest questions.
+
+Instructions:
+- Fold the new messages into the existing summary; keep the user's goals, constraints and open questions, and the key facts and conclusions already given.
+- Drop greetings, repetition and formatting. Do not invent anything.
+- Keep the summary under {max_words} words.
+
+Existing summary:
+{summary}
+
+New messages:
+{messages}"""
+
+
 web_searcher_instructions = """Conduct targeted Google Searches to gather the most recent, credible information on "{research_topic}" and synthesize it into a verifiable text artifact.
 
 Instructions:
@@ -47,6 +61,29 @@ Research Topic:
 {research_topic}
 """
 
+chunk_summary_instructions = """Summarize part {part} of {parts} of the search results gathered for "{research_topic}".
+
+Instructions:
+- The current date is {current_date}.
+- Keep every concrete fact, figure and date relevant to the topic, together with the URL it came from.
+- Only include information found in this part, don't make up any information.
+- Be concise: this partial summary will be merged with the summaries of the other parts.
+
+Search Results (part {part} of {parts}):
+{chunk}
+"""
+
+reduce_summary_instructions = """Merge the partial summaries below, each covering part of the search results gathered for "{research_topic}", into one concise summary.
+
+Instructions:
+- The current date is {current_date}.
+- Remove repetition across parts but keep every distinct fact, figure and date together with its source URL.
+- Only include information present in the partial summaries, don't make up any information.
+
+Partial Summaries:
+{summaries}
+"""
+
 reflection_instructions = """You are an expert research assistant analyzing summaries about "{research_topic}".
 
 Instructions:
@@ -79,6 +116,44 @@ Summaries:
 {summaries}
 """
 
+incremental_reflection_instructions = """You are an expert research assistant analyzing summaries about "{research_topic}".
+
+You are given your condensed notes from earlier research loops and the summaries gathered since then.
+
+Instructions:
+- Merge the new summaries into the notes, producing an updated condensed knowledge state. Keep every key fact, figure and source URL, drop repetition.
+- Identify knowledge gaps or areas that need deeper exploration and generate a follow-up query. (1 or multiple).
+- If the notes and new summaries are sufficient to answer the user's question, don't generate a follow-up query.
+- Focus on technical details, implementation specifics, or emerging trends that weren't fully covered.
+- The current date is {current_date}.
+
+Requirements:
+- Ensure the follow-up query is self-contained and includes necessary context for web search.
+
+Output Format:
+- Format your response as a JSON object with these exact keys:
+   - "is_sufficient": true or false
+   - "knowledge_gap": Describe what information is missing or needs clarification
+   - "follow_up_queries": Write a specific question to address this gap
+   - "knowledge_state": The updated condensed notes
+
+Example:
+```json
+{{
+    "is_sufficient": false,
+    "knowledge_gap": "The summary lacks information about performance metrics and benchmarks",
+    "follow_up_queries": ["What are typical performance benchmarks and metrics used to evaluate [specific technology]?"],
+    "knowledge_state": "- [specific technology] was released in 2024 (https://example.com/release)\\n- ..."
+}}
+```
+
+Notes from earlier loops:
+{knowledge_state}
+
+New Summaries:
+{summaries}
+"""
+
 answer_instructions = """Generate a high-quality answer to the user's question based on the provided summaries.
 
 Instructions:
@@ -0,0 +1,69 @@
+"""Pruning of repeated and trivially rephrased search queries before dispatch.
+
+Both ``generate_query`` and later ``reflection`` follow-ups can propose
+queries the session already ran. Every such query costs a search plus a
+summarization that adds no information, so candidates are checked against
+everything already run (and against each other) first:
+
+* exact duplicates: equal after ``normalize_query`` (case, spacing, quotes);
+* near duplicates (optional): MinHash-estimated Jaccard similarity of
+  character shingles at or above a threshold.
+"""
+
+from dataclasses import dataclass, field
+
+from agent.cache import normalize_query
+from agent.similarity import MinHasher, char_shingles
+
+_minhasher = MinHasher()
+
+
+@dataclass
+class DedupResult:
+    """Queries that survived deduplication and how many were pruned."""
+
+    kept: list[str]
+    pruned: dict[str, int] = field(default_factory=lambda: {"exact": 0, "near": 0})
+
+    def report(self, loop: int) -> dict:
+        """Return the per-loop counters recorded in run state."""
+        return {"loop": loop, "kept": len(self.kept), **self.pruned}
+
+
+def prune_queries(
+    candidates: list[str],
+    already_run: list[str],
+    near_duplicate_threshold: float = 0.0,
+) -> DedupResult:
+    """Drop candidates that duplicate an earlier query or each other.
+
+    Args:
+        candidates: Newly proposed queries, in priority order.
+        already_run: Every query already searched in the session.
+        near_duplicate_threshold: Estimated Jaccard similarity at or above
+            which a candidate counts as a near-duplicate; ``0`` disables
+            near-duplicate pruning.
+    """
+    result = DedupResult(kept=[])
+    seen = {normalize_query(query) for query in already_run}
+    signatures = []
+    if near_duplicate_threshold > 0:
+        signatures = [_minhasher.signature(char_shingles(query)) for query in seen]
+
+    for candidate in candidates:
+        normalized = normalize_query(candidate)
+        if not normalized or normalized in seen:
+            result.pruned["exact"] += 1
+            continue
+        if near_duplicate_threshold > 0:
+            signature = _minhasher.signature(char_shingles(normalized))
+            if any(
+                MinHasher.similarity(signature, other) >= near_duplicate_threshold
+                for other in signatures
+            ):
+                result.pruned["near"] += 1
+                continue
+            signatures.append(signature)
+        seen.add(normalized)
+        result.kept.append(candidate)
+    return result
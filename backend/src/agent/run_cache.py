@@ -0,0 +1,90 @@
+"""Run-level cache of finished research, keyed on the research topic.
+
+Users ask the same question many times a day. With ``run_cache_backend``
+set, a finished run stores its answer together with the summaries, sources
+and queries it was built from. The key is the normalized research topic
+(``get_research_topic``) plus the settings that shape the research: the four
+models, ``number_of_initial_queries``, the loop limit, the search providers
+and the local corpus. A later run with the same key then either
+
+* ``run_cache_mode="answer"``: returns the stored answer and sources without
+  any LLM call or search, or
+* ``run_cache_mode="summaries"``: reuses the stored summaries and sources and
+  regenerates only the final answer.
+
+Summaries are cached as text, with blob references resolved (see
+``agent.blob_store``): a reference only resolves against the blob store that
+wrote it, which another run may not share or may have garbage-collected.
+
+Entries older than ``run_cache_ttl_seconds`` are stale and ignored, so the
+research is redone. Regenerated answers are not written back, which keeps an
+entry's age tied to when its research was done.
+"""
+
+import time
+from typing import Any
+
+from agent import search_providers
+from agent.blob_store import is_ref, load_texts
+from agent.cache import Cache, content_key, get_cache, normalize_query
+
+RUN_CACHE_MODES = ("answer", "summaries")
+
+
+def get_run_cache(configurable) -> Cache | None:
+    """Return the process-wide run cache, or ``None`` when it is disabled."""
+    return get_cache(
+        "research_runs",
+        configurable.run_cache_backend,
+        max_entries=configurable.run_cache_max_entries,
+        ttl_seconds=configurable.run_cache_ttl_seconds,
+        path=configurable.run_cache_path,
+    )
+
+
+def run_cache_key(topic: str, configurable, max_research_loops: int) -> str:
+    """Key a run on its normalized topic and the settings that shape its research."""
+    return content_key(
+        normalize_query(topic),
+        configurable.query_generator_model,
+        configurable.search_llm_model,
+        configurable.reflection_model,
+        configurable.answer_model,
+        str(configurable.number_of_initial_queries),
+        str(max_research_loops),
+        search_providers.providers_label(configurable),
+        configurable.local_corpus_path,
+    )
+
+
+def run_cache_entry(answer: str, state: dict, configurable) -> dict[str, Any]:
+    """Return the cached form of a finished run.
+
+    Only this run's research is kept: earlier turns of the thread come before
+    the run's offsets, and replaying them into another thread would append
+    that thread's queries and sources again.
+    """
+    summaries = (state.get("web_research_result") or [])[state.get("run_summary_offset") or 0 :]
+    return {
+        "answer": answer,
+        "web_research_result": load_texts(summaries, configurable),
+        "sources_gathered": list((state.get("sources_gathered") or [])[state.get("run_source_offset") or 0 :]),
+        "search_query": list((state.get("search_query") or [])[state.get("run_query_offset") or 0 :]),
+        "researched_at": time.time(),
+    }
+
+
+def lookup_run(cache: Cache | None, key: str, ttl_seconds: float) -> dict[str, Any] | None:
+    """Return a fresh entry for ``key``, or ``None`` on a miss or a stale entry."""
+    if cache is None:
+        return None
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    if ttl_seconds > 0 and time.time() - entry["researched_at"] > ttl_seconds:
+        return None
+    # Entries cached before summaries were stored as text may hold blob
+    # references that no longer resolve; redo their research.
+    if any(is_ref(summary) for summary in entry.get("web_research_result") or []):
+        return None
+    return entry
@@ -0,0 +1,289 @@
+"""Process-wide concurrency limits for web searches and LLM calls.
+
+Fan-out ``web_research`` branches would otherwise fire every search and every
+summarization at once, overloading a single local LLM server and tripping
+search-engine rate limits. The scheduler gives each resource a
+``FairLimiter``: at most ``limit`` holders at a time, with waiters queued per
+session (LangGraph thread) and served round-robin so one run with a large
+fan-out cannot starve the others.
+
+Limiters are shared by every run in the server process and work for both the
+sync and the async node implementations. Queue depth and wait times are kept
+as counters for backpressure monitoring.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+
+from agent.endpoints import role_endpoints
+from agent.instrumentation import phase
+
+DEFAULT_SESSION = "default"
+
+
+class _Waiter:
+    __slots__ = ("event", "loop", "future", "granted")
+
+    def __init__(self, event=None, loop=None, future=None):
+        self.event = event
+        self.loop = loop
+        self.future = future
+        self.granted = False
+
+
+def _resolve_future(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class FairLimiter:
+    """A counting semaphore with per-session round-robin queuing.
+
+    Usable from threads (``acquire``/``release``) and coroutines
+    (``acquire_async``/``release``) at the same time.
+    """
+
+    def __init__(self, name: str, limit: int):
+        """Admit at most ``limit`` holders at a time."""
+        self.name = name
+        self.limit = max(1, limit)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queues: OrderedDict[str, deque[_Waiter]] = OrderedDict()
+        self._queued = 0
+        self.acquired = 0
+        self.waited = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.max_queue_depth = 0
+
+    def resize(self, limit: int) -> None:
+        """Change the concurrency limit, admitting queued waiters if it grew."""
+        with self._lock:
+            self.limit = max(1, limit)
+            while self._queued and self._active < self.limit:
+                self._active += 1
+                self._grant_next_locked()
+
+    def acquire(self, session: str = DEFAULT_SESSION) -> float:
+        """Block until a slot is free; return the seconds spent waiting."""
+        with self._lock:
+            if self._try_acquire_locked():
+                return 0.0
+            waiter = _Waiter(event=threading.Event())
+            self._enqueue_locked(session, waiter)
+        start = time.perf_counter()
+        waiter.event.wait()
+        return self._record_wait(time.perf_counter() - start)
+
+    async def acquire_async(self, session: str = DEFAULT_SESSION) -> float:
+        """Await a free slot without blocking the event loop; return the wait."""
+        with self._lock:
+            if self._try_acquire_locked():
+                return 0.0
+            loop = asyncio.get_running_loop()
+            waiter = _Waiter(loop=loop, future=loop.create_future())
+            self._enqueue_locked(session, waiter)
+        start = time.perf_counter()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._remove_locked(session, waiter)
+            if granted:
+                self.release()
+            raise
+        return self._record_wait(time.perf_counter() - start)
+
+    def release(self) -> None:
+        """Free a slot, handing it to the next waiter in round-robin order."""
+        with self._lock:
+            if self._queued:
+                self._grant_next_locked()
+            else:
+                self._active = max(0, self._active - 1)
+
+    def stats(self) -> dict[str, Any]:
+        """Return current and lifetime backpressure counters."""
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "in_flight": self._active,
+                "queue_depth": self._queued,
+                "max_queue_depth": self.max_queue_depth,
+                "acquired": self.acquired,
+                "waited": self.waited,
+                "total_wait_seconds": self.total_wait_seconds,
+                "max_wait_seconds": self.max_wait_seconds,
+            }
+
+    def _try_acquire_locked(self) -> bool:
+        # Queued waiters go first even if a slot looks free, to stay fair.
+        if self._active < self.limit and not self._queued:
+            self._active += 1
+            self.acquired += 1
+            return True
+        return False
+
+    def _enqueue_locked(self, session: str, waiter: _Waiter) -> None:
+        self._queues.setdefault(session, deque()).append(waiter)
+        self._queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, self._queued)
+
+    def _remove_locked(self, session: str, waiter: _Waiter) -> None:
+        queue = self._queues.get(session)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        self._queued -= 1
+        if not queue:
+            del self._queues[session]
+
+    def _grant_next_locked(self) -> None:
+        # The slot passes straight to the waiter, so ``_active`` is unchanged.
+        session, queue = next(iter(self._queues.items()))
+        waiter = queue.popleft()
+        self._queued -= 1
+        if queue:
+            self._queues.move_to_end(session)
+        else:
+            del self._queues[session]
+        waiter.granted = True
+        self.acquired += 1
+        if waiter.event is not None:
+            waiter.event.set()
+        else:
+            waiter.loop.call_soon_threadsafe(_resolve_future, waiter.future)
+
+    def _record_wait(self, seconds: float) -> float:
+        with self._lock:
+            self.waited += 1
+            self.total_wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+        return seconds
+
+
+class Scheduler:
+    """Registry of the process-wide search limiter and per-model LLM limiters."""
+
+    def __init__(self, max_concurrent_searches: int = 4, max_concurrent_llm_calls: int = 2):
+        """Create the search limiter; LLM limiters default to ``max_concurrent_llm_calls``."""
+        self._lock = threading.Lock()
+        self.search = FairLimiter("search", max_concurrent_searches)
+        self.max_concurrent_llm_calls = max_concurrent_llm_calls
+        self._llm: dict[tuple[str, str], FairLimiter] = {}
+
+    def llm(self, api_base: str, model: str, limit: int | None = None) -> FairLimiter:
+        """Return the limiter for one model on one endpoint, creating it if needed."""
+        key = (api_base, model)
+        with self._lock:
+            limiter = self._llm.get(key)
+            if limiter is None:
+                limiter = FairLimiter(f"llm:{model}", limit or self.max_concurrent_llm_calls)
+                self._llm[key] = limiter
+        if limit is not None and limiter.limit != limit:
+            limiter.resize(limit)
+        return limiter
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Return backpressure counters for every limiter."""
+        with self._lock:
+            limiters = [self.search, *self._llm.values()]
+        return {limiter.name: limiter.stats() for limiter in limiters}
+
+
+_scheduler = Scheduler()
+
+
+def get_scheduler() -> Scheduler:
+    """Return the process-wide scheduler."""
+    return _scheduler
+
+
+def scheduler_stats() -> dict[str, dict[str, Any]]:
+    """Return the process-wide scheduler counters."""
+    return _scheduler.stats()
+
+
+def session_id(config: RunnableConfig | None) -> str:
+    """Identify the user session (LangGraph thread) a node call belongs to."""
+    if not config:
+        return DEFAULT_SESSION
+    configurable = config.get("configurable") or {}
+    metadata = config.get("metadata") or {}
+    return str(
+        configurable.get("thread_id")
+        or metadata.get("thread_id")
+        or metadata.get("run_id")
+        or DEFAULT_SESSION
+    )
+
+
+def _search_limiter(configurable) -> FairLimiter:
+    limiter = _scheduler.search
+    if limiter.limit != configurable.max_concurrent_searches:
+        limiter.resize(configurable.max_concurrent_searches)
+    return limiter
+
+
+def llm_limiter(configurable, model_name_in_config: str) -> FairLimiter:
+    """Return the limiter shared by every call to a role's model and endpoint pool.
+
+    The per-model limit applies per endpoint, so the pool's limit is that
+    times the number of endpoints.
+    """
+    endpoints = role_endpoints(configurable, model_name_in_config)
+    return _scheduler.llm(
+        ",".join(endpoints),
+        getattr(configurable, model_name_in_config),
+        configurable.max_concurrent_llm_calls_per_model * len(endpoints),
+    )
+
+
+@contextmanager
+def _slot(limiter: FairLimiter, config: RunnableConfig | None):
+    # Timed as a phase, so parallel waits in one node count once.
+    with phase("queue_wait"):
+        waited = limiter.acquire(session_id(config))
+    try:
+        yield waited
+    finally:
+        limiter.release()
+
+
+@asynccontextmanager
+async def _aslot(limiter: FairLimiter, config: RunnableConfig | None):
+    with phase("queue_wait"):
+        waited = await limiter.acquire_async(session_id(config))
+    try:
+        yield waited
+    finally:
+        limiter.release()
+
+
+def search_slot(configurable, config: RunnableConfig | None):
+    """Hold a search slot for the duration of the block; yields the wait in seconds."""
+    return _slot(_search_limiter(configurable), config)
+
+
+def asearch_slot(configurable, config: RunnableConfig | None):
+    """Async version of ``search_slot``."""
+    return _aslot(_search_limiter(configurable), config)
+
+
+def llm_slot(configurable, model_name_in_config: str, config: RunnableConfig | None):
+    """Hold an LLM slot for the configured model; yields the wait in seconds."""
+    return _slot(llm_limiter(configurable, model_name_in_config), config)
+
+
+def allm_slot(configurable, model_name_in_config: str, config: RunnableConfig | None):
+    """Async version of ``llm_slot``."""
+    return _aslot(llm_limiter(configurable, model_name_in_config), config)
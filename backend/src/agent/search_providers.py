@@ -0,0 +1,318 @@
+"""Pluggable web search backends with concurrent multi-provider fan-in.
+
+``web_research`` asks this module for search results instead of building a
+``DuckDuckGoSearchRun`` on every call. Providers are chosen per run with the
+comma-separated ``search_providers`` setting:
+
+* ``duckduckgo``: the public DuckDuckGo API (needs ``duckduckgo-search``),
+* ``searxng``: a SearxNG instance's JSON API at ``searxng_url``,
+* ``elasticsearch``: a ``multi_match`` query against ``elasticsearch_index``
+  on ``elasticsearch_url``, for on-prem / air-gapped indexes.
+
+Additional backends can be added with ``register_provider``.
+
+With more than one provider, all of them are queried concurrently; results
+are merged in provider order and deduplicated by URL, and the search returns
+as soon as ``search_quorum`` providers have answered or
+``search_deadline_seconds`` has passed, whichever comes first. Slow
+providers therefore only cost tail latency when they are needed.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import httpx
+
+from agent.sources import canonical_url
+
+
+@dataclass
+class SearchResult:
+    """One search hit."""
+
+    title: str
+    url: str
+    snippet: str
+    provider: str
+
+
+class SearchProvider:
+    """Base class for search backends.
+
+    Subclasses implement ``search``; ``asearch`` defaults to running it on a
+    worker thread and should be overridden by backends with a native async
+    client.
+    """
+
+    name = "base"
+
+    def search(self, query: str, max_results: int) -> list[SearchResult]:
+        """Return up to ``max_results`` results for ``query``."""
+        raise NotImplementedError
+
+    async def asearch(self, query: str, max_results: int) -> list[SearchResult]:
+        """Async version of ``search`` (runs it in a worker thread by default)."""
+        return await asyncio.to_thread(self.search, query, max_results)
+
+
+class DuckDuckGoProvider(SearchProvider):
+    """DuckDuckGo text search via the LangChain community wrapper."""
+
+    name = "duckduckgo"
+
+    def __init__(self):
+        """Create the DuckDuckGo client."""
+        # Imported lazily so deployments without duckduckgo-search can still
+        # use the on-prem backends.
+        from langchain_community.utilities import DuckDuckGoSearchAPIWrapper
+
+        self._wrapper = DuckDuckGoSearchAPIWrapper()
+
+    def search(self, query: str, max_results: int) -> list[SearchResult]:
+        """Return up to ``max_results`` results for ``query``."""
+        return [
+            SearchResult(item["title"], item["link"], item["snippet"], self.name)
+            for item in self._wrapper.results(query, max_results)
+            if "link" in item
+        ]
+
+
+class SearxNGProvider(SearchProvider):
+    """Search through a SearxNG instance's JSON API (``format=json`` must be enabled)."""
+
+    name = "searxng"
+
+    def __init__(self, base_url: str, timeout: float = 10.0):
+        """Query the SearXNG instance at ``base_url``."""
+        self.base_url = base_url.rstrip("/")
+        self._client = httpx.Client(timeout=timeout)
+        self._async_client = httpx.AsyncClient(timeout=timeout)
+
+    def _params(self, query: str) -> dict[str, str]:
+        return {"q": query, "format": "json"}
+
+    def _parse(self, payload: dict, max_results: int) -> list[SearchResult]:
+        return [
+            SearchResult(item.get("title", ""), item["url"], item.get("content", ""), self.name)
+            for item in payload.get("results", [])[:max_results]
+            if item.get("url")
+        ]
+
+    def search(self, query: str, max_results: int) -> list[SearchResult]:
+        """Return up to ``max_results`` results for ``query``."""
+        response = self._client.get(f"{self.base_url}/search", params=self._params(query))
+        response.raise_for_status()
+        return self._parse(response.json(), max_results)
+
+    async def asearch(self, query: str, max_results: int) -> list[SearchResult]:
+        """Async version of ``search``."""
+        response = await self._async_client.get(f"{self.base_url}/search", params=self._params(query))
+        response.raise_for_status()
+        return self._parse(response.json(), max_results)
+
+
+class ElasticsearchProvider(SearchProvider):
+    """Full-text search over an Elasticsearch/OpenSearch index with ``title``/``url``/``content`` fields."""
+
+    name = "elasticsearch"
+
+    def __init__(self, base_url: str, index: str, timeout: float = 10.0):
+        """Query ``index`` on the Elasticsearch/OpenSearch cluster at ``base_url``."""
+        self.endpoint = f"{base_url.rstrip('/')}/{index}/_search"
+        self._client = httpx.Client(timeout=timeout)
+        self._async_client = httpx.AsyncClient(timeout=timeout)
+
+    def _body(self, query: str, max_results: int) -> dict[str, Any]:
+        return {
+            "size": max_results,
+            "query": {"multi_match": {"query": query, "fields": ["title^2", "content"]}},
+            "_source": ["title", "url", "content"],
+        }
+
+    def _parse(self, payload: dict) -> list[SearchResult]:
+        results = []
+        for hit in payload.get("hits", {}).get("hits", []):
+            source = hit.get("_source", {})
+            url = source.get("url") or hit.get("_id", "")
+            results.append(SearchResult(source.get("title", ""), url, source.get("content", "")[:500], self.name))
+        return results
+
+    def search(self, query: str, max_results: int) -> list[SearchResult]:
+        """Return up to ``max_results`` results for ``query``."""
+        response = self._client.post(self.endpoint, json=self._body(query, max_results))
+        response.raise_for_status()
+        return self._parse(response.json())
+
+    async def asearch(self, query: str, max_results: int) -> list[SearchResult]:
+        """Async version of ``search``."""
+        response = await self._async_client.post(self.endpoint, json=self._body(query, max_results))
+        response.raise_for_status()
+        return self._parse(response.json())
+
+
+# name -> factory(configurable) -> SearchProvider
+_factories: dict[str, Callable[[Any], SearchProvider]] = {
+    "duckduckgo": lambda configurable: DuckDuckGoProvider(),
+    "searxng": lambda configurable: SearxNGProvider(
+        configurable.searxng_url, timeout=configurable.search_deadline_seconds
+    ),
+    "elasticsearch": lambda configurable: ElasticsearchProvider(
+        configurable.elasticsearch_url,
+        configurable.elasticsearch_index,
+        timeout=configurable.search_deadline_seconds,
+    ),
+}
+_providers: dict[tuple, SearchProvider] = {}
+_providers_lock = threading.Lock()
+
+# Runs provider calls for sync multi-provider searches; stragglers past the
+# deadline finish here in the background instead of blocking the node.
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="search-provider")
+
+
+def register_provider(name: str, factory: Callable[[Any], SearchProvider]) -> None:
+    """Make a provider selectable by name in ``search_providers``."""
+    with _providers_lock:
+        _factories[name] = factory
+        for key in [key for key in _providers if key[0] == name]:
+            del _providers[key]
+
+
+def _provider_key(name: str, configurable) -> tuple:
+    if name == "searxng":
+        return (name, configurable.searxng_url, configurable.search_deadline_seconds)
+    if name == "elasticsearch":
+        return (
+            name,
+            configurable.elasticsearch_url,
+            configurable.elasticsearch_index,
+            configurable.search_deadline_seconds,
+        )
+    return (name,)
+
+
+def provider_names(configurable) -> list[str]:
+    """Return the configured provider names, in priority order."""
+    return [name.strip().lower() for name in configurable.search_providers.split(",") if name.strip()]
+
+
+def get_providers(configurable) -> list[SearchProvider]:
+    """Return the (process-wide, reused) provider instances configured for a run."""
+    providers = []
+    with _providers_lock:
+        for name in provider_names(configurable):
+            if name not in _factories:
+                raise ValueError(f"Unknown search provider {name!r}; known: {sorted(_factories)}")
+            key = _provider_key(name, configurable)
+            provider = _providers.get(key)
+            if provider is None:
+                provider = _providers[key] = _factories[name](configurable)
+            providers.append(provider)
+    return providers
+
+
+def merge_results(result_lists: list[list[SearchResult]], max_results: int) -> list[SearchResult]:
+    """Interleave per-provider results round-robin, dropping repeated URLs."""
+    merged, seen = [], set()
+    for rank in range(max((len(results) for results in result_lists), default=0)):
+        for results in result_lists:
+            if rank >= len(results):
+                continue
+            result = results[rank]
+            key = canonical_url(result.url)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(result)
+    return merged[:max_results]
+
+
+def format_results(results: list[SearchResult]) -> str:
+    """Render results as the text block the summarization prompt expects."""
+    if not results:
+        return "No search results found."
+    return "\n\n".join(
+        f"[{i}] {result.title}\n{result.url}\n{result.snippet}" for i, result in enumerate(results, 1)
+    )
+
+
+def _quorum(configurable, provider_count: int) -> int:
+    quorum = configurable.search_quorum
+    return provider_count if quorum <= 0 else min(quorum, provider_count)
+
+
+def _collect(answered: dict[int, list[SearchResult]], errors: list[BaseException], query: str) -> list[list[SearchResult]]:
+    if not answered:
+        if errors:
+            raise errors[0]
+        raise TimeoutError(f"No search provider answered {query!r} before the deadline")
+    return [answered[i] for i in sorted(answered)]
+
+
+def search(query: str, configurable) -> list[SearchResult]:
+    """Query the configured providers, returning merged results at quorum or deadline."""
+    providers = get_providers(configurable)
+    max_results = configurable.search_max_results
+    if len(providers) == 1:
+        return providers[0].search(query, max_results)
+
+    quorum = _quorum(configurable, len(providers))
+    deadline = time.monotonic() + configurable.search_deadline_seconds
+    futures = {_executor.submit(p.search, query, max_results): i for i, p in enumerate(providers)}
+    answered: dict[int, list[SearchResult]] = {}
+    errors: list[BaseException] = []
+    pending = set(futures)
+    while pending and len(answered) < quorum:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                errors.append(future.exception())
+            else:
+                answered[futures[future]] = future.result()
+    for future in pending:
+        future.cancel()
+    return merge_results(_collect(answered, errors, query), max_results)
+
+
+async def asearch(query: str, configurable) -> list[SearchResult]:
+    """Async version of ``search``; stragglers are cancelled at quorum or deadline."""
+    providers = get_providers(configurable)
+    max_results = configurable.search_max_results
+    if len(providers) == 1:
+        return await providers[0].asearch(query, max_results)
+
+    quorum = _quorum(configurable, len(providers))
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + configurable.search_deadline_seconds
+    tasks = {asyncio.ensure_future(p.asearch(query, max_results)): i for i, p in enumerate(providers)}
+    answered: dict[int, list[SearchResult]] = {}
+    errors: list[BaseException] = []
+    pending = set(tasks)
+    try:
+        while pending and len(answered) < quorum:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    errors.append(task.exception())
+                else:
+                    answered[tasks[task]] = task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+    return merge_results(_collect(answered, errors, query), max_results)
+
+
+def providers_label(configurable) -> str:
+    """Stable identifier of the provider selection, for cache keys."""
+    return ",".join(provider_names(configurable))
+
@@ -0,0 +1,78 @@
+"""Cheap lexical similarity helpers shared by the packing and dedup stages."""
+
+import random
+import re
+import zlib
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-case word tokens of a text, punctuation stripped."""
+    return _WORD_RE.findall(text.lower())
+
+
+def shingles(text: str, size: int = 3) -> set[str]:
+    """Return the set of ``size``-word shingles of a text.
+
+    Texts shorter than ``size`` words yield a single shingle of all their words,
+    so short strings still compare meaningfully.
+    """
+    words = tokenize(text)
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(left: set, right: set) -> float:
+    """Jaccard similarity of two sets (0.0 when both are empty)."""
+    if not left and not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+def char_shingles(text: str, size: int = 4) -> set[str]:
+    """Return the set of ``size``-character shingles of a whitespace-normalized text.
+
+    Better suited than word shingles to short strings such as search queries,
+    where rephrasing changes only a word or two.
+    """
+    text = " ".join(tokenize(text))
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i : i + size] for i in range(len(text) - size + 1)}
+
+
+# Mersenne prime modulus and fixed coefficients so signatures are stable
+# across processes (unlike the builtin, randomized ``hash``).
+_MINHASH_PRIME = (1 << 61) - 1
+_MINHASH_SEED = 0x5EED
+
+
+class MinHasher:
+    """MinHash signatures for estimating Jaccard similarity of shingle sets."""
+
+    def __init__(self, num_perm: int = 64):
+        """Use ``num_perm`` hash permutations per signature."""
+        rng = random.Random(_MINHASH_SEED)
+        self.num_perm = num_perm
+        self._params = [
+            (rng.randrange(1, _MINHASH_PRIME), rng.randrange(0, _MINHASH_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, items: set[str]) -> tuple[int, ...]:
+        """Return the MinHash signature of a set of shingles."""
+        if not items:
+            return (_MINHASH_PRIME,) * self.num_perm
+        hashes = [zlib.crc32(item.encode("utf-8")) for item in items]
+        return tuple(
+            min((a * h + b) % _MINHASH_PRIME for h in hashes) for a, b in self._params
+        )
+
+    @staticmethod
+    def similarity(left: tuple[int, ...], right: tuple[int, ...]) -> float:
+        """Estimate the Jaccard similarity of the sets behind two signatures."""
+        if not left:
+            return 0.0
+        return sum(1 for a, b in zip(left, right) if a == b) / len(left)
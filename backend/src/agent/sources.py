@@ -0,0 +1,142 @@
+"""Source registry: URL extraction, canonicalization and compact source entries.
+
+Every ``web_research`` branch reports the sources its summary came from, and
+``sources_gathered`` is checkpointed with the rest of the run state. To keep
+that list small and stable on long runs:
+
+* URLs are found with one precompiled pattern that stops at whitespace,
+  quotes and brackets, and drops trailing punctuation;
+* they are canonicalized (scheme/host case, default port, fragment, tracking
+  parameters, trailing slash), so the same page found twice is one source;
+  the canonical form is only the deduplication key, and the link shown to the
+  user is the URL as it was found;
+* each source gets a short id derived from a hash of its canonical URL, so
+  the id is the same in every branch, loop and process;
+* entries are built once per URL (bounded memo, interned strings) and merged
+  into state with ``merge_sources``, which drops sources already recorded in
+  the session.
+"""
+
+import functools
+import hashlib
+import re
+import sys
+from urllib.parse import urlsplit, urlunsplit
+
+_URL_RE = re.compile(r"https?://[^\s<>\"'`{}|\\^\[\]]+", re.IGNORECASE)
+_TRAILING_PUNCTUATION = ".,;:!?*"
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+_TRACKING_PARAMS = {"fbclid", "gclid", "msclkid", "mc_cid", "mc_eid", "ref_src"}
+
+
+def _trim(url: str) -> str:
+    # Sentence punctuation and an unmatched closing parenthesis belong to the
+    # surrounding text, not the URL ("(see https://a.org/x).").
+    while url:
+        if url[-1] in _TRAILING_PUNCTUATION:
+            url = url[:-1]
+        elif url[-1] == ")" and url.count(")") > url.count("("):
+            url = url[:-1]
+        else:
+            break
+    return url
+
+
+def _is_tracking(param: str) -> bool:
+    key = param.split("=", 1)[0].lower()
+    return key.startswith("utm_") or key in _TRACKING_PARAMS
+
+
+def canonical_url(url: str) -> str:
+    """Normalize a URL into a deduplication key.
+
+    Lower-cases scheme and host, drops default ports, fragments, tracking
+    query parameters (``utm_*``, ``fbclid``, ...) and a trailing slash. The
+    remaining query parameters are kept exactly as written.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port in (None, _DEFAULT_PORTS.get(scheme)) else f"{host}:{port}"
+    if parts.username:
+        netloc = f"{parts.username}@{netloc}"
+    query = "&".join(param for param in parts.query.split("&") if param and not _is_tracking(param))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def extract_urls(text: str, limit: int = 5) -> list[str]:
+    """Return up to ``limit`` distinct URLs from text, in order of appearance.
+
+    URLs are distinct by their canonical form; the first spelling is returned.
+    """
+    urls: dict[str, str] = {}
+    for match in _URL_RE.finditer(text):
+        url = _trim(match.group(0))
+        if not urlsplit(url).hostname:
+            continue
+        urls.setdefault(canonical_url(url), url)
+        if len(urls) >= limit:
+            break
+    return list(urls.values())
+
+
+def short_id(value: str) -> str:
+    """Stable short id of a source (10 hex digits of a BLAKE2 hash)."""
+    return "src-" + hashlib.blake2b(value.encode("utf-8"), digest_size=5).hexdigest()
+
+
+class Source:
+    """One gathered source; stored in run state as a plain dict."""
+
+    __slots__ = ("id", "label", "url")
+
+    def __init__(self, id: str, label: str, url: str):
+        """Intern the fields, which repeat across checkpoints and runs."""
+        self.id = sys.intern(id)
+        self.label = sys.intern(label)
+        self.url = sys.intern(url)
+
+    def as_state(self) -> dict[str, str]:
+        """Return the entry shape the frontend expects in ``sources_gathered``."""
+        return {"label": self.label, "short_url": self.id, "value": self.url}
+
+
+@functools.lru_cache(maxsize=16384)
+def get_source(url: str, label: str = "") -> Source:
+    """Return the registry entry for a URL (or a local document path).
+
+    Web URLs are identified by their canonical form, so every spelling of a
+    page gets the same id, but keep the URL as given as the citation link; they
+    are labelled with their host unless a label is given. Other values (corpus
+    file paths) are kept as they are.
+    """
+    key = url
+    if _URL_RE.match(url):
+        key = canonical_url(url)
+        label = label or (urlsplit(url).hostname or url)
+    return Source(short_id(key), label or url, url)
+
+
+def source_entries(urls: list[str], labels: list[str] | None = None) -> list[dict[str, str]]:
+    """State entries for the given URLs, one per distinct source."""
+    entries: dict[str, dict[str, str]] = {}
+    for i, url in enumerate(urls):
+        source = get_source(url, labels[i] if labels else "")
+        entries.setdefault(source.id, source.as_state())
+    return list(entries.values())
+
+
+def merge_sources(left: list | None, right: list | None) -> list:
+    """Reducer for ``sources_gathered``: append only sources not recorded yet."""
+    merged = list(left or [])
+    seen = {entry["short_url"] for entry in merged}
+    for entry in right or []:
+        if entry["short_url"] not in seen:
+            seen.add(entry["short_url"])
+            merged.append(entry)
+    return merged
@@ -1,34 +1,106 @@
 from __future__ import annotations
 
+import operator
 from dataclasses import dataclass, field
 from typing import TypedDict
 
 from langgraph.graph import add_messages
 from typing_extensions import Annotated
 
-
-import operator
-from dataclasses import dataclass, field
-from typing_extensions import Annotated
+from agent.sources import merge_sources
+
+
+def add_stats(left: dict | None, right: dict | None) -> dict:
+    """Merge two (possibly nested) dicts of counters by summing numeric leaves.
+
+    Used as the reducer for per-run performance counters so parallel branches
+    can each report their own numbers.
+    """
+    merged = dict(left or {})
+    for key, value in (right or {}).items():
+        current = merged.get(key)
+        if isinstance(value, dict):
+            merged[key] = add_stats(current if isinstance(current, dict) else {}, value)
+        elif isinstance(value, (int, float)) and isinstance(current, (int, float)):
+            merged[key] = current + value
+        else:
+            merged[key] = value
+    return merged
+
+
+# Fields that only describe the current run (spans, dedup and loop-gain
+# reports, tokens spent, per-run counters, the incremental reflection's
+# knowledge state), with the type of their empty value. ``start_run`` resets
+# them at the start of every run, so they neither carry over between turns
+# nor grow a long thread's checkpoints.
+RUN_SCOPED_FIELDS = {
+    "node_metrics": list,
+    "query_dedup": list,
+    "loop_gain": list,
+    "reflection_prompt_tokens": list,
+    "run_tokens": int,
+    "cache_stats": dict,
+    "scheduler_stats": dict,
+    "fetch_stats": dict,
+    "summarization_stats": dict,
+    "prefetch_stats": dict,
+    "knowledge_state": str,
+    "reflected_summary_count": int,
+}
 
 
 class OverallState(TypedDict):
     messages: Annotated[list, add_messages]
     search_query: Annotated[list, operator.add]
     web_research_result: Annotated[list, operator.add]
-    sources_gathered: Annotated[list, operator.add]
+    sources_gathered: Annotated[list, merge_sources]
+    source_hits: Annotated[int, operator.add]
     initial_search_query_count: int
     max_research_loops: int
     research_loop_count: int
     reasoning_model: str
+    cache_stats: Annotated[dict, add_stats]
+    knowledge_state: str
+    # Summaries of this run (counted from run_summary_offset) folded into
+    # knowledge_state.
+    reflected_summary_count: int
+    reflection_prompt_tokens: Annotated[list, operator.add]
+    answer_context: dict
+    answer_timing: dict
+    scheduler_stats: Annotated[dict, add_stats]
+    query_dedup: Annotated[list, operator.add]
+    node_metrics: Annotated[list, operator.add]
+    fetch_stats: Annotated[dict, add_stats]
+    summarization_stats: Annotated[dict, add_stats]
+    run_started_at: float
+    run_tokens: Annotated[int, operator.add]
+    assessed_source_count: int
+    assessed_source_hits: int
+    assessed_summary_count: int
+    loop_gain: Annotated[list, operator.add]
+    stop_reason: str
+    prefetch_stats: Annotated[dict, add_stats]
+    run_cache: dict
+    research_topic: str
+    history_summary: str
+    history_summary_count: int
+    run_summary_offset: int
+    run_query_offset: int
+    run_source_offset: int
+    # Environment generation the run resolves its configuration against.
+    config_generation: str
 
 
 class ReflectionState(TypedDict):
     is_sufficient: bool
     knowledge_gap: str
-    follow_up_queries: Annotated[list, operator.add]
+    # Only the latest loop's follow-ups: accumulating them re-dispatched every
+    # earlier loop's queries again.
+    follow_up_queries: list
     research_loop_count: int
     number_of_ran_queries: int
+    stop_reason: str
+    config_generation: str
 
 
 class Query(TypedDict):
@@ -38,11 +110,13 @@ class Query(TypedDict):
 
 class QueryGenerationState(TypedDict):
     query_list: list[Query]
+    config_generation: str
 
 
 class WebSearchState(TypedDict):
     search_query: str
     id: str
+    config_generation: str
 
 
 @dataclass(kw_only=True)
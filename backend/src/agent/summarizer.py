@@ -0,0 +1,214 @@
+"""Map-reduce summarization of large search payloads.
+
+A single summarization prompt over a big payload (many results, fetched page
+text) can overflow a small local context window and is slow, because the
+whole prompt is processed by one sequential call. Above a configurable size,
+``web_research`` instead:
+
+1. splits the payload into token-bounded chunks at paragraph, then sentence
+   boundaries,
+2. summarizes the chunks in parallel (each call still goes through the
+   per-model LLM limiter, so parallelism never exceeds it),
+3. merges the partial summaries, first in groups if they are still too
+   large for one prompt, then in a final reduce call.
+
+The LLM call itself is injected (``complete``/``acomplete``: prompt in, text
+out) so the caller keeps control of clients, limiter slots and streaming.
+"""
+
+import asyncio
+import contextvars
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from agent.utils import estimate_tokens
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def needs_map_reduce(text: str, threshold_tokens: int) -> bool:
+    """Whether a payload is large enough to summarize with map-reduce (``0`` disables it)."""
+    return threshold_tokens > 0 and estimate_tokens(text) > threshold_tokens
+
+
+def _pieces(text: str, max_tokens: int) -> list[str]:
+    """Break text into pieces no larger than ``max_tokens``, preferring natural boundaries."""
+    pieces = []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+        for sentence in _SENTENCE_RE.split(paragraph):
+            if estimate_tokens(sentence) <= max_tokens:
+                pieces.append(sentence)
+            else:
+                step = max_tokens * 4
+                pieces.extend(sentence[i : i + step] for i in range(0, len(sentence), step))
+    return pieces
+
+
+def _pack(pieces: list[str], max_tokens: int, separator: str) -> list[str]:
+    """Greedily join consecutive pieces into groups of at most ``max_tokens``."""
+    groups: list[str] = []
+    current: list[str] = []
+    used = 0
+    for piece in pieces:
+        tokens = estimate_tokens(piece)
+        if current and used + tokens > max_tokens:
+            groups.append(separator.join(current))
+            current, used = [], 0
+        current.append(piece)
+        used += tokens
+    if current:
+        groups.append(separator.join(current))
+    return groups
+
+
+def split_into_chunks(text: str, max_tokens: int) -> list[str]:
+    """Split a payload into chunks of at most ``max_tokens`` estimated tokens."""
+    return _pack(_pieces(text, max_tokens), max_tokens, "\n\n")
+
+
+@dataclass
+class MapReduceReport:
+    """What a map-reduce summarization did and what parallelism saved."""
+
+    chunks: int = 0
+    map_calls: int = 0
+    reduce_calls: int = 0
+    wall_seconds: float = 0.0
+    # Sum of the individual call durations, i.e. the time the same calls
+    # would have taken back to back.
+    sequential_seconds: float = 0.0
+
+    def stats(self) -> dict:
+        """Return the counters recorded in run state (summed across branches)."""
+        return {
+            "map_reduce_runs": 1,
+            "chunks": self.chunks,
+            "map_calls": self.map_calls,
+            "reduce_calls": self.reduce_calls,
+            "wall_seconds": self.wall_seconds,
+            "sequential_seconds": self.sequential_seconds,
+            "saved_seconds": max(0.0, self.sequential_seconds - self.wall_seconds),
+        }
+
+
+def _reduce_groups(partials: list[str], max_tokens: int) -> list[list[str]]:
+    # At least two partials per group, so every reduce round shrinks the list.
+    groups: list[list[str]] = []
+    current: list[str] = []
+    used = 0
+    for partial in partials:
+        tokens = estimate_tokens(partial)
+        if len(current) >= 2 and used + tokens > max_tokens:
+            groups.append(current)
+            current, used = [], 0
+        current.append(partial)
+        used += tokens
+    if len(current) == 1 and groups:
+        groups[-1].append(current[0])
+    elif current:
+        groups.append(current)
+    return groups
+
+
+def _needs_another_round(partials: list[str], max_tokens: int) -> bool:
+    return len(partials) > 2 and sum(estimate_tokens(p) for p in partials) > max_tokens
+
+
+def map_reduce_summarize(
+    text: str,
+    complete: Callable[[str], str],
+    map_prompt: Callable[[str, int, int], str],
+    reduce_prompt: Callable[[list[str]], str],
+    chunk_tokens: int,
+    max_workers: int,
+) -> tuple[str, MapReduceReport]:
+    """Summarize ``text`` with parallel map calls on threads and a final reduce.
+
+    Args:
+        complete: Runs one LLM call (prompt -> text); called from worker threads.
+        map_prompt: Builds the prompt for chunk ``part`` of ``parts`` (1-based).
+        reduce_prompt: Builds the prompt merging a list of partial summaries.
+        chunk_tokens: Maximum estimated tokens per chunk and per reduce input.
+        max_workers: Threads used for the parallel calls.
+    """
+    report = MapReduceReport()
+    report_lock = threading.Lock()
+    start = time.perf_counter()
+
+    def timed(prompt: str) -> str:
+        call_start = time.perf_counter()
+        try:
+            return complete(prompt)
+        finally:
+            with report_lock:
+                report.sequential_seconds += time.perf_counter() - call_start
+
+    def parallel(prompts: list[str]) -> list[str]:
+        # Each task runs in a copy of the caller's context, so instrumentation
+        # spans (context variables) see the calls made on worker threads.
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(prompts)))) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, timed, prompt) for prompt in prompts]
+            return [future.result() for future in futures]
+
+    chunks = split_into_chunks(text, chunk_tokens)
+    report.chunks = report.map_calls = len(chunks)
+    partials = parallel([map_prompt(chunk, i, len(chunks)) for i, chunk in enumerate(chunks, 1)])
+    while _needs_another_round(partials, chunk_tokens):
+        groups = _reduce_groups(partials, chunk_tokens)
+        report.reduce_calls += len(groups)
+        partials = parallel([reduce_prompt(group) for group in groups])
+    if len(partials) == 1:
+        summary = partials[0]
+    else:
+        report.reduce_calls += 1
+        summary = timed(reduce_prompt(partials))
+    report.wall_seconds = time.perf_counter() - start
+    return summary, report
+
+
+async def amap_reduce_summarize(
+    text: str,
+    acomplete: Callable[[str], Awaitable[str]],
+    map_prompt: Callable[[str, int, int], str],
+    reduce_prompt: Callable[[list[str]], str],
+    chunk_tokens: int,
+) -> tuple[str, MapReduceReport]:
+    """Async version of ``map_reduce_summarize``; the parallel calls are tasks."""
+    report = MapReduceReport()
+    start = time.perf_counter()
+
+    async def timed(prompt: str) -> str:
+        call_start = time.perf_counter()
+        try:
+            return await acomplete(prompt)
+        finally:
+            report.sequential_seconds += time.perf_counter() - call_start
+
+    async def parallel(prompts: list[str]) -> list[str]:
+        return list(await asyncio.gather(*(timed(prompt) for prompt in prompts)))
+
+    chunks = split_into_chunks(text, chunk_tokens)
+    report.chunks = report.map_calls = len(chunks)
+    partials = await parallel([map_prompt(chunk, i, len(chunks)) for i, chunk in enumerate(chunks, 1)])
+    while _needs_another_round(partials, chunk_tokens):
+        groups = _reduce_groups(partials, chunk_tokens)
+        report.reduce_calls += len(groups)
+        partials = await parallel([reduce_prompt(group) for group in groups])
+    if len(partials) == 1:
+        summary = partials[0]
+    else:
+        report.reduce_calls += 1
+        summary = await timed(reduce_prompt(partials))
+    report.wall_seconds = time.perf_counter() - start
+    return summary, report
@@ -1,4 +1,5 @@
 from typing import List
+
 from pydantic import BaseModel, Field
 
 
@@ -21,3 +22,11 @@ class Reflection(BaseModel):
     follow_up_queries: List[str] = Field(
         description="A list of follow-up queries to address the knowledge gap."
     )
+
+
+class IncrementalReflection(Reflection):
+    """Reflection that also carries the updated notes for incremental reflection."""
+
+    knowledge_state: str = Field(
+        description="Updated condensed notes of everything learned so far, including source URLs."
+    )
@@ -1,24 +1,35 @@
 # File: /backend/src/agent/utils.py
 
-from typing import Any, Dict, List
-from langchain_core.messages import AnyMessage, AIMessage, HumanMessage
+from typing import List
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+
+
+def format_conversation(messages: List[AnyMessage]) -> str:
+    """Render user and assistant messages as "User: ..." / "Assistant: ..." lines."""
+    lines = []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            lines.append(f"User: {message.content}\n")
+        elif isinstance(message, AIMessage):
+            lines.append(f"Assistant: {message.content}\n")
+    return "".join(lines)
 
 
 def get_research_topic(messages: List[AnyMessage]) -> str:
-    """
-    Get the research topic from the messages.
-    """
+    """Get the research topic from the messages."""
     # check if request has a history and combine the messages into a single string
     if len(messages) == 1:
-        research_topic = messages[-1].content
-    else:
-        research_topic = ""
-        for message in messages:
-            if isinstance(message, HumanMessage):
-                research_topic += f"User: {message.content}\n"
-            elif isinstance(message, AIMessage):
-                research_topic += f"Assistant: {message.content}\n"
-    return research_topic
+        return messages[-1].content
+    return format_conversation(messages)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheaply estimate the number of tokens in a prompt (~4 characters per token).
+
+    Good enough for comparing prompt sizes without loading a tokenizer.
+    """
+    return (len(text) + 3) // 4
 
 
 # --- Incompatible Utility Functions for Local LLM Setup ---
@@ -0,0 +1,106 @@
+import importlib
+import zlib
+
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from agent import cache as cache_module
+from agent import search_providers
+from agent.search_providers import SearchProvider, SearchResult
+
+# The package re-exports the compiled graph as ``agent.graph``, so fetch the
+# module itself.
+graph_module = importlib.import_module("agent.graph")
+
+CANNED = {
+    "query": ["sodium ion batteries", "solid state batteries"],
+    "rationale": "test",
+    "is_sufficient": True,
+    "knowledge_gap": "",
+    "knowledge_state": "Condensed notes.",
+}
+
+
+class CallLog(list):
+    """(method, schema or query) pairs recorded by the fakes.
+
+    ``sufficient`` is what every reflection answers; while it is False each
+    reflection asks one new follow-up question.
+    """
+
+    sufficient = True
+
+
+class FakeLLM:
+    """Stand-in for ChatOpenAI that records how the graph called it."""
+
+    def __init__(self, calls, schema=None):
+        self.calls = calls
+        self.schema = schema
+
+    def with_structured_output(self, schema):
+        return FakeLLM(self.calls, schema)
+
+    def _result(self, prompt):
+        if self.schema is not None:
+            fields = dict(
+                CANNED,
+                is_sufficient=self.calls.sufficient,
+                follow_up_queries=[] if self.calls.sufficient else [f"follow up question {len(self.calls)}"],
+            )
+            return self.schema(**{k: v for k, v in fields.items() if k in self.schema.model_fields})
+        return AIMessage(content=f"Summary of {len(prompt)} chars https://example.com/page")
+
+    def _record(self, method):
+        self.calls.append((method, self.schema.__name__ if self.schema else "text"))
+
+    def invoke(self, prompt, *args, **kwargs):
+        self._record("invoke")
+        return self._result(prompt)
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        self._record("ainvoke")
+        return self._result(prompt)
+
+    def stream(self, prompt, *args, **kwargs):
+        self._record("stream")
+        for word in self._result(prompt).content.split(" "):
+            yield AIMessageChunk(content=word + " ", id="fake")
+
+    async def astream(self, prompt, *args, **kwargs):
+        self._record("astream")
+        for word in self._result(prompt).content.split(" "):
+            yield AIMessageChunk(content=word + " ", id="fake")
+
+
+class FakeSearchProvider(SearchProvider):
+    name = "fake"
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    def _results(self, query):
+        return [SearchResult(f"Result for {query}", f"https://example.com/{zlib.crc32(query.encode())}", "", self.name)]
+
+    def search(self, query, max_results):
+        self.calls.append(("search", query))
+        return self._results(query)
+
+    async def asearch(self, query, max_results):
+        self.calls.append(("asearch", query))
+        return self._results(query)
+
+
+@pytest.fixture
+def offline_calls(monkeypatch):
+    """Route the graph's LLM and search calls to fakes and return the call log.
+
+    Every test starts with empty process-wide caches.
+    """
+    calls = CallLog()
+    monkeypatch.setattr(cache_module, "_caches", {})
+    monkeypatch.setattr(graph_module, "get_local_llm", lambda *args, **kwargs: FakeLLM(calls))
+    monkeypatch.setitem(search_providers._factories, "fake", lambda configurable: FakeSearchProvider(calls))
+    monkeypatch.setattr(search_providers, "_providers", {})
+    monkeypatch.setenv("SEARCH_PROVIDERS", "fake")
+    return calls
@@ -0,0 +1,197 @@
+import asyncio
+import importlib
+import json
+import os
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from agent.batch import (
+    BatchJob,
+    BatchJobs,
+    completed_ids,
+    parse_questions,
+    request_concurrency,
+    request_configurable,
+    resolve_batch_path,
+    run_batch_file,
+)
+
+graph_module = importlib.import_module("agent.graph")
+
+
+class FakeGraph:
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.asked = []
+
+    async def ainvoke(self, inputs, config):
+        question = inputs["messages"][0].content
+        self.asked.append(question)
+        await asyncio.sleep(0)
+        if question in self.fail:
+            raise RuntimeError("boom")
+        return {"messages": [AIMessage(content=f"answer to {question}")], "sources_gathered": [], "research_loop_count": 1}
+
+
+def write_lines(path, lines):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("".join(line + "\n" for line in lines))
+
+
+def test_parse_questions_defaults_ids_to_line_numbers_and_skips_blank_lines():
+    questions = parse_questions(['{"question": "a"}', "", '{"id": "x", "question": "b", "max_research_loops": 2}'])
+    assert [(q.id, q.question, q.max_research_loops) for q in questions] == [("1", "a", None), ("x", "b", 2)]
+
+
+@pytest.mark.parametrize("lines", [['{"id": 1}'], ['{"question": "  "}'], ['{"id": 1, "question": "a"}', '{"id": 1, "question": "b"}']])
+def test_parse_questions_rejects_invalid_lines(lines):
+    with pytest.raises(ValueError):
+        parse_questions(lines)
+
+
+def test_completed_ids_ignores_failures_and_truncated_lines(tmp_path):
+    output = tmp_path / "out.jsonl"
+    write_lines(output, ['{"id": "1", "error": null}', '{"id": "2", "error": "RuntimeError: boom"}', '{"id": "3", "err'])
+    assert completed_ids(str(output)) == {"1"}
+    assert completed_ids(str(tmp_path / "missing.jsonl")) == set()
+
+
+def test_resolve_batch_path_stays_inside_the_batch_dir(tmp_path):
+    root = tmp_path / "batch"
+    root.mkdir()
+    assert resolve_batch_path(str(root), "sub/in.jsonl") == str(root / "sub" / "in.jsonl")
+    for name in ("../secret", "/etc/passwd", ".", "sub/../../x"):
+        with pytest.raises(ValueError):
+            resolve_batch_path(str(root), name)
+    os.symlink(tmp_path, root / "link")
+    with pytest.raises(ValueError):
+        resolve_batch_path(str(root), "link/secret")
+
+
+def test_request_configurable_only_allows_per_run_fields():
+    assert request_configurable(None) == {}
+    assert request_configurable({"max_research_loops": 1, "answer_model": "m"}) == {"max_research_loops": 1, "answer_model": "m"}
+    for configurable in ({"fetch_allow_private_hosts": True}, {"openai_api_base": "http://evil"}, {"run_cache_path": "/tmp/x"}, ["max_research_loops"]):
+        with pytest.raises(ValueError):
+            request_configurable(configurable)
+
+
+def test_request_concurrency_is_validated_and_clamped():
+    assert request_concurrency(None, 16) == 4
+    assert request_concurrency(8, 16) == 8
+    assert request_concurrency(10**6, 16) == 16
+    for value in (0, -1, "4", "junk", 2.5, True):
+        with pytest.raises(ValueError):
+            request_concurrency(value, 16)
+
+
+def test_batch_jobs_evict_finished_jobs_by_ttl_and_cap():
+    jobs = BatchJobs(ttl_seconds=10, max_finished=2)
+    running = jobs.add(BatchJob("in", "out"))
+    finished = []
+    for _ in range(3):
+        job = BatchJob("in", "out")
+        job.finish()
+        finished.append(jobs.add(job))
+    jobs.prune()
+    assert jobs.get(running) is not None
+    assert jobs.get(finished[0]) is None  # beyond the cap
+    assert jobs.get(finished[2]) is not None
+    jobs.prune(now=jobs.get(finished[2]).finished_at + 11)
+    assert len(jobs) == 1 and jobs.get(running) is not None
+
+
+def test_run_batch_file_streams_results_and_resumes(tmp_path, monkeypatch):
+    fake = FakeGraph(fail={"q2"})
+    monkeypatch.setattr(graph_module, "graph", fake)
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_lines(source, [json.dumps({"question": f"q{i}"}) for i in range(1, 5)])
+
+    report = asyncio.run(run_batch_file(str(source), str(output), concurrency=2))
+    assert (report.succeeded, report.failed, report.skipped) == (3, 1, 0)
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert {r["id"] for r in records} == {"1", "2", "3", "4"}
+    assert next(r for r in records if r["id"] == "1")["answer"] == "answer to q1"
+
+    fake.fail.clear()
+    fake.asked.clear()
+    report = asyncio.run(run_batch_file(str(source), str(output), concurrency=2))
+    assert fake.asked == ["q2"]  # only the failed question is retried
+    assert (report.succeeded, report.skipped) == (1, 3)
+    assert completed_ids(str(output)) == {"1", "2", "3", "4"}
+    stats = report.as_dict()
+    assert stats["pending"] == 0 and stats["latency_max"] >= stats["latency_p50"]
+
+
+def test_run_batch_file_without_resume_overwrites(tmp_path, monkeypatch):
+    monkeypatch.setattr(graph_module, "graph", FakeGraph())
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_lines(source, ['{"question": "q1"}'])
+    write_lines(output, ['{"id": "old", "error": null}'])
+    asyncio.run(run_batch_file(str(source), str(output), resume=False))
+    assert completed_ids(str(output)) == {"1"}
+
+
+def test_batch_jobs_endpoint_rejects_paths_outside_the_batch_dir(tmp_path, monkeypatch):
+    import httpx
+
+    from agent import configuration
+    from agent.app import app
+
+    monkeypatch.setenv("BATCH_DIR", str(tmp_path))
+    configuration.reload_configuration()
+    monkeypatch.setattr(graph_module, "graph", FakeGraph())
+    write_lines(tmp_path / "in.jsonl", ['{"question": "q1"}'])
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for body in ({"input_path": "/etc/passwd", "output_path": "out.jsonl"}, {"input_path": "in.jsonl", "output_path": "../out.jsonl"}):
+                assert (await client.post("/batch/jobs", json=body)).status_code == 400
+            response = await client.post("/batch/jobs", json={"input_path": "in.jsonl", "output_path": "out.jsonl"})
+            job_id = response.json()["job_id"]
+            while (status := (await client.get(f"/batch/jobs/{job_id}")).json())["status"] == "running":
+                await asyncio.sleep(0.01)
+            return status
+
+    try:
+        status = asyncio.run(scenario())
+    finally:
+        monkeypatch.delenv("BATCH_DIR")
+        configuration.reload_configuration()
+    assert status["status"] == "done" and status["output_path"] == "out.jsonl"
+    assert completed_ids(str(tmp_path / "out.jsonl")) == {"1"}
+
+
+def test_batch_endpoints_reject_server_settings_and_bad_concurrency(tmp_path, monkeypatch):
+    import httpx
+
+    from agent import configuration
+    from agent.app import app
+
+    monkeypatch.setenv("BATCH_DIR", str(tmp_path))
+    configuration.reload_configuration()
+    monkeypatch.setattr(graph_module, "graph", FakeGraph())
+    write_lines(tmp_path / "in.jsonl", ['{"question": "q1"}'])
+    job = {"input_path": "in.jsonl", "output_path": "out.jsonl"}
+    questions = {"questions": [{"question": "q1"}]}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            statuses = []
+            for path, body in (("/batch", questions), ("/batch/jobs", job)):
+                for extra in ({"configurable": {"local_corpus_path": "/"}}, {"concurrency": "junk"}, {"concurrency": 0}):
+                    statuses.append((await client.post(path, json={**body, **extra})).status_code)
+            response = await client.post("/batch", json={**questions, "concurrency": 10**9, "configurable": {"max_research_loops": 1}})
+            return statuses, response.status_code, [json.loads(line) for line in response.text.splitlines()]
+
+    try:
+        statuses, status, lines = asyncio.run(scenario())
+    finally:
+        monkeypatch.delenv("BATCH_DIR")
+        configuration.reload_configuration()
+    assert statuses == [400] * 6
+    assert status == 200 and lines[0]["answer"] == "answer to q1" and "report" in lines[-1]
+    assert not (tmp_path / "out.jsonl").exists()
@@ -0,0 +1,59 @@
+import time
+from concurrent.futures import wait
+
+from agent.batching import MicroBatcher, get_batcher
+from agent.configuration import Configuration
+from agent.scheduler import FairLimiter, llm_limiter
+
+
+class EchoBatcher(MicroBatcher):
+    def __init__(self, limiter, **kwargs):
+        super().__init__("http://stub/v1", "model", None, window_seconds=0.05, max_size=8, max_tokens=16, limiter=limiter, **kwargs)
+        self.requests = []
+
+    def _request(self, prompts):
+        self.requests.append(list(prompts))
+        return [prompt.upper() for prompt in prompts]
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+def test_concurrent_prompts_share_one_batch_and_one_limiter_slot():
+    limiter = FairLimiter("test", 1)
+    batcher = EchoBatcher(limiter)
+    futures = [batcher.submit(prompt) for prompt in ("a", "b", "c")]
+    wait(futures, timeout=2)
+    assert [future.result().text for future in futures] == ["A", "B", "C"]
+    assert batcher.requests == [["a", "b", "c"]]
+    assert {future.result().batch_size for future in futures} == {3}
+    assert limiter.acquired == 1 and limiter._active == 0
+
+
+def test_idle_batcher_stops_its_threads_and_restarts_on_demand():
+    batcher = EchoBatcher(FairLimiter("test", 1), idle_seconds=0.05)
+    assert not batcher.running
+    assert batcher.submit("x").result(timeout=2).text == "X"
+    wait_until(lambda: not batcher.running)
+    assert batcher.submit("y").result(timeout=2).text == "Y"
+    assert batcher.batches == 2
+
+
+def test_batcher_uses_the_role_pool_limiter():
+    configurable = Configuration.from_runnable_config(
+        {
+            "configurable": {
+                "llm_endpoints": "http://a.invalid/v1,http://b.invalid/v1",
+                "llm_health_check_interval_seconds": 0,
+                "max_concurrent_llm_calls_per_model": 3,
+            }
+        }
+    )
+    batcher = get_batcher(configurable, "search_llm_model")
+    assert batcher.limiter is llm_limiter(configurable, "search_llm_model")
+    assert batcher.limiter.limit == 6  # per-model limit times the pool's endpoints
+    assert not batcher.running  # no thread until the first prompt
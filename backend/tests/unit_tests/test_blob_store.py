@@ -0,0 +1,52 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from agent.blob_store import BlobStore, MissingBlobError, is_ref, load_texts, store_text
+
+
+def settings(path, min_chars=10):
+    return SimpleNamespace(blob_store_path=str(path), blob_min_chars=min_chars)
+
+
+def test_store_text_keeps_short_text_inline_and_stores_large_text_once(tmp_path):
+    configurable = settings(tmp_path / "blobs")
+    assert store_text("short", configurable) == "short"
+    ref = store_text("x" * 100, configurable)
+    assert is_ref(ref) and store_text("x" * 100, configurable) == ref
+    assert load_texts(["short", ref], configurable) == ["short", "x" * 100]
+
+
+def test_store_text_is_inline_when_the_store_is_disabled():
+    assert store_text("x" * 100, settings("")) == "x" * 100
+
+
+def test_missing_blob_raises_instead_of_returning_empty_research(tmp_path):
+    ref = BlobStore(str(tmp_path / "writer")).put("summary " * 20)
+    with pytest.raises(MissingBlobError):
+        load_texts([ref], settings(tmp_path / "other-replica"))
+    with pytest.raises(MissingBlobError):
+        load_texts([ref], settings(""))
+
+
+def test_collect_deletes_only_blobs_untouched_past_the_cutoff(tmp_path):
+    store = BlobStore(str(tmp_path))
+    old, fresh = store.put("old blob"), store.put("fresh blob")
+    old_path = store._path(old[len("blob:"):])
+    os.utime(old_path, (0, 0))
+    assert store.collect(max_age_seconds=3600) == 1
+    assert not os.path.exists(old_path)
+    assert store.get(fresh) == "fresh blob"
+    with pytest.raises(FileNotFoundError):
+        store.get(old)
+
+
+def test_reading_a_blob_refreshes_its_age(tmp_path):
+    store = BlobStore(str(tmp_path))
+    ref = store.put("kept alive")
+    path = store._path(ref[len("blob:"):])
+    os.utime(path, (0, 0))
+    BlobStore(str(tmp_path)).get(ref)  # a fresh process reads it from disk
+    assert store.collect(max_age_seconds=3600) == 0
+
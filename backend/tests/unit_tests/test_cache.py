@@ -0,0 +1,107 @@
+import pytest
+
+from agent import cache as cache_module
+from agent.cache import (
+    MemoryCache,
+    SQLiteCache,
+    content_key,
+    format_cache_stats,
+    get_cache,
+    normalize_query,
+)
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_cache(request, tmp_path):
+    def make(max_entries=3, ttl_seconds=60.0):
+        if request.param == "memory":
+            return MemoryCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        return SQLiteCache(str(tmp_path / "cache.sqlite3"), "t", max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    return make
+
+
+def test_normalize_query_folds_trivial_differences_but_keeps_word_order():
+    assert normalize_query('  "Solid-State  Batteries?" ') == "solid-state batteries"
+    assert normalize_query("ＡＢＣ\tdef") == "abc def"
+    assert normalize_query("a b") != normalize_query("b a")
+
+
+def test_content_key_separates_parts():
+    assert content_key("ab", "c") != content_key("a", "bc")
+    assert content_key("x") == content_key("x")
+
+
+def test_values_round_trip_and_stats_count_lookups(make_cache, clock):
+    cache = make_cache()
+    assert cache.get("k") is None
+    cache.set("k", {"results": [1, 2]})
+    assert cache.get("k") == {"results": [1, 2]}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert format_cache_stats(stats).startswith("1 hits / 1 misses (50% hit rate)")
+
+
+def test_entries_expire_after_ttl(make_cache, clock):
+    cache = make_cache(ttl_seconds=60.0)
+    cache.set("k", "v")
+    clock.now += 59
+    assert cache.get("k") == "v"
+    clock.now += 2
+    assert cache.get("k") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_zero_ttl_never_expires(make_cache, clock):
+    cache = make_cache(ttl_seconds=0)
+    cache.set("k", "v")
+    clock.now += 10**9
+    assert cache.get("k") == "v"
+
+
+def test_least_recently_used_entry_is_evicted(make_cache, clock):
+    cache = make_cache(max_entries=3)
+    for key in "abc":
+        clock.now += 1
+        cache.set(key, key)
+    clock.now += 1
+    assert cache.get("a") == "a"  # "b" is now the oldest
+    clock.now += 1
+    assert cache.set("d", "d") == 1
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == ["a", "c", "d"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_sqlite_cache_survives_reopening(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    SQLiteCache(path, "t").set("k", [1])
+    assert SQLiteCache(path, "t").get("k") == [1]
+    with pytest.raises(ValueError):
+        SQLiteCache(path, "bad-name; DROP TABLE t")
+
+
+def test_get_cache_shares_one_instance_per_settings(tmp_path):
+    assert get_cache("ns", "none", 10, 60) is None
+    memory = get_cache("test_ns", "memory", 10, 60)
+    assert get_cache("test_ns", "memory", 10, 60) is memory
+    assert get_cache("test_ns", "memory", 20, 60) is not memory
+    with pytest.raises(ValueError):
+        get_cache("test_ns", "sqlite", 10, 60)
+    with pytest.raises(ValueError):
+        get_cache("test_ns", "redis", 10, 60)
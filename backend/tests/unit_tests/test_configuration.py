@@ -0,0 +1,44 @@
+import pytest
+
+from agent.configuration import (
+    Configuration,
+    configuration_generation,
+    reload_configuration,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_configuration():
+    reload_configuration()
+    yield
+    reload_configuration()
+
+
+def test_same_configurable_values_share_one_frozen_instance():
+    first = Configuration.from_runnable_config({"configurable": {"max_research_loops": 3, "thread_id": "a"}})
+    second = Configuration.from_runnable_config({"configurable": {"max_research_loops": 3, "thread_id": "b"}})
+    assert first is second and first.max_research_loops == 3
+    assert Configuration.from_runnable_config({"configurable": {"max_research_loops": 4}}) is not first
+    with pytest.raises(Exception):
+        first.max_research_loops = 5
+
+
+def test_environment_wins_and_is_read_once_until_reload(monkeypatch):
+    monkeypatch.setenv("MAX_RESEARCH_LOOPS", "7")
+    config = {"configurable": {"max_research_loops": 3}}
+    assert Configuration.from_runnable_config(config).max_research_loops == 7
+    monkeypatch.setenv("MAX_RESEARCH_LOOPS", "9")
+    assert Configuration.from_runnable_config(config).max_research_loops == 7
+    reload_configuration()
+    assert Configuration.from_runnable_config(config).max_research_loops == 9
+
+
+
+def test_a_pinned_generation_keeps_its_environment_across_reloads(monkeypatch):
+    monkeypatch.setenv("MAX_RESEARCH_LOOPS", "7")
+    generation = configuration_generation()
+    monkeypatch.setenv("MAX_RESEARCH_LOOPS", "9")
+    reload_configuration()
+    assert Configuration.from_runnable_config(None, generation).max_research_loops == 7
+    assert Configuration.from_runnable_config().max_research_loops == 9
+    assert configuration_generation() != generation
@@ -0,0 +1,24 @@
+from agent.context_packing import pack_summaries
+from agent.utils import estimate_tokens
+
+RELEVANT = "Sodium ion batteries reached 160 Wh/kg in 2024 according to CATL. " * 3
+OTHER = "The weather in Lisbon was mild and sunny for most of the spring season. " * 3
+
+
+def test_near_duplicates_are_dropped_without_a_budget():
+    packed = pack_summaries([RELEVANT, RELEVANT + " Also noted.", OTHER], "sodium ion batteries", 0)
+    assert packed.summaries == [RELEVANT, OTHER]
+    assert packed.dropped_passages == {"duplicate": 1}
+
+
+def test_budget_keeps_the_most_relevant_passages_first():
+    budget = estimate_tokens(RELEVANT) + 5
+    packed = pack_summaries([OTHER, RELEVANT], "sodium ion batteries", budget)
+    assert packed.summaries[0] == RELEVANT
+    assert packed.tokens <= budget
+    assert sum(packed.dropped_passages.values()) == 1
+
+
+def test_dedup_can_be_disabled():
+    packed = pack_summaries([RELEVANT, RELEVANT], "sodium", 0, dedup_threshold=1.0)
+    assert packed.summaries == [RELEVANT, RELEVANT]
@@ -0,0 +1,113 @@
+import httpx
+import pytest
+
+from agent import endpoints
+from agent.configuration import Configuration, reload_configuration
+from agent.endpoints import (
+    EndpointRegistry,
+    TrackedTransport,
+    get_endpoint_registry,
+    role_endpoints,
+)
+from agent.graph import get_local_llm
+
+A, B = "http://a.test/v1", "http://b.test/v1"
+
+
+def configurable(**overrides):
+    values = {"llm_endpoints": f"{A},{B}", "llm_health_check_interval_seconds": 0}
+    return Configuration(**{**values, **overrides})
+
+
+def test_role_endpoints_fall_back_from_role_to_shared_to_default():
+    config = Configuration(openai_api_base="http://default/v1", llm_endpoints=f" {A}/, {B} ,{A}", answer_endpoints=B)
+    assert role_endpoints(config, "answer_model") == (B,)
+    assert role_endpoints(config, "reflection_model") == (A, B)
+    assert role_endpoints(Configuration(openai_api_base="http://default/v1"), "reflection_model") == (
+        "http://default/v1",
+    )
+
+
+def test_least_outstanding_routes_around_busy_endpoint():
+    registry = EndpointRegistry(check_interval=0)
+    assert registry.route(configurable(), "answer_model")[0] == A
+    registry.begin(A)
+    assert registry.route(configurable(), "answer_model") == (B, A)
+    registry.done(A)
+    registry.begin(B)
+    assert registry.route(configurable(), "answer_model") == (A, B)
+
+
+def test_ewma_latency_prefers_the_faster_endpoint():
+    registry = EndpointRegistry(check_interval=0)
+    registry.respond(A, registry.begin(A) - 2.0, 200)
+    registry.respond(B, registry.begin(B) - 0.5, 200)
+    registry.done(A)
+    registry.done(B)
+    assert registry.route(configurable(llm_routing="ewma_latency"), "answer_model") == (B, A)
+
+
+def test_failing_endpoint_is_routed_last_until_it_recovers():
+    registry = EndpointRegistry(failure_threshold=2, cooldown_seconds=3600, check_interval=0)
+    config = configurable()
+    registry.respond(A, registry.begin(A), 503)
+    registry.done(A)
+    assert registry.stats()[A]["healthy"] == 1  # one failure is not enough
+    registry.error(A, httpx.ConnectError("refused"))
+    assert registry.stats()[A]["healthy"] == 0
+    registry.begin(B)  # busier, but healthy
+    assert registry.route(config, "answer_model") == (B, A)
+
+    registry.respond(A, registry.begin(A), 200)
+    registry.done(A)
+    assert registry.route(config, "answer_model") == (A, B)
+
+
+def test_unhealthy_endpoint_gets_a_new_try_after_cooldown():
+    registry = EndpointRegistry(failure_threshold=1, cooldown_seconds=0, check_interval=0)
+    config = configurable()
+    registry.error(A, httpx.ConnectError("refused"))
+    registry.begin(B)
+    assert registry.route(config, "answer_model")[0] == A
+
+
+def test_unknown_routing_policy_is_rejected():
+    with pytest.raises(ValueError):
+        EndpointRegistry(check_interval=0).route(configurable(llm_routing="random"), "answer_model")
+
+
+def test_health_settings_come_from_the_server_configuration_not_the_run(monkeypatch):
+    monkeypatch.setenv("LLM_ENDPOINT_FAILURE_THRESHOLD", "5")
+    monkeypatch.setenv("LLM_HEALTH_CHECK_INTERVAL_SECONDS", "0")
+    monkeypatch.setattr(endpoints, "_registry", None)
+    reload_configuration()
+    try:
+        registry = get_endpoint_registry()
+        registry.route(configurable(llm_endpoint_failure_threshold=1, llm_endpoint_cooldown_seconds=0), "answer_model")
+        assert (registry.failure_threshold, registry.cooldown_seconds) == (5, 30.0)
+    finally:
+        reload_configuration()
+
+
+class Body(httpx.SyncByteStream):
+    # Unlike ``content=``, a custom stream is not read up front, as with a real server.
+    def __iter__(self):
+        yield b"ok"
+
+
+def test_tracked_transport_counts_requests_until_the_body_is_closed():
+    api_base = "http://tracked.test/v1"
+    transport = TrackedTransport(httpx.MockTransport(lambda request: httpx.Response(200, stream=Body())), api_base)
+    with httpx.Client(transport=transport) as client:
+        with client.stream("GET", f"{api_base}/models") as response:
+            assert get_endpoint_registry().stats()[api_base]["outstanding"] == 1
+            response.read()
+    stats = get_endpoint_registry().stats()[api_base]
+    assert (stats["outstanding"], stats["requests"], stats["failures"]) == (0, 1, 0)
+
+
+def test_llm_client_fails_over_in_routing_order():
+    llm = get_local_llm(configurable(query_generator_endpoints=f"{A},{B}"), "query_generator_model")
+    bases = [str(llm.runnable.openai_api_base)] + [str(f.openai_api_base) for f in llm.fallbacks]
+    assert sorted(bases) == [A, B]
+    assert all(client.max_retries == 0 for client in [llm.runnable, *llm.fallbacks])
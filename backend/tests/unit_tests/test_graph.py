@@ -0,0 +1,143 @@
+import asyncio
+import importlib
+from concurrent.futures import Future
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+from agent.configuration import reload_configuration
+
+graph_module = importlib.import_module("agent.graph")
+
+QUESTION = {"messages": [HumanMessage(content="How far have sodium ion batteries come?")]}
+
+
+def test_ainvoke_awaits_every_llm_and_search_call(offline_calls):
+    state = asyncio.run(graph_module.graph.ainvoke(dict(QUESTION)))
+    methods = {method for method, _ in offline_calls}
+    assert methods <= {"ainvoke", "astream", "asearch"}
+    assert "asearch" in methods
+    assert state["messages"][-1].content
+
+
+def test_invoke_and_ainvoke_give_the_same_answer(offline_calls):
+    sync_state = graph_module.graph.invoke(dict(QUESTION))
+    async_state = asyncio.run(graph_module.graph.ainvoke(dict(QUESTION)))
+    assert sync_state["messages"][-1].content == async_state["messages"][-1].content
+    assert sync_state["search_query"] == async_state["search_query"]
+
+
+def test_repeated_searches_are_served_from_the_cache(offline_calls):
+    graph_module.graph.invoke(dict(QUESTION))
+    assert sum(1 for method, _ in offline_calls if method == "search") == 2
+    offline_calls.clear()
+    state = graph_module.graph.invoke(dict(QUESTION))
+    assert not any(method == "search" for method, _ in offline_calls)
+    assert state["cache_stats"]["search"]["hits"] == 2
+
+
+def test_identical_search_payloads_reuse_the_stored_summary(offline_calls):
+    config = {"configurable": {"search_cache_backend": "none"}}
+    graph_module.graph.invoke(dict(QUESTION), config)
+    offline_calls.clear()
+    state = graph_module.graph.invoke(dict(QUESTION), config)
+    assert sum(1 for method, _ in offline_calls if method == "search") == 2
+    assert ("invoke", "text") not in offline_calls[:-1]  # only the final answer calls the LLM
+    assert state["cache_stats"]["summary"]["hits"] == 2
+
+
+def test_incremental_reflection_keeps_the_prompt_flat_across_loops(offline_calls):
+    offline_calls.sufficient = False
+    configurable = {"max_research_loops": 3}
+    full = graph_module.graph.invoke(dict(QUESTION), {"configurable": configurable})
+    incremental = graph_module.graph.invoke(
+        dict(QUESTION), {"configurable": dict(configurable, incremental_reflection=True)}
+    )
+    assert len(full["reflection_prompt_tokens"]) == len(incremental["reflection_prompt_tokens"]) == 3
+    full_growth = full["reflection_prompt_tokens"][-1] - full["reflection_prompt_tokens"][0]
+    incremental_growth = incremental["reflection_prompt_tokens"][-1] - incremental["reflection_prompt_tokens"][0]
+    assert incremental_growth < full_growth
+    assert incremental["knowledge_state"] == "Condensed notes."
+    assert incremental["reflected_summary_count"] == len(incremental["web_research_result"])
+
+
+def test_answer_is_streamed_and_keeps_the_streamed_message_id(offline_calls):
+    state = graph_module.graph.invoke(dict(QUESTION))
+    assert offline_calls[-1] == ("stream", "text")
+    assert state["answer_timing"]["chunks"] > 1
+    assert state["messages"][-1].id == "fake"
+
+
+def test_answer_streaming_can_be_disabled(offline_calls):
+    state = graph_module.graph.invoke(dict(QUESTION), {"configurable": {"stream_answer": False}})
+    assert offline_calls[-1] == ("invoke", "text")
+    assert state["answer_timing"]["chunks"] == 1
+
+
+def test_every_node_reports_a_span_unless_instrumentation_is_off(offline_calls):
+    state = graph_module.graph.invoke(dict(QUESTION))
+    nodes = [record["node"] for record in state["node_metrics"]]
+    assert sorted(set(nodes)) == ["finalize_answer", "generate_query", "reflection", "web_research"]
+    assert sum(record["llm_calls"] for record in state["node_metrics"]) == 5
+    state = graph_module.graph.invoke(dict(QUESTION), {"configurable": {"enable_instrumentation": False}})
+    assert not state.get("node_metrics")
+
+
+class FailingBatcher:
+    supported = None
+
+    def submit(self, prompt):
+        future = Future()
+        future.set_exception(RuntimeError("/completions answered 500"))
+        return future
+
+
+def test_failed_batched_summaries_fall_back_to_per_prompt_calls(offline_calls, monkeypatch):
+    monkeypatch.setattr(graph_module, "get_batcher", lambda *args: FailingBatcher())
+    config = {"configurable": {"llm_batching": True, "summary_cache_backend": "none"}}
+    for state in (
+        graph_module.graph.invoke(dict(QUESTION), config),
+        asyncio.run(graph_module.graph.ainvoke(dict(QUESTION), config)),
+    ):
+        assert state["summarization_stats"]["batch_errors"] == 2
+        assert all(summary.startswith("Summary of") for summary in state["web_research_result"])
+
+
+def test_incremental_reflection_starts_each_turn_of_a_thread_afresh(offline_calls, monkeypatch):
+    prompts = []
+    reflection_prompt = graph_module._reflection_prompt
+
+    def recording_prompt(state, configurable):
+        prompts.append(reflection_prompt(state, configurable)[0])
+        return reflection_prompt(state, configurable)
+
+    monkeypatch.setattr(graph_module, "_reflection_prompt", recording_prompt)
+    graph = graph_module.builder.compile(checkpointer=InMemorySaver())
+    config = {"configurable": {"thread_id": "two-turns", "incremental_reflection": True, "max_research_loops": 1}}
+    first = graph.invoke({"messages": [HumanMessage(content="How far have sodium ion batteries come?")]}, config)
+    second = graph.invoke({"messages": [HumanMessage(content="And solid state batteries?")]}, config)
+    assert first["knowledge_state"] == "Condensed notes."
+    assert "(nothing yet)" in prompts[0] and "(nothing yet)" in prompts[1]
+    assert second["run_summary_offset"] == len(first["web_research_result"]) == 2
+    # Counted from this run's first summary, not the thread's.
+    assert second["reflected_summary_count"] == len(second["web_research_result"]) - 2 > 0
+
+
+def test_configuration_reload_mid_run_only_affects_new_runs(offline_calls, monkeypatch):
+    offline_calls.sufficient = False
+    monkeypatch.setenv("MAX_RESEARCH_LOOPS", "1")
+    reload_configuration()
+    generate_query_prompt = graph_module._generate_query_prompt
+
+    def reload_mid_run(state, configurable):
+        monkeypatch.setenv("MAX_RESEARCH_LOOPS", "3")
+        reload_configuration()
+        return generate_query_prompt(state, configurable)
+
+    try:
+        monkeypatch.setattr(graph_module, "_generate_query_prompt", reload_mid_run)
+        assert graph_module.graph.invoke(dict(QUESTION))["research_loop_count"] == 1
+        monkeypatch.setattr(graph_module, "_generate_query_prompt", generate_query_prompt)
+        assert graph_module.graph.invoke(dict(QUESTION))["research_loop_count"] == 3
+    finally:
+        reload_configuration()
@@ -0,0 +1,39 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agent.history import FoldPlan, compacted_topic, plan_fold
+
+
+def chat(turns):
+    messages = []
+    for i in range(turns):
+        messages += [HumanMessage(content=f"question {i}"), AIMessage(content=f"answer {i}")]
+    return messages
+
+
+def test_plan_fold_waits_for_twice_the_window_and_leaves_the_window():
+    assert plan_fold(100, 0, 0) is None
+    assert plan_fold(8, 0, 4) is None
+    assert plan_fold(9, 0, 4) == FoldPlan(0, 5)
+    assert plan_fold(12, 5, 4) is None
+    assert plan_fold(14, 5, 4) == FoldPlan(5, 10)
+
+
+def test_folds_are_rare_and_the_verbatim_part_stays_bounded():
+    window, folded, folds = 4, 0, 0
+    for count in range(1, 201):
+        plan = plan_fold(count, folded, window)
+        if plan:
+            assert plan.start == folded and count - plan.end == window
+            folded, folds = plan.end, folds + 1
+        assert count - folded <= 2 * window
+    assert folds <= 200 // (window // 2)
+
+
+def test_compacted_topic_uses_the_summary_and_the_recent_messages():
+    messages = chat(3)
+    assert compacted_topic(messages[:1], "", 0) == "question 0"
+    assert compacted_topic(messages, "", 0).startswith("User: question 0\n")
+    topic = compacted_topic(messages, "They asked about 0 and 1.", 4)
+    assert topic.startswith("Summary of the earlier conversation:\nThey asked about 0 and 1.")
+    assert "question 1" not in topic
+    assert topic.endswith("Recent conversation:\nUser: question 2\nAssistant: answer 2\n")
@@ -0,0 +1,49 @@
+from langchain_core.messages import AIMessage
+
+from agent.instrumentation import (
+    add_phase_time,
+    node_span,
+    phase,
+    record_cache,
+    record_llm_usage,
+    registry,
+)
+
+
+def test_span_collects_phases_tokens_and_cache_lookups():
+    with node_span("test_span_node") as span:
+        with phase("llm"):
+            record_llm_usage("x" * 40, AIMessage(content="y" * 8))
+        add_phase_time("queue", 0.5)
+        record_cache(True)
+        record_cache(False)
+    record = span.as_dict()
+    assert record["node"] == "test_span_node"
+    assert (record["llm_calls"], record["prompt_tokens"], record["completion_tokens"]) == (1, 10, 2)
+    assert record["phases"]["queue"] == 0.5 and "llm" in record["phases"]
+    assert (record["cache_hits"], record["cache_misses"], record["retries"]) == (1, 1, 0)
+    assert span.state_update() == {"run_tokens": 12, "node_metrics": [record]}
+
+
+def test_provider_usage_metadata_wins_over_the_estimate():
+    response = AIMessage(
+        content="short", usage_metadata={"input_tokens": 123, "output_tokens": 45, "total_tokens": 168}
+    )
+    with node_span("test_usage_node") as span:
+        record_llm_usage("prompt", response)
+    assert (span.prompt_tokens, span.completion_tokens) == (123, 45)
+
+
+def test_finished_spans_are_published_to_the_registry():
+    with node_span("test_publish_node"):
+        pass
+    assert any('agent_node_runs_total{node="test_publish_node"} 1' in line for line in registry.render())
+
+
+def test_disabled_span_only_reports_the_tokens_spent():
+    with node_span("test_disabled_node", enabled=False) as span:
+        record_llm_usage("prompt", AIMessage(content="answer"))
+        with phase("llm"):
+            pass
+    assert span.state_update() == {"run_tokens": 4}
+    assert not any("test_disabled_node" in line for line in registry.render())
@@ -0,0 +1,40 @@
+from agent.llm_pool import LLMClientPool
+
+BASE = "http://llm.invalid/v1"
+
+
+def test_identical_settings_reuse_one_client():
+    pool = LLMClientPool()
+    first = pool.get(BASE, "m", 0.7, "k")
+    assert pool.get(BASE, "m", 0.7, "k") is first
+    assert pool.get(BASE, "m", 0.0, "k") is not first
+    stats = pool.stats()
+    assert (stats["hits"], stats["misses"], stats["clients"], stats["http_pools"]) == (1, 2, 2, 1)
+
+
+def test_clients_on_one_api_base_share_an_http_pool():
+    pool = LLMClientPool()
+    a = pool.get(BASE, "a", 0.7, "k")
+    b = pool.get(BASE, "b", 0.7, "k")
+    assert a.http_client is b.http_client
+    assert pool.get("http://other.invalid/v1", "a", 0.7, "k").http_client is not a.http_client
+
+
+def test_least_recently_used_client_is_evicted():
+    pool = LLMClientPool(max_clients=2)
+    a = pool.get(BASE, "a", 0.7, "k")
+    pool.get(BASE, "b", 0.7, "k")
+    assert pool.get(BASE, "a", 0.7, "k") is a  # "b" is now the oldest
+    pool.get(BASE, "c", 0.7, "k")
+    assert pool.stats()["evictions"] == 1
+    assert pool.get(BASE, "a", 0.7, "k") is a
+    pool.resize(1)
+    assert pool.stats()["clients"] == 1
+
+
+def test_clear_drops_clients_and_http_pools():
+    pool = LLMClientPool()
+    pool.get(BASE, "a", 0.7, "k")
+    pool.clear()
+    stats = pool.stats()
+    assert (stats["clients"], stats["http_pools"]) == (0, 0)
@@ -0,0 +1,107 @@
+from collections import OrderedDict
+
+import pytest
+
+from agent import local_corpus
+from agent.local_corpus import CorpusIndex, chunk_text, open_corpus
+
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def ingest(index, docs):
+    return index.ingest_paths([str(docs)], chunk_words=5, overlap=0)
+
+
+@pytest.fixture
+def docs(tmp_path):
+    directory = tmp_path / "docs"
+    directory.mkdir()
+    for i in range(6):
+        write(directory / f"note{i}.txt", f"apple orchard note {i} about harvest")
+    write(directory / "other.md", "pears and plums only")
+    return directory
+
+
+def test_chunk_text_windows():
+    assert chunk_text("a b c d e f g", chunk_words=3, overlap=1) == ["a b c", "c d e", "e f g"]
+    assert chunk_text("", chunk_words=3) == []
+
+
+def test_unchanged_files_are_skipped_and_deleted_files_are_tombstoned(tmp_path, docs):
+    index = CorpusIndex(str(tmp_path / "index"))
+    assert ingest(index, docs)["added"] == 7
+    assert ingest(index, docs)["skipped"] == 7
+
+    (docs / "note0.txt").unlink()
+    counts = ingest(index, docs)
+    assert counts["deleted"] == 1 and counts["skipped"] == 6
+    assert str(docs / "note0.txt") not in index.manifest["sources"]
+    assert all("note0" not in passage.source for passage in index.search("apple", k=10))
+    assert index.stats()["deleted"] == 2  # both passages of note0
+
+
+def test_ingesting_another_directory_keeps_earlier_sources(tmp_path, docs):
+    index = CorpusIndex(str(tmp_path / "index"))
+    ingest(index, docs)
+    elsewhere = tmp_path / "elsewhere"
+    elsewhere.mkdir()
+    write(elsewhere / "x.txt", "apple pie recipe")
+    assert "deleted" not in ingest(index, elsewhere)
+    assert len(index.manifest["sources"]) == 8
+
+
+def test_search_returns_k_live_hits_past_many_tombstones(tmp_path, docs):
+    big = write(docs / "big.txt", " ".join(["apple apple apple apple apple"] * 60))
+    index = CorpusIndex(str(tmp_path / "index"))
+    ingest(index, docs)
+    assert {p.source for p in index.search("apple", k=5)} == {str(big)}
+
+    write(big, "nothing relevant here anymore")
+    ingest(index, docs)
+    hits = index.search("apple", k=5)
+    assert len(hits) == 5
+    assert str(big) not in {p.source for p in hits}
+
+
+def test_tombstones_do_not_skew_bm25_statistics(tmp_path, docs):
+    write(docs / "big.txt", " ".join(["apple banana cherry dates elder"] * 40))
+    index = CorpusIndex(str(tmp_path / "index"))
+    ingest(index, docs)
+    (docs / "big.txt").unlink()
+    ingest(index, docs)
+
+    fresh = CorpusIndex(str(tmp_path / "fresh"))
+    ingest(fresh, docs)
+    scores = {(p.source, p.text): p.score for p in index.search("apple harvest", k=10)}
+    expected = {(p.source, p.text): p.score for p in fresh.search("apple harvest", k=10)}
+    assert scores == pytest.approx(expected)
+
+    index.compact()
+    assert index.stats()["deleted"] == 0
+    assert {(p.source, p.text): p.score for p in index.search("apple harvest", k=10)} == pytest.approx(expected)
+
+
+def test_replaced_and_evicted_readers_are_closed_after_their_last_search(tmp_path, docs, monkeypatch):
+    monkeypatch.setattr(local_corpus, "_indexes", OrderedDict())
+    monkeypatch.setattr(local_corpus, "_MAX_OPEN_INDEXES", 1)
+    first, second = str(tmp_path / "first"), str(tmp_path / "second")
+    ingest(CorpusIndex(first), docs)
+    ingest(CorpusIndex(second), docs)
+
+    with open_corpus(first) as old:
+        with open_corpus(second) as other:
+            assert other.search("apple")
+        assert old.search("apple")  # evicted, but still in use
+    assert old.segments == {}
+
+    with open_corpus(second) as current:
+        pass
+    writer = CorpusIndex(second)
+    write(docs / "new.txt", "apple cider")
+    ingest(writer, docs)
+    with open_corpus(second) as reopened:
+        assert reopened is not current and reopened.search("cider")
+    assert current.segments == {} and reopened.segments
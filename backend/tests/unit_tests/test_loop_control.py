@@ -0,0 +1,68 @@
+import time
+from types import SimpleNamespace
+
+from agent.instrumentation import instrumented_node, record_llm_usage, registry
+from agent.loop_control import LoopGain, measure_gain, stop_reason
+
+SUMMARY = "solar panel efficiency rose sharply thanks to perovskite tandem cells in the lab"
+
+
+def decide(**overrides):
+    args = dict(
+        is_sufficient=False,
+        loop=2,
+        max_loops=5,
+        follow_up_queries=["next query"],
+        gain=LoopGain(new_sources=5, total_sources=5, novelty=1.0),
+        min_gain=0.1,
+        started_at=time.time(),
+        time_budget_seconds=0,
+        tokens_spent=0,
+        token_budget=0,
+    )
+    return stop_reason(**{**args, **overrides})
+
+
+def test_measure_gain_scores_repeated_summaries_as_not_novel():
+    gain = measure_gain(0, 3, [SUMMARY, SUMMARY], 1)
+    assert gain.novelty == 0.0 and gain.gain == 0.0
+    assert measure_gain(2, 2, [SUMMARY], 0).gain == 1.0
+
+
+def test_measure_gain_without_sources_uses_novelty_alone():
+    assert measure_gain(0, 0, ["first summary text here", SUMMARY], 1).gain == 1.0
+
+
+def test_stop_reason_order_and_budgets():
+    assert decide() == ""
+    assert decide(is_sufficient=True, loop=5) == "sufficient"
+    assert decide(loop=5) == "max_loops"
+    assert decide(follow_up_queries=[]) == "no_new_queries"
+    assert decide(gain=LoopGain(0, 5, 0.0)) == "low_gain"
+    assert decide(gain=LoopGain(0, 5, 0.0), loop=1) == ""  # gain only gates from the second loop
+    assert decide(started_at=time.time() - 10, time_budget_seconds=5) == "time_budget"
+    assert decide(tokens_spent=1000, token_budget=1000) == "token_budget"
+    assert decide(tokens_spent=999, token_budget=1000) == ""
+
+
+def node_calling_llm(enabled):
+    @instrumented_node("budget_test", lambda state, config: enabled)
+    def node(state, config):
+        record_llm_usage("prompt", SimpleNamespace(usage_metadata={"input_tokens": 30, "output_tokens": 12}))
+        return {"value": 1}
+
+    return node
+
+
+def test_tokens_reach_run_state_with_instrumentation_disabled():
+    output = node_calling_llm(False)({}, {})
+    assert output == {"value": 1, "run_tokens": 42}
+    assert not any('node="budget_test"' in line for line in registry.render())  # not published
+
+
+def test_instrumented_node_adds_span_and_tokens_when_enabled():
+    registry.clear()
+    output = node_calling_llm(True)({}, {})
+    assert output["run_tokens"] == 42
+    [span] = output["node_metrics"]
+    assert (span["node"], span["prompt_tokens"], span["completion_tokens"]) == ("budget_test", 30, 12)
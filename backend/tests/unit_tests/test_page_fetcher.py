@@ -0,0 +1,100 @@
+import gc
+import socket
+
+import httpx
+import pytest
+
+from agent import page_fetcher
+from agent.configuration import Configuration
+from agent.page_fetcher import PageFetcher, is_public_address
+
+PUBLIC = "http://93.184.216.34"
+
+
+def fetcher_for(handler):
+    fetcher = PageFetcher()
+    fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler), follow_redirects=False)
+    return fetcher
+
+
+def page(request):
+    if request.url.path == "/hop":
+        return httpx.Response(302, headers={"location": "http://10.0.0.7/admin"})
+    return httpx.Response(200, html="<html><title>T</title><p>hello from %s</p></html>" % request.url.host)
+
+
+def configurable(**overrides):
+    return Configuration(page_cache_backend="none", **overrides)
+
+
+@pytest.mark.parametrize(
+    "address,public",
+    [
+        ("93.184.216.34", True),
+        ("2606:2800:220:1::1", True),
+        ("127.0.0.1", False),
+        ("10.1.2.3", False),
+        ("192.168.0.1", False),
+        ("169.254.169.254", False),
+        ("0.0.0.0", False),
+        ("224.0.0.1", False),
+        ("::1", False),
+        ("fe80::1%eth0", False),
+        ("::ffff:127.0.0.1", False),
+    ],
+)
+def test_is_public_address(address, public):
+    assert is_public_address(address) is public
+
+
+def test_private_hosts_and_redirects_to_them_are_blocked():
+    fetcher = fetcher_for(page)
+    urls = [f"{PUBLIC}/a", "http://127.0.0.1/a", "http://169.254.169.254/latest", f"{PUBLIC}/hop", "file:///etc/passwd"]
+    pages = fetcher.fetch(urls, configurable())
+    assert [p.status for p in pages] == ["fetched", "blocked", "blocked", "blocked", "blocked"]
+    assert "hello from 93.184.216.34" in pages[0].text
+
+
+def test_private_hosts_can_be_allowed():
+    fetcher = fetcher_for(page)
+    pages = fetcher.fetch(["http://127.0.0.1/a", f"{PUBLIC}/hop"], configurable(fetch_allow_private_hosts=True))
+    assert [p.status for p in pages] == ["fetched", "fetched"]
+    assert "hello from 10.0.0.7" in pages[1].text
+
+
+def test_redirect_loops_are_cut_off():
+    def loop(request):
+        return httpx.Response(302, headers={"location": f"{PUBLIC}/again"})
+
+    assert fetcher_for(loop).fetch([f"{PUBLIC}/start"], configurable())[0].status == "error"
+
+
+def test_host_semaphores_are_released_after_use():
+    fetcher = fetcher_for(page)
+    fetcher.fetch([f"http://93.184.216.{i}/" for i in range(1, 30)], configurable())
+    gc.collect()
+    assert len(fetcher._host_semaphores) == 0
+
+
+def test_requests_go_to_the_checked_address(monkeypatch):
+    answers = iter(["93.184.216.34", "93.184.216.35", "127.0.0.1"])
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (next(answers), port))]
+
+    monkeypatch.setattr(page_fetcher.socket, "getaddrinfo", getaddrinfo)
+    seen = []
+
+    def handler(request):
+        seen.append((str(request.url), request.headers["host"], request.extensions.get("sni_hostname")))
+        if request.url.path == "/start":
+            return httpx.Response(302, headers={"location": "/next"})
+        return httpx.Response(200, html="<p>ok</p>")
+
+    fetcher = fetcher_for(handler)
+    pages = fetcher.fetch(["https://example.com/start", "https://example.com/again"], configurable(fetch_per_host_limit=1))
+    assert [p.status for p in pages] == ["fetched", "blocked"]
+    assert seen == [
+        ("https://93.184.216.34/start", "example.com", "example.com"),
+        ("https://93.184.216.35/next", "example.com", "example.com"),
+    ]
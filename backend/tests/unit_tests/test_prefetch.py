@@ -0,0 +1,58 @@
+import threading
+
+from agent.prefetch import Prefetcher, Speculation
+
+
+def stream(speculation, text, size=7):
+    for end in range(size, len(text) + size, size):
+        speculation.feed(text[:end], text[end - size : end])
+
+
+def test_only_completed_new_follow_ups_are_launched():
+    launched = []
+    speculation = Speculation(["Known query"], limit=5, launch=lambda q: launched.append(q) or True)
+    stream(speculation, '{"is_sufficient": false, "follow_up_queries": ["known query", "first', size=1)
+    assert launched == []
+    stream(
+        speculation,
+        '{"is_sufficient": false, "follow_up_queries": ["known query", "first", "second"], "knowledge_gap": "x"}',
+    )
+    assert launched == ["first", "second"]
+
+
+def test_last_follow_up_waits_for_a_later_field_or_the_end():
+    launched = []
+    speculation = Speculation([], limit=5, launch=lambda q: launched.append(q) or True)
+    speculation.feed('{"follow_up_queries": ["a", "b"', '"')
+    assert launched == ["a"]
+
+
+def test_speculation_honours_the_limit_and_stops_once_sufficient():
+    launched = []
+    limited = Speculation([], limit=1, launch=lambda q: launched.append(q) or True)
+    stream(limited, '{"follow_up_queries": ["a", "b", "c"], "knowledge_gap": ""}')
+    assert launched == ["a"]
+    launched.clear()
+    sufficient = Speculation([], limit=5, launch=lambda q: launched.append(q) or True)
+    stream(sufficient, '{"is_sufficient": true, "follow_up_queries": ["a", "b"], "knowledge_gap": ""}')
+    assert launched == []
+
+
+def test_settle_counts_used_and_wasted_searches():
+    prefetcher = Prefetcher(max_workers=1, min_samples=2)
+    speculation = Speculation([], limit=5, launch=lambda q: True)
+    stream(speculation, '{"follow_up_queries": ["a", "b"], "knowledge_gap": ""}')
+    assert speculation.settle(["A?"], prefetcher) == {"launched": 2, "used": 1, "wasted": 1}
+    assert prefetcher.waste_ratio() == 0.5
+    assert not prefetcher.paused(0.5) and prefetcher.paused(0.4)
+
+
+def test_prefetcher_runs_one_search_per_key():
+    prefetcher = Prefetcher(max_workers=1)
+    release = threading.Event()
+    runs = []
+    assert prefetcher.submit("k", lambda: (release.wait(2), runs.append("k")))
+    assert not prefetcher.submit("k", lambda: runs.append("again"))
+    release.set()
+    prefetcher.wait("k", timeout=2)
+    assert runs == ["k"]
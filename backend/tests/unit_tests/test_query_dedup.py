@@ -0,0 +1,22 @@
+from agent.query_dedup import prune_queries
+
+
+def test_exact_duplicates_of_earlier_and_sibling_queries_are_pruned():
+    result = prune_queries(
+        ["Solid state batteries", '"solid  state batteries"', "sodium ion cells", "Sodium ion cells?", "  "],
+        already_run=["SOLID STATE BATTERIES"],
+    )
+    assert result.kept == ["sodium ion cells"]
+    assert result.report(2) == {"loop": 2, "kept": 1, "exact": 4, "near": 0}
+
+
+def test_near_duplicates_are_pruned_only_when_enabled():
+    candidates = ["lithium sulfur battery lifetime 2024", "lithium sulfur battery lifetimes 2024"]
+    assert prune_queries(candidates, []).kept == candidates
+    result = prune_queries(candidates, [], near_duplicate_threshold=0.6)
+    assert result.kept == candidates[:1] and result.pruned["near"] == 1
+
+
+def test_distinct_queries_survive_near_duplicate_pruning():
+    candidates = ["perovskite solar cell efficiency", "offshore wind turbine costs"]
+    assert prune_queries(candidates, ["grid storage policy"], near_duplicate_threshold=0.6).kept == candidates
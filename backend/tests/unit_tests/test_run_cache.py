@@ -0,0 +1,92 @@
+import time
+import uuid
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agent.blob_store import is_ref, load_texts, store_text
+from agent.configuration import Configuration
+from agent.graph import _check_run_cache, _run_cache_key
+from agent.run_cache import get_run_cache, lookup_run, run_cache_entry, run_cache_key
+
+
+def settings(**overrides):
+    return Configuration.from_runnable_config({"configurable": {"run_cache_backend": "memory", **overrides}})
+
+
+def test_run_cache_key_ignores_spelling_but_not_research_settings():
+    configurable = settings()
+    key = run_cache_key("What is  Perovskite?", configurable, 2)
+    assert run_cache_key("what is perovskite", configurable, 2) == key
+    assert run_cache_key("what is perovskite", configurable, 3) != key
+    assert run_cache_key("what is perovskite", settings(number_of_initial_queries=7), 2) != key
+
+
+def test_run_cache_entry_keeps_only_this_runs_research():
+    state = {
+        "web_research_result": ["old summary", "new summary"],
+        "search_query": ["old query", "new query"],
+        "sources_gathered": [{"short_url": "src-old"}, {"short_url": "src-new"}],
+        "run_summary_offset": 1,
+        "run_query_offset": 1,
+        "run_source_offset": 1,
+    }
+    entry = run_cache_entry("answer", state, settings())
+    assert entry["web_research_result"] == ["new summary"]
+    assert entry["search_query"] == ["new query"]
+    assert entry["sources_gathered"] == [{"short_url": "src-new"}]
+
+
+def test_lookup_run_ignores_stale_entries():
+    cache = get_run_cache(settings())
+    key = uuid.uuid4().hex
+    cache.set(key, {"answer": "a", "researched_at": time.time() - 100})
+    assert lookup_run(cache, key, ttl_seconds=1000)["answer"] == "a"
+    assert lookup_run(cache, key, ttl_seconds=10) is None
+    assert lookup_run(None, key, ttl_seconds=10) is None
+
+
+def test_cache_hit_replays_only_the_cached_run_into_another_thread():
+    configurable = settings(run_cache_mode="summaries")
+    question = f"topic {uuid.uuid4().hex}"
+    first_thread = {
+        "messages": [HumanMessage(content="earlier turn"), AIMessage(content="earlier answer"), HumanMessage(content=question)],
+        "web_research_result": ["earlier summary", "summary"],
+        "search_query": ["earlier query", "query"],
+        "sources_gathered": [{"short_url": "src-earlier"}, {"short_url": "src-run"}],
+        "run_summary_offset": 1,
+        "run_query_offset": 1,
+        "run_source_offset": 1,
+    }
+    second_thread = {"messages": first_thread["messages"], "web_research_result": [], "search_query": []}
+    get_run_cache(configurable).set(
+        _run_cache_key(second_thread, configurable), run_cache_entry("cached answer", first_thread, configurable)
+    )
+
+    update = _check_run_cache(second_thread, configurable)
+    assert update["run_cache"]["status"] == "summaries"
+    assert update["search_query"] == ["query"]
+    assert update["web_research_result"] == ["summary"]
+    assert update["sources_gathered"] == [{"short_url": "src-run"}]
+
+
+def test_cached_summaries_do_not_depend_on_the_writers_blob_store(tmp_path):
+    writer = settings(run_cache_mode="summaries", blob_store_path=str(tmp_path / "a"), blob_min_chars=1)
+    summary = store_text("a long summary", writer)
+    assert is_ref(summary)
+    state = {"messages": [HumanMessage(content=f"topic {uuid.uuid4().hex}")], "web_research_result": [summary]}
+    entry = run_cache_entry("answer", state, writer)
+    assert entry["web_research_result"] == ["a long summary"]
+    get_run_cache(writer).set(_run_cache_key(state, writer), entry)
+
+    without_store = settings(run_cache_mode="summaries")
+    assert _check_run_cache(state, without_store)["web_research_result"] == ["a long summary"]
+    other_store = settings(run_cache_mode="summaries", blob_store_path=str(tmp_path / "b"), blob_min_chars=1)
+    refs = _check_run_cache(state, other_store)["web_research_result"]
+    assert load_texts(refs, other_store) == ["a long summary"]
+
+
+def test_lookup_run_ignores_entries_holding_blob_references():
+    cache = get_run_cache(settings())
+    key = uuid.uuid4().hex
+    cache.set(key, {"answer": "a", "researched_at": time.time(), "web_research_result": ["blob:" + "0" * 64]})
+    assert lookup_run(cache, key, ttl_seconds=0) is None
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from agent.configuration import Configuration
+from agent.scheduler import (
+    FairLimiter,
+    get_scheduler,
+    llm_limiter,
+    search_slot,
+    session_id,
+)
+
+
+def wait_for_queue(limiter, depth, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while limiter.stats()["queue_depth"] < depth:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_waiters_are_served_round_robin_across_sessions():
+    limiter = FairLimiter("test", 1)
+    limiter.acquire("holder")
+    order = []
+
+    def worker(session):
+        limiter.acquire(session)
+        order.append(session)
+        limiter.release()
+
+    threads = []
+    for depth, session in enumerate(["a", "a", "a", "b"], start=1):
+        threads.append(threading.Thread(target=worker, args=(session,)))
+        threads[-1].start()
+        wait_for_queue(limiter, depth)
+    limiter.release()
+    for thread in threads:
+        thread.join(timeout=2)
+    assert order == ["a", "b", "a", "a"]
+    stats = limiter.stats()
+    assert (stats["in_flight"], stats["max_queue_depth"], stats["waited"]) == (0, 4, 4)
+
+
+def test_resize_admits_queued_waiters():
+    limiter = FairLimiter("test", 1)
+    limiter.acquire()
+    admitted = threading.Event()
+    thread = threading.Thread(target=lambda: (limiter.acquire(), admitted.set()))
+    thread.start()
+    wait_for_queue(limiter, 1)
+    limiter.resize(2)
+    assert admitted.wait(timeout=2)
+    assert limiter.stats()["in_flight"] == 2
+    thread.join()
+
+
+def test_cancelled_async_waiter_leaves_the_queue_and_keeps_no_slot():
+    async def scenario():
+        limiter = FairLimiter("test", 1)
+        await limiter.acquire_async("a")
+        waiter = asyncio.ensure_future(limiter.acquire_async("b"))
+        await asyncio.sleep(0.01)
+        assert limiter.stats()["queue_depth"] == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["in_flight"], stats["queue_depth"]) == (0, 0)
+
+
+def test_search_slot_sizes_the_shared_limiter_from_the_configuration():
+    limiter = get_scheduler().search
+    original = limiter.limit
+    try:
+        with search_slot(Configuration(max_concurrent_searches=3), None):
+            assert limiter.limit == 3
+            assert limiter.stats()["in_flight"] == 1
+        assert limiter.stats()["in_flight"] == 0
+    finally:
+        limiter.resize(original)
+
+
+def test_session_id_prefers_the_thread_id():
+    assert session_id(None) == "default"
+    assert session_id({"configurable": {"thread_id": "t1"}, "metadata": {"run_id": "r"}}) == "t1"
+    assert session_id({"metadata": {"run_id": "r"}}) == "r"
+
+
+def test_roles_on_the_same_pool_and_model_share_a_limiter():
+    configurable = Configuration(
+        llm_endpoints="http://a.invalid/v1,http://b.invalid/v1",
+        answer_endpoints="http://a.invalid/v1",
+        max_concurrent_llm_calls_per_model=2,
+    )
+    shared = llm_limiter(configurable, "query_generator_model")
+    assert llm_limiter(configurable, "reflection_model") is shared  # same default model
+    assert shared.limit == 4
+    single = llm_limiter(configurable, "answer_model")
+    assert single is not shared and single.limit == 2
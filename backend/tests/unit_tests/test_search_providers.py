@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import pytest
+
+from agent import search_providers
+from agent.configuration import Configuration
+from agent.search_providers import (
+    SearchProvider,
+    SearchResult,
+    asearch,
+    canonical_url,
+    format_results,
+    merge_results,
+    search,
+)
+
+
+def result(url, provider="p"):
+    return SearchResult(f"Title {url}", url, "snippet", provider)
+
+
+class Provider(SearchProvider):
+    def __init__(self, urls, latency=0.0, error=None):
+        self.urls = urls
+        self.latency = latency
+        self.error = error
+
+    def search(self, query, max_results):
+        time.sleep(self.latency)
+        if self.error:
+            raise self.error
+        return [result(url) for url in self.urls][:max_results]
+
+    async def asearch(self, query, max_results):
+        await asyncio.sleep(self.latency)
+        if self.error:
+            raise self.error
+        return [result(url) for url in self.urls][:max_results]
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    monkeypatch.setattr(search_providers, "_providers", {})
+
+    def register(**named):
+        for name, provider in named.items():
+            monkeypatch.setitem(search_providers._factories, name, lambda configurable, p=provider: p)
+
+    return register
+
+
+def test_canonical_url_ignores_case_fragments_and_trailing_slashes():
+    assert canonical_url("HTTPS://Example.COM/a/#top") == canonical_url("https://example.com/a")
+    assert canonical_url("https://example.com/a?x=1") != canonical_url("https://example.com/a?x=2")
+
+
+def test_results_are_interleaved_by_rank_without_repeated_urls():
+    merged = merge_results(
+        [
+            [result("https://a.example/1"), result("https://a.example/2")],
+            [result("https://A.example/1/"), result("https://b.example/2")],
+        ],
+        max_results=5,
+    )
+    assert [r.url for r in merged] == ["https://a.example/1", "https://a.example/2", "https://b.example/2"]
+    assert format_results([]) == "No search results found."
+    assert format_results(merged[:1]).startswith("[1] Title https://a.example/1\nhttps://a.example/1")
+
+
+def test_search_returns_at_quorum_without_waiting_for_slow_providers(providers):
+    providers(fast=Provider(["https://fast.example/"]), slow=Provider(["https://slow.example/"], latency=1.0))
+    configurable = Configuration(search_providers="slow,fast", search_quorum=1)
+    start = time.perf_counter()
+    assert [r.url for r in search("q", configurable)] == ["https://fast.example/"]
+    assert [r.url for r in asyncio.run(asearch("q", configurable))] == ["https://fast.example/"]
+    assert time.perf_counter() - start < 1.0
+
+
+def test_failed_providers_are_skipped_unless_all_fail(providers):
+    providers(
+        broken=Provider([], error=RuntimeError("down")),
+        down=Provider([], error=RuntimeError("down")),
+        fast=Provider(["https://fast.example/"]),
+    )
+    assert [r.url for r in search("q", Configuration(search_providers="broken,fast", search_quorum=0))] == [
+        "https://fast.example/"
+    ]
+    with pytest.raises(RuntimeError):
+        search("q", Configuration(search_providers="broken,down", search_quorum=0))
+
+
+def test_unknown_provider_names_are_rejected(providers):
+    with pytest.raises(ValueError):
+        search("q", Configuration(search_providers="nope"))
@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+from agent.graph import _page_urls
+from agent.sources import (
+    canonical_url,
+    extract_urls,
+    get_source,
+    merge_sources,
+    source_entries,
+)
+
+
+def test_canonical_url_normalizes_spellings_of_the_same_page():
+    variants = [
+        "https://Example.com:443/a/?utm_source=x&id=1#top",
+        "HTTPS://example.com/a?id=1&fbclid=abc",
+        "https://example.com/a?id=1",
+    ]
+    assert {canonical_url(url) for url in variants} == {"https://example.com/a?id=1"}
+
+
+def test_canonical_url_keeps_query_encoding_and_blank_params():
+    assert canonical_url("https://a.org/s?q=caf%C3%A9+bar&empty=&utm_medium=m") == "https://a.org/s?q=caf%C3%A9+bar&empty="
+
+
+def test_extract_urls_trims_punctuation_dedups_and_keeps_the_first_spelling():
+    text = "See (https://a.org/x?utm_source=n). Also https://A.org/x/ and https://b.org/y, https://c.org."
+    assert extract_urls(text) == ["https://a.org/x?utm_source=n", "https://b.org/y", "https://c.org"]
+    assert extract_urls(text, limit=1) == ["https://a.org/x?utm_source=n"]
+
+
+def test_sources_keep_the_original_link_and_share_ids_across_spellings():
+    original = "https://Example.com/Path/?q=a%20b&blank="
+    [entry] = source_entries([original, "https://example.com/Path?q=a%20b&blank=&utm_campaign=c"])
+    assert entry["value"] == original
+    assert entry["label"] == "example.com"
+    assert entry["short_url"] == get_source("https://example.com/Path?q=a%20b&blank=").id
+
+
+def test_local_paths_are_kept_as_they_are():
+    source = get_source("/docs/report.md", "report.md")
+    assert (source.url, source.label) == ("/docs/report.md", "report.md")
+
+
+def test_merge_sources_drops_sources_already_recorded():
+    first, second = source_entries(["https://a.org/1", "https://a.org/2"])
+    assert merge_sources([first], [first, second]) == [first, second]
+
+
+def test_page_urls_honours_fetch_top_k_above_five():
+    text = " ".join(f"https://site{i}.org/page" for i in range(10))
+    configurable = SimpleNamespace(fetch_pages=True, fetch_top_k=8)
+    assert len(_page_urls(configurable, text, {})) == 8
+    assert _page_urls(configurable, text, {"errors": 1}) == []
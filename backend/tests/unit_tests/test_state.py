@@ -0,0 +1,42 @@
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Overwrite
+
+from agent.configuration import configuration_generation
+from agent.graph import start_run
+from agent.state import RUN_SCOPED_FIELDS, OverallState, add_stats
+
+
+def test_start_run_resets_every_run_scoped_field():
+    update = start_run({"node_metrics": [{"node": "old"}], "run_tokens": 500, "knowledge_state": "old"})
+    assert update.pop("config_generation") == configuration_generation()
+    assert set(update) == set(RUN_SCOPED_FIELDS) <= set(OverallState.__annotations__)
+    # Reducer fields need an Overwrite; plain fields take the value as is.
+    assert isinstance(update["node_metrics"], Overwrite) and isinstance(update["run_tokens"], Overwrite)
+    assert (update["knowledge_state"], update["reflected_summary_count"]) == ("", 0)
+    values = {key: value.value if isinstance(value, Overwrite) else value for key, value in update.items()}
+    assert values == {key: empty() for key, empty in RUN_SCOPED_FIELDS.items()}
+
+
+def test_add_stats_sums_nested_counters():
+    merged = add_stats({"search": {"hits": 1, "misses": 2}, "label": "a"}, {"search": {"hits": 3}, "label": "b"})
+    assert merged == {"search": {"hits": 4, "misses": 2}, "label": "b"}
+
+
+def test_cache_stats_are_per_run_on_a_checkpointed_thread():
+    def search(state):
+        return {"cache_stats": {"search": {"hits": 1, "misses": 2}}}
+
+    builder = StateGraph(OverallState)
+    builder.add_node("start_run", start_run)
+    builder.add_node("search", search)
+    builder.add_edge(START, "start_run")
+    builder.add_edge("start_run", "search")
+    builder.add_edge("search", END)
+    graph = builder.compile(checkpointer=InMemorySaver())
+    config = {"configurable": {"thread_id": "per-run-stats"}}
+    for turn in range(3):
+        result = graph.invoke({"messages": [HumanMessage(content=f"turn {turn}")]}, config)
+    assert result["cache_stats"] == {"search": {"hits": 1, "misses": 2}}
+    assert len(result["messages"]) == 3
@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "benchmarks"))
+
+from run_benchmark import percentile  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+
+from agent.llm_pool import LLMClientPool  # noqa: E402
+from agent.tools_and_schemas import Reflection, SearchQueryList  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def llm():
+    with StubServer(latency=0.0, token_rate=10_000.0, completion_tokens=30) as server:
+        yield LLMClientPool().get(server.base_url, "stub-model", 0.0, "not_needed")
+
+
+def test_plain_and_streamed_completions(llm):
+    message = llm.invoke("Summarize the results.")
+    assert message.content
+    chunks = list(llm.stream("Summarize the results."))
+    assert len(chunks) > 1
+    assert "".join(chunk.content for chunk in chunks).strip()
+
+
+@pytest.mark.parametrize("schema", [SearchQueryList, Reflection])
+def test_structured_output_matches_the_requested_schema(llm, schema):
+    assert isinstance(llm.with_structured_output(schema).invoke("Plan the research."), schema)
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(v) for v in range(1, 11)]
+    assert (percentile(values, 50), percentile(values, 95), percentile(values, 100)) == (5.0, 10.0, 10.0)
+    assert percentile([3.0], 95) == 3.0
@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+from agent.instrumentation import node_span, phase
+from agent.summarizer import (
+    amap_reduce_summarize,
+    map_reduce_summarize,
+    needs_map_reduce,
+    split_into_chunks,
+)
+from agent.utils import estimate_tokens
+
+PAYLOAD = "\n\n".join(f"Paragraph {i}. " + "Battery chemistry facts. " * 20 for i in range(12))
+
+
+def map_prompt(chunk, part, parts):
+    return f"MAP {part}/{parts}: {chunk}"
+
+
+def reduce_prompt(partials):
+    return "REDUCE: " + " | ".join(partials)
+
+
+def complete(prompt):
+    # Summaries are short, so reduce inputs always fit.
+    return prompt.split(":", 1)[0]
+
+
+async def acomplete(prompt):
+    await asyncio.sleep(0)
+    return complete(prompt)
+
+
+def test_needs_map_reduce_respects_threshold_and_zero_disables():
+    assert needs_map_reduce(PAYLOAD, 100)
+    assert not needs_map_reduce(PAYLOAD, 0)
+    assert not needs_map_reduce("short", 100)
+
+
+def test_chunks_stay_within_budget_and_keep_all_text():
+    chunks = split_into_chunks(PAYLOAD, 300)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 300 for chunk in chunks)
+    assert "".join(chunks).replace("\n", "").replace(" ", "") == PAYLOAD.replace("\n", "").replace(" ", "")
+
+
+def test_oversized_sentences_are_cut():
+    chunks = split_into_chunks("x" * 1000, 50)
+    assert all(estimate_tokens(chunk) <= 50 for chunk in chunks) and "".join(chunks) == "x" * 1000
+
+
+def test_sync_and_async_map_reduce_agree():
+    summary, report = map_reduce_summarize(PAYLOAD, complete, map_prompt, reduce_prompt, 300, max_workers=4)
+    asummary, areport = asyncio.run(amap_reduce_summarize(PAYLOAD, acomplete, map_prompt, reduce_prompt, 300))
+    assert summary == asummary == "REDUCE"
+    assert report.map_calls == areport.map_calls == len(split_into_chunks(PAYLOAD, 300))
+    assert report.reduce_calls == areport.reduce_calls == 1
+    assert report.stats()["map_reduce_runs"] == 1
+
+
+def test_reduce_runs_in_rounds_when_partials_are_too_large():
+    def verbose(prompt):
+        return prompt[:400]  # ~100 tokens per partial summary
+
+    summary, report = map_reduce_summarize(PAYLOAD, verbose, map_prompt, reduce_prompt, 150, max_workers=4)
+    assert report.reduce_calls > 1
+    assert summary.startswith("REDUCE")
+
+
+def test_parallel_map_calls_count_their_llm_phase_once():
+    def timed_complete(prompt):
+        with phase("llm"):
+            time.sleep(0.05)
+        return complete(prompt)
+
+    async def atimed_complete(prompt):
+        with phase("llm"):
+            await asyncio.sleep(0.05)
+        return complete(prompt)
+
+    with node_span("test_map_phase", enabled=False) as span:
+        _, report = map_reduce_summarize(PAYLOAD, timed_complete, map_prompt, reduce_prompt, 200, max_workers=8)
+    assert report.map_calls > 2
+    assert span.phases["llm"] <= report.wall_seconds < report.sequential_seconds
+
+    with node_span("test_amap_phase", enabled=False) as span:
+        _, report = asyncio.run(amap_reduce_summarize(PAYLOAD, atimed_complete, map_prompt, reduce_prompt, 200))
+    assert span.phases["llm"] <= report.wall_seconds < report.sequential_seconds